@@ -0,0 +1,75 @@
+"""
+App/benchmarks/bench_binary_format.py
+Propustnost JSON řádků vs. binárních rámců (SET FORMAT BIN) na straně PC.
+
+Spuštění ze složky App:
+    python -m benchmarks.bench_binary_format
+"""
+import argparse
+import time
+
+from core.binary_protocol import encode_frame, decode_frames_columnar
+from core.line_framer import LineFramer
+from core.parser import parse_json_message, extract_data_values
+from benchmarks.bench_line_framer import make_stream
+
+BAUD_BYTES_PER_S = 115200 / 10   # 8N1 -> 10 bitů na bajt
+
+
+def make_binary_stream(n_samples: int, n_dallas: int) -> bytes:
+    values = [24.1234, 24.5678, 1234.56, 2345.67, 1200.0, 2300.0] + [23.0 + d / 10 for d in range(n_dallas)]
+    return b"".join(encode_frame(i * 10, values) for i in range(n_samples))
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--samples", type=int, default=50000)
+    ap.add_argument("--dallas", type=int, default=4)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    n = args.samples
+
+    json_data = make_stream(n, args.dallas)
+    bin_data = make_binary_stream(n, args.dallas)
+    chunk = 4096
+
+    def run_json():
+        framer = LineFramer()
+        for i in range(0, len(json_data), chunk):
+            for line in framer.feed(json_data[i:i + chunk]):
+                extract_data_values(parse_json_message(line))
+
+    def run_binary():
+        framer = LineFramer()
+        framer.binary = True
+        for i in range(0, len(bin_data), chunk):
+            for msg in framer.feed(bin_data[i:i + chunk]):
+                extract_data_values(parse_json_message(msg))
+
+    def run_columnar():
+        t_ms, cols, skipped = decode_frames_columnar(bin_data)
+        assert len(t_ms) == n and skipped == 0
+
+    print(f"{n} vzorků, {6 + args.dallas} kanálů")
+    print(f"{'režim':<18}{'B/vzorek':>10}{'vzorků/s (PC)':>16}{'max Hz @115200':>16}")
+    for name, data, fn in (
+        ("JSON", json_data, run_json),
+        ("BIN (dict)", bin_data, run_binary),
+        ("BIN (NumPy)", bin_data, run_columnar),
+    ):
+        dt = best_of(args.repeat, fn)
+        per_sample = len(data) / n
+        print(f"{name:<18}{per_sample:>10.1f}{n / dt:>16,.0f}{BAUD_BYTES_PER_S / per_sample:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+App/benchmarks/bench_csv_export.py
+Export do CSV: původní csv.DictWriter po řádcích proti core.csv_export po blocích sloupců.
+Oba výstupy se porovnají bajt po bajtu.
+
+Spuštění ze složky App:
+    python -m benchmarks.bench_csv_export
+"""
+import argparse
+import csv
+import filecmp
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from core.csv_export import export_csv, export_fieldnames
+from core.sample_store import SampleStore
+
+CHANNELS = ["T_TMP", "T_BME", "V_ADS_R", "V_ADS_NTC", "T_DS0", "T_DS1", "T_DS2", "T_DS3"]
+
+
+def make_store(rows: int) -> SampleStore:
+    rng = np.random.default_rng(1)
+    store = SampleStore(rows)
+    t = (np.arange(rows) * 0.1).round(3)
+    cols = {ch: (20.0 + 10.0 * rng.random(rows)).round(4) for ch in CHANNELS}
+    cols["T_BME"][rng.random(rows) < 0.01] = np.nan   # občas chybějící hodnota
+    store.extend(t, cols)
+    return store
+
+
+def legacy_export(filename: str, rows, allowed_sensors=None):
+    """Původní BaseMeasurement.export_to_csv."""
+    fieldnames = export_fieldnames(rows[0].keys(), allowed_sensors)
+    with open(filename, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=";")
+        writer.writeheader()
+        for row in rows:
+            out_row = {}
+            for k in fieldnames:
+                if k in row:
+                    val = row[k]
+                    if isinstance(val, float):
+                        out_row[k] = str(val).replace(".", ",")
+                    else:
+                        out_row[k] = val
+            writer.writerow(out_row)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=200_000)
+    args = ap.parse_args()
+
+    store = make_store(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = os.path.join(tmp, "old.csv")
+        new_path = os.path.join(tmp, "new.csv")
+
+        t0 = time.perf_counter()
+        legacy_export(old_path, store)
+        t_old = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        export_csv(new_path, store)
+        t_new = time.perf_counter() - t0
+
+        same = filecmp.cmp(old_path, new_path, shallow=False)
+        print(f"{args.rows} řádků, {len(CHANNELS)} kanálů, {os.path.getsize(new_path) / 1e6:.1f} MB")
+        print(f"  csv.DictWriter po řádcích   {args.rows / t_old:12.0f} řádků/s")
+        print(f"  csv_export po blocích       {args.rows / t_new:12.0f} řádků/s")
+        print(f"Zrychlení {t_old / t_new:.1f}x, výstup shodný: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+App/benchmarks/bench_line_framer.py
+Porovnání původní smyčky (buffer += chunk; split) s LineFramer.
+
+Spuštění ze složky App:
+    python -m benchmarks.bench_line_framer
+"""
+import argparse
+import time
+from typing import Callable, List
+
+from core.line_framer import LineFramer
+
+
+def make_stream(n_lines: int, n_dallas: int) -> bytes:
+    """Vytvoří proud JSON řádků ve stejném tvaru, jaký posílá SerialProtocol::sendData."""
+    parts = []
+    for i in range(n_lines):
+        line = (f'{{"type":"data","t_ms":{i * 10},"T_TMP":24.1234,"T_BME":24.5678,'
+                f'"V_ADS_R":1234.56,"V_ADS_NTC":2345.67,"V_ESP_R":1200.00,"V_ESP_NTC":2300.00')
+        for d in range(n_dallas):
+            line += f',"T_DS{d}":23.{d:04d}'
+        parts.append(line + "}\r\n")
+    return "".join(parts).encode()
+
+
+def chunked(data: bytes, size: int) -> List[bytes]:
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def legacy_loop(chunks: List[bytes], on_line: Callable[[str], None]):
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            text = line.decode(errors="ignore").strip()
+            if text:
+                on_line(text)
+
+
+def framer_loop(chunks: List[bytes], on_line: Callable[[str], None]):
+    framer = LineFramer()
+    for chunk in chunks:
+        for text in framer.feed(chunk):
+            on_line(text)
+
+
+def run_once(name: str, fn, chunks: List[bytes], expected: int) -> float:
+    count = 0
+
+    def on_line(_text):
+        nonlocal count
+        count += 1
+
+    t0 = time.perf_counter()
+    fn(chunks, on_line)
+    dt = time.perf_counter() - t0
+    assert count == expected, f"{name}: {count} != {expected}"
+    return dt
+
+
+def compare(variants, chunks: List[bytes], expected: int, repeat: int) -> List[float]:
+    """Varianty se střídají v každém opakování, aby je zatížení stroje ovlivnilo stejně."""
+    best = [float("inf")] * len(variants)
+    for _ in range(repeat):
+        for i, (name, fn) in enumerate(variants):
+            best[i] = min(best[i], run_once(name, fn, chunks, expected))
+    rates = []
+    for (name, _), dt in zip(variants, best):
+        rates.append(expected / dt)
+        print(f"  {name:<8} {expected / dt:>12,.0f} řádků/s  (nejlepší z {repeat}: {dt * 1000:.1f} ms)")
+    return rates
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lines", type=int, default=50000)
+    ap.add_argument("--dallas", type=int, default=8)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    data = make_stream(args.lines, args.dallas)
+    print(f"{args.lines} řádků, průměrně {len(data) // args.lines} B/řádek")
+
+    # 32-128 B = běžné čtení podle in_waiting při 115200 Bd (a původní pevné čtení),
+    # větší bloky = čtení podle in_waiting při zahlcení
+    for size in (32, 128, 4096, 65536):
+        chunks = chunked(data, size)
+        print(f"Blok {size} B:")
+        legacy, framer = compare([("legacy", legacy_loop), ("framer", framer_loop)], chunks, args.lines, args.repeat)
+        print(f"  zrychlení: {framer / legacy:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+App/benchmarks/bench_parser.py
+Cena zpracování jednoho řádku: parse_json_message + extract_data_values
+proti DataLineParser (naučené rozložení), dávkovému parse_lines_columnar
+a classify_message pro odpovědi.
+
+Spuštění ze složky App:
+    python -m benchmarks.bench_parser
+"""
+import argparse
+import time
+from typing import Callable, List
+
+from benchmarks.bench_line_framer import make_stream
+from core.parser import (DataLineParser, classify_message, extract_data_values, parse_json_message,
+                         parse_lines_columnar)
+
+
+def legacy_data(lines: List[str]):
+    for line in lines:
+        msg = parse_json_message(line)
+        if msg is not None and msg.get("type") == "data":
+            extract_data_values(msg)
+
+
+def fast_data(lines: List[str]):
+    parser = DataLineParser()
+    for line in lines:
+        parser.parse(line)
+
+
+def batch_data(lines: List[str]):
+    parse_lines_columnar(lines)
+
+
+def legacy_classify(lines: List[str]):
+    for line in lines:
+        msg = parse_json_message(line)
+        if msg is not None:
+            msg.get("type")
+
+
+def fast_classify(lines: List[str]):
+    for line in lines:
+        classify_message(line)
+
+
+def best_ns_per_line(fn: Callable[[List[str]], None], lines: List[str], repeat: int) -> float:
+    dt = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(lines)
+        dt = min(dt, time.perf_counter() - t0)
+    return dt / len(lines) * 1e9
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lines", type=int, default=50000)
+    ap.add_argument("--dallas", type=int, default=4)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    data_lines = make_stream(args.lines, args.dallas).decode().split("\r\n")[:-1]
+    ack_lines = ['{"type":"ack","cmd":"set_pwm"}'] * args.lines
+
+    print(f"{args.lines} řádků, {args.dallas} Dallas, nejlepší z {args.repeat}")
+    cases = [
+        ("data: json.loads + extract", legacy_data, data_lines),
+        ("data: DataLineParser", fast_data, data_lines),
+        ("data: parse_lines_columnar", batch_data, data_lines),
+        ("ack:  json.loads", legacy_classify, ack_lines),
+        ("ack:  classify_message", fast_classify, ack_lines),
+    ]
+    results = {}
+    for name, fn, lines in cases:
+        results[name] = best_ns_per_line(fn, lines, args.repeat)
+        print(f"  {name:<30} {results[name]:8.0f} ns/řádek")
+
+    print(f"Zrychlení data: {results[cases[0][0]] / results[cases[1][0]]:.2f}x, "
+          f"dávkově: {results[cases[0][0]] / results[cases[2][0]]:.2f}x, "
+          f"ack: {results[cases[3][0]] / results[cases[4][0]]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+App/benchmarks/bench_plot.py
+RealtimePlotWidget bez okna (Qt platforma offscreen): kolik bodů za sekundu
+zvládne add_point a kolik trvá překreslení při 10k, 100k a 1M bodech na křivku.
+
+Pro srovnání se měří i cena setData, jak ji platil původní widget: seznamy
+floatů, které pyqtgraph při každém volání převádí na pole, proti pohledům
+do bufferů NumPy. Překreslení kreslí jen obálku min/max (core/lod.py), jeho
+cena proto s počtem bodů skoro neroste. S --scrolling se měří posuvný režim
+(kruhové buffery, okno 60 s), kde paměť ani cena s délkou měření neroste vůbec.
+
+Spuštění ze složky App:
+    python -m benchmarks.bench_plot
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PySide6.QtWidgets import QApplication
+
+from ui.realtime_plot import RealtimePlotWidget
+
+CHANNELS = ["T_TMP", "T_BME", "T_DS0", "T_DS1"]
+
+
+def make_columns(n: int, t0: float = 0.0, rate_hz: float = 10.0):
+    t = t0 + np.arange(n) / rate_hz
+    return t, {ch: 24.0 + np.sin(t / 60.0 + i) + 0.01 * np.cos(t * 7.0) for i, ch in enumerate(CHANNELS)}
+
+
+def timed(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--points", type=int, default=300, help="počet add_point při měření rychlosti")
+    ap.add_argument("--scrolling", action="store_true", help="posuvný režim grafu")
+    args = ap.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    mode = "posuvný" if args.scrolling else "natahovací"
+    print(f"{len(CHANNELS)} křivky, okno 1200x600, režim {mode}, Qt {app.platformName()}")
+    print(f"{'bodů/křivku':>12} {'add_point':>14} {'překreslení':>12} {'setData seznam':>15} {'setData pohled':>15} {'paměť':>9}")
+    for n in args.sizes:
+        plot = RealtimePlotWidget(time_window_s=60.0, scrolling=args.scrolling)
+        plot.set_reference_mode(False)
+        plot.resize(1200, 600)
+        plot.show()
+        t, cols = make_columns(n)
+        plot.add_points(t, cols)
+        app.processEvents()
+
+        t_next, extra = make_columns(args.points, t0=float(t[-1]) + 0.1)
+        samples = [(float(ts), {ch: float(extra[ch][i]) for ch in CHANNELS}) for i, ts in enumerate(t_next)]
+        t0 = time.perf_counter()
+        for ts, values in samples:
+            plot.add_point(ts, values)
+        rate = len(samples) / (time.perf_counter() - t0)
+
+        redraw = timed(plot.grab, 1)
+
+        curve = plot._curves[CHANNELS[0]]
+        buf = plot._buffers[CHANNELS[0]]
+        xs, ys = buf.x.tolist(), buf.y.tolist()
+        set_list = timed(lambda: curve.setData(xs, ys), 3)
+        set_view = timed(lambda: curve.setData(buf.x, buf.y), 3)
+
+        mem = sum(b.nbytes for b in plot._buffers.values()) / 2**20
+        print(f"{n:12d} {rate:10.0f} b/s {redraw * 1e3:9.1f} ms {set_list * 1e3:12.2f} ms {set_view * 1e3:12.2f} ms {mem:6.1f} MB")
+        plot.close()
+        plot.deleteLater()
+        app.processEvents()
+
+
+if __name__ == "__main__":
+    main()
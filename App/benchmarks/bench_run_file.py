@@ -0,0 +1,99 @@
+"""
+App/benchmarks/bench_run_file.py
+Otevření dlouhého záznamu: run soubor (.tlrun přes mmap) proti CSV z exportu.
+
+Vytvoří záznam s --rows vzorky, změří otevření, výřez časového okna a načtení
+celého sloupce z .tlrun a pro srovnání načtení stejných dat z CSV
+(středník, desetinná čárka), tedy to, co bylo dřív nutné pro znovuotevření.
+
+Spuštění ze složky App:
+    python -m benchmarks.bench_run_file
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from core.run_recorder import RunReader, RunRecorder
+
+CHANNELS = ["T_TMP", "T_BME", "V_ADS_R", "V_ADS_NTC", "T_DS0", "T_DS1", "T_DS2", "T_DS3"]
+
+
+def write_run(path: str, rows: int, rate_hz: float):
+    rec = RunRecorder(path, {"measurement": "benchmark"}, fsync=False)
+    block = 4096
+    for start in range(0, rows, block):
+        n = min(block, rows - start)
+        t = (np.arange(start, start + n) / rate_hz).round(3)
+        rec.extend(t, {ch: 24.0 + np.sin(t / 60.0 + i) for i, ch in enumerate(CHANNELS)})
+        rec.flush()
+    rec.close()
+
+
+def write_csv(path: str, reader: RunReader):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write(";".join(["t_s"] + CHANNELS) + "\n")
+        for t_s, cols in reader.iter_chunks():
+            table = np.column_stack([t_s] + [cols[ch] for ch in CHANNELS])
+            lines = [";".join(repr(v) for v in row).replace(".", ",") for row in table.tolist()]
+            f.write("\n".join(lines) + "\n")
+
+
+def load_csv(path: str) -> dict:
+    with open(path, newline="", encoding="utf-8") as f:
+        r = csv.reader(f, delimiter=";")
+        header = next(r)
+        cols = [[] for _ in header]
+        for row in r:
+            for col, val in zip(cols, row):
+                col.append(float(val.replace(",", ".")))
+    return {name: np.array(col) for name, col in zip(header, cols)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--rate", type=float, default=10.0, help="vzorkovací frekvence záznamu [Hz]")
+    ap.add_argument("--window", type=float, default=600.0, help="délka výřezu [s]")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_path = os.path.join(tmp, "bench.tlrun")
+        csv_path = os.path.join(tmp, "bench.csv")
+        write_run(run_path, args.rows, args.rate)
+        duration_h = args.rows / args.rate / 3600
+
+        t0 = time.perf_counter()
+        reader = RunReader(run_path)
+        t_open = time.perf_counter() - t0
+
+        mid = args.rows / args.rate / 2
+        t0 = time.perf_counter()
+        t_s, cols = reader.slice(mid, mid + args.window)
+        float(cols["T_TMP"].sum())
+        t_slice = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        t_s, cols = reader.slice(channels=["T_TMP"])
+        float(cols["T_TMP"].sum())
+        t_column = time.perf_counter() - t0
+
+        write_csv(csv_path, reader)
+        t0 = time.perf_counter()
+        load_csv(csv_path)
+        t_csv = time.perf_counter() - t0
+
+        print(f"{args.rows} vzorků ({duration_h:.1f} h při {args.rate:g} Hz), {len(CHANNELS)} kanálů, "
+              f".tlrun {os.path.getsize(run_path) / 1e6:.0f} MB, CSV {os.path.getsize(csv_path) / 1e6:.0f} MB")
+        print(f"  .tlrun otevření                {t_open * 1e3:9.2f} ms  ({reader.n_chunks} chunků, index: {reader.indexed})")
+        print(f"  .tlrun výřez {args.window:g} s           {t_slice * 1e3:9.2f} ms")
+        print(f"  .tlrun celý sloupec T_TMP      {t_column * 1e3:9.2f} ms")
+        print(f"  CSV načtení                    {t_csv * 1e3:9.2f} ms")
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+"""
+App/core/async_serial_manager.py
+Alternativa k SerialManager postavená na asyncio.
+
+Všechny instance sdílejí jednu smyčku událostí běžící ve vlákně na pozadí,
+takže více zařízení nepotřebuje každé vlastní vlákno. Na POSIX systémech se
+čte přes loop.add_reader (žádné periodické probouzení), jinde přes executor.
+
+Synchronní metody (open/close/write_line/...) mají stejné rozhraní jako
+SerialManager, asynchronní varianty (*_async, request, wait_for_message)
+se volají uvnitř sdílené smyčky.
+
+Zápis smyčku také neblokuje: na POSIX se píše přímo do neblokujícího deskriptoru
+a co se nevejde do bufferu OS, dopíše se přes loop.add_writer, až bude port
+připravený. Jinde se píše ve vlastním jednovláknovém executoru (pořadí zůstane).
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, List, Tuple, Any
+
+import serial
+
+from core.command_channel import expected_ack
+from core.line_framer import LineFramer
+from core.parser import parse_json_message
+from core.serial_manager import SerialManager
+
+
+class DeviceError(Exception):
+    """ESP32 odpovědělo zprávou {"type":"error"} místo očekávané odpovědi."""
+
+
+_shared_loop: Optional[asyncio.AbstractEventLoop] = None
+_shared_loop_lock = threading.Lock()
+
+
+def get_shared_loop() -> asyncio.AbstractEventLoop:
+    """Vrátí (a při prvním volání spustí) smyčku asyncio běžící ve vlákně na pozadí."""
+    global _shared_loop
+    with _shared_loop_lock:
+        if _shared_loop is None or _shared_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="serial-asyncio", daemon=True)
+            thread.start()
+            _shared_loop = loop
+        return _shared_loop
+
+
+class _Waiter:
+    def __init__(self, msg_type: str, predicate: Optional[Callable[[dict], bool]],
+                 fail_on_error: bool, cmd: Optional[str], future: asyncio.Future):
+        self.msg_type = msg_type
+        self.predicate = predicate
+        self.fail_on_error = fail_on_error
+        self.cmd = cmd   # název příkazu ve zprávě "error" (viz expected_ack)
+        self.future = future
+
+
+class AsyncSerialManager:
+    MAX_READ_SIZE = SerialManager.MAX_READ_SIZE
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._loop = loop or get_shared_loop()
+        self._ser: Optional[serial.Serial] = None
+        self._framer = LineFramer()
+        self._read_timeout = 0.1
+        self._reader_fd: Optional[int] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._writer_fd: Optional[int] = None
+        self._out = bytearray()                     # čeká na zápis, až bude port připravený
+        self._drain_waiters: List[asyncio.Future] = []
+        self._write_executor: Optional[ThreadPoolExecutor] = None
+        self._waiters: List[_Waiter] = []
+        self._line_callback: Optional[Callable[[str], None]] = None
+        self._batch_callback: Optional[Callable[[List[str], float], None]] = None
+        self._line_listeners: Tuple[Callable[[List[str], float], None], ...] = ()
+        self._connection_lost_callback: Optional[Callable[[], None]] = None
+
+    @staticmethod
+    def list_ports() -> List[str]:
+        return SerialManager.list_ports()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def is_open(self) -> bool:
+        return self._ser is not None and self._ser.is_open
+
+    # --- Synchronní rozhraní (stejné jako SerialManager) ---
+
+    def open(self, port: str, baudrate: int = 115200, timeout: float = 0.1, reset: bool = True):
+        """Viz SerialManager.open; timeout platí pro čtení v executoru (kde nejde add_reader)."""
+        self._run_sync(self.open_async(port, baudrate, timeout, reset))
+
+    def close(self):
+        self._run_sync(self.close_async())
+
+    def set_connection_lost_callback(self, cb: Optional[Callable[[], None]]):
+        """Nastaví funkci, která se zavolá (ve vlákně smyčky) při ztrátě spojení."""
+        self._connection_lost_callback = cb
+
+    def set_line_callback(self, cb: Optional[Callable[[str], None]]):
+        self._batch_callback = None
+        self._line_callback = cb
+
+    def set_batch_callback(self, cb: Optional[Callable[[List[str], float], None]]):
+        self._line_callback = None
+        self._batch_callback = cb
+
+    def set_binary_frames(self, enabled: bool):
+        self._framer.binary = enabled
+
+    def add_line_listener(self, cb: Callable[[List[str], float], None]):
+        self._line_listeners = self._line_listeners + (cb,)
+
+    def remove_line_listener(self, cb: Callable[[List[str], float], None]):
+        self._line_listeners = tuple(l for l in self._line_listeners if l != cb)
+
+    def write(self, data: str):
+        """Neblokující zápis z libovolného vlákna. Chyba zápisu = ztráta spojení."""
+        if not self.is_open():
+            return
+        payload = data.encode("utf-8")
+        if self._in_loop_thread():
+            self._write_or_drop(payload)
+        else:
+            self._loop.call_soon_threadsafe(self._write_or_drop, payload)
+
+    def write_line(self, line: str):
+        self.write(line + "\n")
+
+    # --- Asynchronní rozhraní ---
+
+    async def open_async(self, port: str, baudrate: int = 115200, timeout: float = 0.1, reset: bool = True):
+        await self.close_async()
+        self._read_timeout = timeout
+
+        # timeout=0 -> neblokující čtení, data čteme jen když jsou připravená
+        if reset:
+            self._ser = serial.Serial(port=port, baudrate=baudrate, timeout=0)
+        else:
+            # attach: linky nastavíme ještě před otevřením, jinak by se deska restartovala
+            ser = serial.Serial(baudrate=baudrate, timeout=0)
+            ser.port = port
+            ser.dtr = False
+            ser.rts = False
+            ser.open()
+            self._ser = ser
+
+        # Stejná sekvence DTR/RTS jako SerialManager.open, jen bez blokování smyčky
+        if reset and SerialManager.set_reset_lines(self._ser, False):
+            await asyncio.sleep(0.1)
+            SerialManager.set_reset_lines(self._ser, True)
+            await asyncio.sleep(0.1)
+            SerialManager.set_reset_lines(self._ser, False)
+            await asyncio.sleep(0.2)
+
+        self._framer = LineFramer()
+        self._start_reader()
+
+    async def close_async(self):
+        self._stop_reader()
+        self._stop_writer(ConnectionError("Port byl uzavřen"))
+        self._fail_waiters(ConnectionError("Port byl uzavřen"))
+        if self._ser is not None:
+            try:
+                self._ser.close()
+            except Exception:
+                pass
+            self._ser = None
+
+    async def write_async(self, data: str):
+        """Zápis, který na rozdíl od write() chyby nepolyká, ale vyhodí výjimku."""
+        if not self.is_open():
+            raise ConnectionError("Port není otevřen")
+        pending = self._send(data.encode("utf-8"))
+        if pending is not None:
+            await pending
+        elif self._out:
+            # počkáme, až se dopíše i zbytek, který se nevešel do bufferu OS
+            drained = self._loop.create_future()
+            self._drain_waiters.append(drained)
+            await drained
+
+    async def write_line_async(self, line: str):
+        await self.write_async(line + "\n")
+
+    async def wait_for_message(
+        self,
+        msg_type: str,
+        timeout: Optional[float] = 1.0,
+        predicate: Optional[Callable[[dict], bool]] = None,
+        fail_on_error: bool = False,
+        cmd: Optional[str] = None,
+    ) -> dict:
+        """
+        Počká na první JSON zprávu s daným "type" (a splněným predicate).
+        Při fail_on_error vyhodí DeviceError, pokud dřív přijde zpráva typu "error"
+        k příkazu cmd (nebo chyba bez "cmd", která patří nejstaršímu čekateli).
+        """
+        waiter = self._add_waiter(msg_type, predicate, fail_on_error, cmd)
+        return await self._await_waiter(waiter, timeout, msg_type)
+
+    async def request(
+        self,
+        line: str,
+        expect_type: str = "ack",
+        timeout: Optional[float] = 1.0,
+        predicate: Optional[Callable[[dict], bool]] = None,
+    ) -> dict:
+        """
+        Odešle příkaz a vrátí první odpověď typu expect_type,
+        např. await mgr.request("START") -> {"type":"ack","cmd":"start"}.
+        """
+        # Čekatele registrujeme před zápisem, aby rychlá odpověď neutekla
+        waiter = self._add_waiter(expect_type, predicate, True, expected_ack(line))
+        try:
+            await self.write_line_async(line)
+        except Exception:
+            self._remove_waiter(waiter)
+            raise
+        return await self._await_waiter(waiter, timeout, expect_type)
+
+    # --- Interní ---
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _run_sync(self, coro) -> Any:
+        if self._in_loop_thread():
+            coro.close()
+            raise RuntimeError("Synchronní metodu nelze volat z vlákna smyčky, použijte *_async variantu.")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _start_reader(self):
+        try:
+            fd = self._ser.fileno()
+            self._loop.add_reader(fd, self._on_readable)
+            self._reader_fd = fd
+            self._writer_fd = fd   # pyserial otevírá port na POSIX s O_NONBLOCK
+        except (AttributeError, NotImplementedError, OSError):
+            # Windows / Proactor smyčka: blokující čtení v executoru
+            self._reader_task = self._loop.create_task(self._executor_reader())
+
+    def _stop_reader(self):
+        if self._reader_fd is not None:
+            self._loop.remove_reader(self._reader_fd)
+            self._reader_fd = None
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+
+    def _stop_writer(self, exc: Exception):
+        if self._writer_fd is not None:
+            self._loop.remove_writer(self._writer_fd)
+            self._writer_fd = None
+        self._out.clear()
+        for drained in self._drain_waiters:
+            if not drained.done():
+                drained.set_exception(exc)
+        self._drain_waiters.clear()
+        if self._write_executor is not None:
+            self._write_executor.shutdown(wait=False)
+            self._write_executor = None
+
+    def _on_readable(self):
+        try:
+            chunk = self._ser.read(max(1, min(self._ser.in_waiting, self.MAX_READ_SIZE)))
+        except Exception:
+            self._on_connection_lost()
+            return
+        if chunk:
+            self._dispatch(self._framer.feed(chunk))
+
+    async def _executor_reader(self):
+        ser = self._ser
+        ser.timeout = self._read_timeout
+
+        def blocking_read() -> bytes:
+            return ser.read(max(1, min(ser.in_waiting, self.MAX_READ_SIZE)))
+
+        while self._ser is ser and ser.is_open:
+            try:
+                chunk = await self._loop.run_in_executor(None, blocking_read)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._on_connection_lost()
+                return
+            if chunk:
+                self._dispatch(self._framer.feed(chunk))
+
+    def _write_or_drop(self, payload: bytes):
+        if not self.is_open():
+            return
+        try:
+            pending = self._send(payload)
+        except Exception:
+            self._on_connection_lost()
+            return
+        if pending is not None:
+            pending.add_done_callback(self._on_executor_write_done)
+
+    def _send(self, payload: bytes) -> Optional[asyncio.Future]:
+        """
+        Zapíše payload bez blokování smyčky. Vrátí future zápisu v executoru
+        (bez add_writer), jinak None; nezapsaný zbytek dopíše _on_writable.
+        """
+        fd = self._writer_fd
+        if fd is None:
+            if self._write_executor is None:
+                self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="serial-write")
+            return self._loop.run_in_executor(self._write_executor, self._ser.write, payload)
+        if not self._out:
+            try:
+                written = os.write(fd, payload)
+            except BlockingIOError:
+                written = 0
+            if written == len(payload):
+                return None
+            payload = payload[written:]
+            self._loop.add_writer(fd, self._on_writable)
+        self._out += payload
+        return None
+
+    def _on_writable(self):
+        try:
+            written = os.write(self._writer_fd, self._out)
+        except BlockingIOError:
+            return
+        except OSError:
+            self._on_connection_lost()
+            return
+        del self._out[:written]
+        if not self._out:
+            self._loop.remove_writer(self._writer_fd)
+            for drained in self._drain_waiters:
+                if not drained.done():
+                    drained.set_result(None)
+            self._drain_waiters.clear()
+
+    def _on_executor_write_done(self, pending: asyncio.Future):
+        if not pending.cancelled() and pending.exception() is not None and self._ser is not None:
+            self._on_connection_lost()
+
+    def _dispatch(self, lines: List[str]):
+        if not lines:
+            return
+
+        if self._waiters:
+            for text in lines:
+                if isinstance(text, dict) or text.startswith("{"):
+                    msg = parse_json_message(text)
+                    if msg is not None:
+                        self._resolve_waiters(msg)
+
+        t_arrival = time.time()
+        for listener in self._line_listeners:
+            listener(lines, t_arrival)
+        if self._batch_callback:
+            self._batch_callback(lines, t_arrival)
+        elif self._line_callback:
+            for text in lines:
+                self._line_callback(text)
+
+    def _add_waiter(self, msg_type, predicate, fail_on_error, cmd=None) -> _Waiter:
+        waiter = _Waiter(msg_type, predicate, fail_on_error, cmd, self._loop.create_future())
+        self._waiters.append(waiter)
+        return waiter
+
+    def _remove_waiter(self, waiter: _Waiter):
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+
+    async def _await_waiter(self, waiter: _Waiter, timeout: Optional[float], msg_type: str) -> dict:
+        try:
+            return await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Žádná odpověď typu '{msg_type}' do {timeout} s") from None
+        finally:
+            self._remove_waiter(waiter)
+
+    def _resolve_waiters(self, msg: dict):
+        # Jedna zpráva vyřídí nejvýše jednoho čekatele (v pořadí registrace)
+        msg_type = msg.get("type")
+        if msg_type == "error" and self._fail_error_waiter(msg):
+            return
+        for waiter in list(self._waiters):
+            if waiter.future.done():
+                continue
+            if msg_type == waiter.msg_type and (waiter.predicate is None or waiter.predicate(msg)):
+                waiter.future.set_result(msg)
+                self._waiters.remove(waiter)
+                break
+
+    def _fail_error_waiter(self, msg: dict) -> bool:
+        # Stejně jako CommandChannel._match_error: chyba s "cmd" patří čekateli na ten příkaz,
+        # chyba bez "cmd" (starší firmware, příkazy v pořadí) nejstaršímu
+        waiters = [w for w in self._waiters if w.fail_on_error and not w.future.done()]
+        name = msg.get("cmd")
+        if name is None:
+            waiter = waiters[0] if waiters else None
+        else:
+            waiter = next((w for w in waiters if w.cmd == name), None)
+        if waiter is None:
+            return False   # chyba k příkazu, na který nikdo nečeká
+        waiter.future.set_exception(DeviceError(str(msg.get("msg"))))
+        self._waiters.remove(waiter)
+        return True
+
+    def _fail_waiters(self, exc: Exception):
+        for waiter in self._waiters:
+            if not waiter.future.done():
+                waiter.future.set_exception(exc)
+        self._waiters.clear()
+
+    def _on_connection_lost(self):
+        self._stop_reader()
+        self._stop_writer(ConnectionError("Spojení bylo ztraceno"))
+        self._fail_waiters(ConnectionError("Spojení bylo ztraceno"))
+        if self._ser is not None:
+            try:
+                self._ser.close()
+            except Exception:
+                pass
+            self._ser = None
+        if self._connection_lost_callback:
+            self._connection_lost_callback()
@@ -0,0 +1,175 @@
+"""
+App/core/binary_protocol.py
+Binární datové rámce (SET FORMAT BIN), viz SerialProtocol::sendDataBinary.
+
+Rámec:  0xA5 0x5A | LEN | t_ms (uint32 LE) | N x float32 LE | CHK
+  LEN = 4 + 4*N, CHK = XOR bajtů LEN a payloadu.
+Pořadí kanálů je pevné (FIXED_CHANNELS), za nimi následují Dallasy T_DS0...
+
+Hodnoty se po dekódování zaokrouhlí na stejný počet desetinných míst, jaký
+posílá JSON (teploty 4, napětí 2), aby oba formáty exportovaly stejná čísla
+a float32 se neukazoval jako 22.002412796020508.
+"""
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+SYNC0 = 0xA5
+SYNC1 = 0x5A
+HEADER_SIZE = 3          # SYNC0, SYNC1, LEN
+
+FIXED_CHANNELS = ("T_TMP", "T_BME", "V_ADS_R", "V_ADS_NTC", "V_ESP_R", "V_ESP_NTC")
+
+# Desetinná místa podle SerialProtocol::sendData (Serial.print(t, 4), Serial.print(v, 2))
+JSON_DIGITS_TEMP = 4
+JSON_DIGITS_VOLT = 2
+
+_channel_cache: Dict[int, Tuple[str, ...]] = {}
+_digits_cache: Dict[int, Tuple[int, ...]] = {}
+_scale_cache: Dict[int, Tuple[float, ...]] = {}
+_struct_cache: Dict[int, struct.Struct] = {}
+
+
+def channel_names(n_channels: int) -> Tuple[str, ...]:
+    """Názvy kanálů pro rámec s n_channels hodnotami."""
+    names = _channel_cache.get(n_channels)
+    if names is None:
+        extra = tuple(f"T_DS{i}" for i in range(max(0, n_channels - len(FIXED_CHANNELS))))
+        names = (FIXED_CHANNELS + extra)[:n_channels]
+        _channel_cache[n_channels] = names
+    return names
+
+
+def channel_digits(n_channels: int) -> Tuple[int, ...]:
+    """Počet desetinných míst, se kterým JSON posílá jednotlivé kanály."""
+    digits = _digits_cache.get(n_channels)
+    if digits is None:
+        digits = tuple(JSON_DIGITS_VOLT if name.startswith("V_") else JSON_DIGITS_TEMP
+                       for name in channel_names(n_channels))
+        _digits_cache[n_channels] = digits
+    return digits
+
+
+def _payload_struct(length: int) -> struct.Struct:
+    st = _struct_cache.get(length)
+    if st is None:
+        st = struct.Struct(f"<I{(length - 4) // 4}f")
+        _struct_cache[length] = st
+    return st
+
+
+def checksum(length: int, payload) -> int:
+    """XOR bajtu LEN a všech bajtů payloadu."""
+    # Místo smyčky přes bajty skládáme celé číslo napůl (XOR zachová bajtové pozice)
+    x = int.from_bytes(payload, "little")
+    n_bytes = len(payload)
+    while n_bytes > 1:
+        half = (n_bytes + 1) // 2
+        x = (x >> (half * 8)) ^ (x & ((1 << (half * 8)) - 1))
+        n_bytes = half
+    return (x ^ length) & 0xFF
+
+
+def is_valid_length(length: int) -> bool:
+    return length >= 4 and (length - 4) % 4 == 0
+
+
+def encode_frame(t_ms: int, values: List[Optional[float]]) -> bytes:
+    """Sestaví rámec (pro emulátor a benchmarky). None se kóduje jako NaN."""
+    length = 4 + 4 * len(values)
+    payload = _payload_struct(length).pack(
+        t_ms & 0xFFFFFFFF, *[float("nan") if v is None else v for v in values]
+    )
+    return bytes((SYNC0, SYNC1, length)) + payload + bytes((checksum(length, payload),))
+
+
+def decode_payload(payload) -> dict:
+    """
+    Dekóduje payload rámce na stejný slovník, jaký dává JSON zpráva "data".
+    NaN -> None (stejně jako "null" v JSON), takže extract_data_values je vynechá.
+    """
+    fields = _payload_struct(len(payload)).unpack(payload)
+    n_ch = len(fields) - 1
+    msg = {"type": "data", "t_ms": fields[0]}
+    for name, scale, val in zip(channel_names(n_ch), _channel_scales(n_ch), fields[1:]):
+        # round(x * 10^d) / 10^d dá stejný double jako float("22.0024"), ale
+        # je znatelně rychlejší než round(x, d)
+        msg[name] = None if val != val else round(val * scale) / scale
+    return msg
+
+
+def _channel_scales(n_channels: int) -> Tuple[float, ...]:
+    scales = _scale_cache.get(n_channels)
+    if scales is None:
+        scales = tuple(10.0 ** d for d in channel_digits(n_channels))
+        _scale_cache[n_channels] = scales
+    return scales
+
+
+def _round_column(values: np.ndarray, digits: int) -> np.ndarray:
+    return np.round(values.astype(np.float64), digits)
+
+
+def decode_frames_columnar(data: bytes) -> Tuple[np.ndarray, Dict[str, np.ndarray], int]:
+    """
+    Dekóduje souvislý blok rámců do sloupců (t_ms, {kanál: float64 pole}).
+    Hodnoty jsou zaokrouhlené stejně jako v decode_payload.
+    Vrací i počet přeskočených bajtů (šum, chybný checksum, neúplný konec).
+
+    Pokud mají všechny rámce stejnou délku (běžný případ), proběhne dekódování
+    a kontrola checksumu vektorově přes NumPy, jinak po rámcích.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if len(buf) >= HEADER_SIZE and buf[0] == SYNC0 and buf[1] == SYNC1 and is_valid_length(int(buf[2])):
+        length = int(buf[2])
+        frame_size = HEADER_SIZE + length + 1
+        n = len(buf) // frame_size
+        frames = buf[:n * frame_size].reshape(n, frame_size)
+        if n and (frames[:, 0] == SYNC0).all() and (frames[:, 1] == SYNC1).all() and (frames[:, 2] == length).all():
+            chk_ok = np.bitwise_xor.reduce(frames[:, 2:], axis=1) == 0
+            if chk_ok.all() and len(buf) == n * frame_size:
+                n_ch = (length - 4) // 4
+                rec = np.dtype([("sync", "u1", 2), ("len", "u1"), ("t_ms", "<u4"),
+                                ("v", "<f4", (n_ch,)), ("chk", "u1")])
+                arr = np.frombuffer(data, dtype=rec)
+                cols = {name: _round_column(arr["v"][:, i], digits)
+                        for i, (name, digits) in enumerate(zip(channel_names(n_ch), channel_digits(n_ch)))}
+                return arr["t_ms"], cols, 0
+
+    return _decode_frames_slow(data)
+
+
+def _decode_frames_slow(data: bytes) -> Tuple[np.ndarray, Dict[str, np.ndarray], int]:
+    view = memoryview(data)
+    t_list: List[int] = []
+    rows: List[dict] = []
+    skipped = 0
+    pos, end = 0, len(data)
+    while pos + HEADER_SIZE <= end:
+        if data[pos] != SYNC0 or data[pos + 1] != SYNC1 or not is_valid_length(data[pos + 2]):
+            pos += 1
+            skipped += 1
+            continue
+        length = data[pos + 2]
+        stop = pos + HEADER_SIZE + length
+        if stop + 1 > end:
+            break
+        payload = view[pos + HEADER_SIZE:stop]
+        if checksum(length, payload) != data[stop]:
+            pos += 1
+            skipped += 1
+            continue
+        fields = _payload_struct(length).unpack(payload)
+        t_list.append(fields[0])
+        rows.append(dict(zip(channel_names(len(fields) - 1), fields[1:])))
+        pos = stop + 1
+    skipped += end - pos
+
+    names: Tuple[str, ...] = ()
+    for row in rows:
+        if len(row) > len(names):
+            names = tuple(row.keys())
+    cols = {name: _round_column(np.array([row.get(name, np.nan) for row in rows], dtype=np.float32), digits)
+            for name, digits in zip(names, channel_digits(len(names)))}
+    return np.array(t_list, dtype=np.uint32), cols, skipped
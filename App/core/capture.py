@@ -0,0 +1,112 @@
+"""
+App/core/capture.py
+Záznam (capture) komunikace se sériovou linkou do souboru a jeho čtení.
+
+Formát je textový, jeden záznam na řádek:
+    <t_us> <směr> <text>
+  t_us  ... mikrosekundy od začátku záznamu (time.monotonic hostitele)
+  směr  ... '<' přijato z ESP, '>' odesláno do ESP
+  text  ... řádek protokolu; binární rámce se ukládají jako JSON zpráva "data"
+Řádky přijaté jedním čtením mají stejné t_us, takže replay zachová i dávkování.
+Soubor s příponou .gz se komprimuje gzipem.
+"""
+import gzip
+import json
+import threading
+import time
+from typing import IO, Iterator, List, Optional, Tuple, Union
+
+from core.parser import ColumnarBatch, parse_lines_columnar
+
+CAPTURE_MAGIC = "# temp-lab capture v1"
+
+RX = "<"
+TX = ">"
+
+
+def _open_text(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="\n")
+    return open(path, mode, encoding="utf-8", newline="\n")
+
+
+def _open_binary(path: str) -> IO[bytes]:
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+class CaptureWriter:
+    """Zapisuje přijaté i odeslané řádky s časovou značkou. Bezpečné pro více vláken."""
+
+    def __init__(self, path: str, port: str = ""):
+        self.path = path
+        self._f = _open_text(path, "w")
+        self._lock = threading.Lock()
+        self._t0 = time.monotonic()
+        self.records = 0
+        started = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._f.write(f"{CAPTURE_MAGIC} started={started} port={port}\n")
+
+    def write_rx(self, lines: List[Union[str, dict]], t_mono: Optional[float] = None):
+        self._write(RX, lines, t_mono)
+
+    def write_tx(self, text: str, t_mono: Optional[float] = None):
+        self._write(TX, [text.strip()], t_mono)
+
+    def close(self):
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+
+    def _write(self, direction: str, lines, t_mono: Optional[float]):
+        t_us = int(((time.monotonic() if t_mono is None else t_mono) - self._t0) * 1e6)
+        prefix = f"{t_us} {direction} "
+        out = []
+        for text in lines:
+            if isinstance(text, dict):
+                text = json.dumps(text, separators=(",", ":"))
+            elif "\n" in text:
+                text = text.replace("\n", " ")
+            out.append(prefix + text + "\n")
+        with self._lock:
+            if self._f is not None:
+                self._f.write("".join(out))
+                self.records += len(out)
+
+
+def read_capture(path: str) -> Iterator[Tuple[float, str, str]]:
+    """Vrací záznamy (t_s, směr, text) v pořadí, v jakém byly zapsány."""
+    with _open_text(path, "r") as f:
+        first = f.readline()
+        if not first.startswith(CAPTURE_MAGIC):
+            raise ValueError(f"{path}: není capture soubor Temp-Lab")
+        for raw in f:
+            parts = raw.rstrip("\n").split(" ", 2)
+            if len(parts) < 3 or parts[1] not in (RX, TX):
+                continue
+            try:
+                t_s = int(parts[0]) / 1e6
+            except ValueError:
+                continue
+            yield t_s, parts[1], parts[2]
+
+
+def read_capture_columnar(path: str, batch_lines: int = 200_000) -> Iterator[ColumnarBatch]:
+    """
+    Přijaté řádky záznamu po dávkách převedené na sloupce (parse_lines_columnar).
+    Pro import dlouhých záznamů bez slovníku na každý vzorek.
+    """
+    rx = RX.encode()
+    with _open_binary(path) as f:
+        if not f.readline().startswith(CAPTURE_MAGIC.encode()):
+            raise ValueError(f"{path}: není capture soubor Temp-Lab")
+        pending: List[bytes] = []
+        for raw in f:
+            parts = raw.rstrip(b"\r\n").split(b" ", 2)
+            if len(parts) == 3 and parts[1] == rx:
+                pending.append(parts[2])
+                if len(pending) >= batch_lines:
+                    yield parse_lines_columnar(pending)
+                    pending = []
+        if pending:
+            yield parse_lines_columnar(pending)
@@ -0,0 +1,185 @@
+"""
+App/core/command_channel.py
+Příkazy pro ESP32 s potvrzením (ack).
+
+Firmware odpovídá na každý příkaz zprávou {"type":"ack","cmd":...}
+(viz CommandDispatcher::apply). CommandChannel odešle příkazy hned za sebou,
+páruje je s potvrzeními v pořadí odeslání a měří dobu odezvy.
+Zpráva {"type":"error"} nebo chybějící ack končí výjimkou CommandError;
+chyba se přiřadí podle pole "cmd" (stejné jméno jako v ack), bez něj nejstaršímu příkazu.
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+from core.parser import parse_json_message
+
+# Příkaz -> hodnota "cmd" v potvrzení. PING firmware nepotvrzuje.
+ACK_NAMES = {
+    "START": "start",
+    "STOP": "stop",
+    "SET RATE": "set_rate",
+    "SET PWM": "set_pwm",
+    "SET FILTER": "set_filter",
+    "SET FORMAT": "set_format",
+}
+
+
+def expected_ack(command: str) -> Optional[str]:
+    """Vrátí název potvrzení, které firmware na příkaz pošle (nebo None)."""
+    up = command.strip().upper()
+    for prefix, ack in ACK_NAMES.items():
+        if up == prefix or up.startswith(prefix + " "):
+            return ack
+    return None
+
+
+class CommandError(Exception):
+    """Příkaz byl odmítnut (zpráva "error") nebo nebyl potvrzen včas."""
+
+
+@dataclass
+class CommandResult:
+    command: str
+    ack: Optional[dict]
+    rtt_s: float
+
+
+class _Pending:
+    __slots__ = ("command", "ack_name", "t_sent", "ack", "error", "rtt_s")
+
+    def __init__(self, command: str, ack_name: str):
+        self.command = command
+        self.ack_name = ack_name
+        self.t_sent = 0.0
+        self.ack: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.rtt_s = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.ack is not None or self.error is not None
+
+
+class CommandChannel:
+    def __init__(self, serial_mgr, ack_timeout: float = 1.0):
+        self._serial = serial_mgr
+        self.ack_timeout = ack_timeout
+        self._cond = threading.Condition()
+        self._pending: Deque[_Pending] = deque()
+        self._stats: Dict[str, List[float]] = {}   # ack -> [count, sum, max, last]
+        self._closed = False
+        serial_mgr.add_line_listener(self._on_lines)
+
+    def close(self):
+        """Odregistruje se ze SerialManageru a ukončí čekající příkazy."""
+        if self._closed:
+            return
+        self._closed = True
+        self._serial.remove_line_listener(self._on_lines)
+        with self._cond:
+            for p in self._pending:
+                p.error = "kanál uzavřen"
+            self._pending.clear()
+            self._cond.notify_all()
+
+    def send(self, command: str, timeout: Optional[float] = None) -> CommandResult:
+        return self.pipeline([command], timeout)[0]
+
+    def pipeline(self, commands: List[str], timeout: Optional[float] = None) -> List[CommandResult]:
+        """
+        Odešle všechny příkazy bez čekání mezi nimi a pak počká na jejich potvrzení.
+        Vrací výsledky ve stejném pořadí, při chybě vyhodí CommandError hned.
+        """
+        if self._closed:
+            raise CommandError("Kanál příkazů je uzavřen")
+        timeout = self.ack_timeout if timeout is None else timeout
+
+        entries = []
+        with self._cond:
+            for cmd in commands:
+                ack_name = expected_ack(cmd)
+                p = _Pending(cmd, ack_name) if ack_name else None
+                if p is not None:
+                    self._pending.append(p)
+                entries.append((cmd, p))
+
+        for cmd, p in entries:
+            if p is not None:
+                p.t_sent = time.perf_counter()
+            self._serial.write_line(cmd)
+
+        waiting = [p for _, p in entries if p is not None]
+        try:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: any(p.error for p in waiting) or all(p.done for p in waiting),
+                    timeout,
+                )
+                for p in waiting:
+                    if p.error:
+                        raise CommandError(f"{p.command}: ESP hlásí chybu '{p.error}'")
+                for p in waiting:
+                    if p.ack is None:
+                        raise CommandError(f"{p.command}: bez potvrzení do {timeout:.2f} s")
+        finally:
+            with self._cond:
+                for p in waiting:
+                    if p in self._pending:
+                        self._pending.remove(p)
+
+        return [CommandResult(cmd, p.ack if p else None, p.rtt_s if p else 0.0) for cmd, p in entries]
+
+    def latency_stats(self) -> Dict[str, dict]:
+        """Statistika doby odezvy podle typu příkazu (v sekundách)."""
+        with self._cond:
+            return {
+                name: {"count": int(c), "mean_s": s / c, "max_s": m, "last_s": last}
+                for name, (c, s, m, last) in self._stats.items()
+            }
+
+    def _on_lines(self, lines: List[str], t_arrival: float):
+        if not self._pending:
+            return
+        now = time.perf_counter()
+        for text in lines:
+            # Levný předfiltr, datové řádky ani binární rámce nedekódujeme
+            if not isinstance(text, str) or ('"ack"' not in text and '"error"' not in text):
+                continue
+            msg = parse_json_message(text)
+            if msg is None:
+                continue
+            with self._cond:
+                if msg.get("type") == "ack":
+                    self._match_ack(msg, now)
+                elif msg.get("type") == "error" and self._pending:
+                    self._match_error(msg)
+                self._cond.notify_all()
+
+    def _match_error(self, msg: dict):
+        name = msg.get("cmd")
+        if name is None:
+            # Starší firmware chybu nepřiřazuje; příkazy zpracovává v pořadí -> patří nejstaršímu
+            p = self._pending.popleft()
+        else:
+            p = next((p for p in self._pending if p.ack_name == name), None)
+            if p is None:
+                return   # chyba k příkazu, na který nikdo nečeká
+            self._pending.remove(p)
+        p.error = str(msg.get("msg"))
+
+    def _match_ack(self, msg: dict, now: float):
+        name = msg.get("cmd")
+        for p in self._pending:
+            if p.ack_name == name:
+                p.ack = msg
+                p.rtt_s = now - p.t_sent
+                self._pending.remove(p)
+                st = self._stats.setdefault(name, [0, 0.0, 0.0, 0.0])
+                st[0] += 1
+                st[1] += p.rtt_s
+                st[2] = max(st[2], p.rtt_s)
+                st[3] = p.rtt_s
+                return
@@ -0,0 +1,91 @@
+"""
+App/core/csv_export.py
+Export naměřených dat do CSV pro český Excel (středník, desetinná čárka).
+
+Místo csv.DictWriter a slovníku na každý řádek se formátuje po blocích sloupců:
+hodnoty bloku se převedou na text jedním map(str, ...), řádky se složí přes
+zip + join a desetinné tečky i "nan" (chybějící hodnota -> prázdná buňka) se
+nahradí jednou operací nad celým blokem textu. Výstup je stejný jako dřív.
+
+Zdrojem je cokoli s rozhraním SampleStore: len(), source[0] a iter_chunks()
+(SampleStore v paměti i RunRecorder nad run souborem).
+Běží v libovolném vlákně; průběh hlásí callbackem, zrušit jde přes threading.Event.
+"""
+import os
+import threading
+from typing import Callable, Iterable, List, Optional, Set
+
+import numpy as np
+
+from core.sample_store import T_KEY
+
+BLOCK_ROWS = 65536
+LINE_END = "\r\n"   # stejně jako csv.writer
+
+
+class ExportCancelled(Exception):
+    """Export zrušil uživatel (rozpracovaný soubor se smaže)."""
+
+
+def export_fieldnames(first_row: Iterable[str], allowed_sensors: Optional[Set[str]] = None) -> List[str]:
+    """Sloupce podle prvního řádku, filtrované allowed_sensors, t_s vždy první."""
+    all_keys = list(first_row)
+    if allowed_sensors:
+        fieldnames = [k for k in all_keys if k == T_KEY or k in allowed_sensors]
+    else:
+        fieldnames = all_keys
+    if T_KEY in fieldnames:
+        fieldnames.remove(T_KEY)
+        fieldnames.insert(0, T_KEY)
+    return fieldnames
+
+
+def format_block(t_s: np.ndarray, columns: dict, fieldnames: List[str]) -> str:
+    """Blok řádků CSV (včetně konců řádků) z jednoho bloku sloupců."""
+    n = len(t_s)
+    cells = []
+    for key in fieldnames:
+        src = t_s if key == T_KEY else columns.get(key)
+        cells.append(list(map(str, src.tolist())) if src is not None else [""] * n)
+    text = LINE_END.join(map(";".join, zip(*cells))) + LINE_END
+    # Trik pro český Excel: 10.5 -> 10,5; NaN = hodnota chybí -> prázdná buňka
+    return text.replace("nan", "").replace(".", ",")
+
+
+def export_csv(filename: str, source, allowed_sensors: Optional[Set[str]] = None,
+               progress: Optional[Callable[[float], None]] = None,
+               cancel: Optional[threading.Event] = None,
+               block_rows: int = BLOCK_ROWS) -> int:
+    """
+    Zapíše data ze source do filename a vrátí počet řádků.
+    Píše se do dočasného souboru, který se na konci přejmenuje, takže zrušený
+    nebo selhaný export nepřepíše existující soubor. Zrušení -> ExportCancelled.
+    """
+    total = len(source)
+    if not total:
+        return 0
+    fieldnames = export_fieldnames(source[0].keys(), allowed_sensors)
+
+    tmp = filename + ".part"
+    written = 0
+    try:
+        with open(tmp, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+            f.write(";".join(fieldnames) + LINE_END)
+            for t_s, columns in source.iter_chunks():
+                for start in range(0, len(t_s), block_rows):
+                    if cancel is not None and cancel.is_set():
+                        raise ExportCancelled()
+                    stop = start + block_rows
+                    block = {k: c[start:stop] for k, c in columns.items()}
+                    f.write(format_block(t_s[start:stop], block, fieldnames))
+                    written += min(stop, len(t_s)) - start
+                    if progress:
+                        progress(written / total)
+        os.replace(tmp, filename)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return written
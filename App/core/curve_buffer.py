@@ -0,0 +1,73 @@
+"""
+App/core/curve_buffer.py
+Body jedné křivky grafu v předalokovaných polích NumPy.
+
+Kapacita se zdvojuje, takže append je amortizovaně O(1). x a y jsou pohledy
+na platnou část polí bez kopie: pyqtgraph je v setData převezme přímo a nemusí
+při každém překreslení převádět seznam floatů na pole. Až do clear() se zapsaná
+část polí nemění (append píše za konec, růst alokuje nová pole), předané pohledy
+tedy zůstávají platné.
+"""
+import numpy as np
+
+INITIAL_CAPACITY = 1024
+
+
+class CurveBuffer:
+    __slots__ = ("_x", "_y", "_n")
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self._x = np.empty(capacity, dtype=np.float64)
+        self._y = np.empty(capacity, dtype=np.float64)
+        self._n = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def x(self) -> np.ndarray:
+        return self._x[:self._n]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self._y[:self._n]
+
+    @property
+    def nbytes(self) -> int:
+        return self._x.nbytes + self._y.nbytes
+
+    def append(self, x: float, y: float):
+        n = self._n
+        if n == len(self._x):
+            self._grow(n + 1)
+        self._x[n] = x
+        self._y[n] = y
+        self._n = n + 1
+
+    def extend(self, xs: np.ndarray, ys: np.ndarray):
+        count = len(xs)
+        n = self._n
+        if n + count > len(self._x):
+            self._grow(n + count)
+        self._x[n:n + count] = xs
+        self._y[n:n + count] = ys
+        self._n = n + count
+
+    def clear(self):
+        """Vyprázdní buffer; velká pole z dlouhého měření se uvolní."""
+        if len(self._x) > INITIAL_CAPACITY:
+            self._x = np.empty(INITIAL_CAPACITY, dtype=np.float64)
+            self._y = np.empty(INITIAL_CAPACITY, dtype=np.float64)
+        self._n = 0
+
+    def _grow(self, needed: int):
+        capacity = max(len(self._x), 16)
+        while capacity < needed:
+            capacity *= 2
+        n = self._n
+        x = np.empty(capacity, dtype=np.float64)
+        y = np.empty(capacity, dtype=np.float64)
+        x[:n] = self._x[:n]
+        y[:n] = self._y[:n]
+        self._x = x
+        self._y = y
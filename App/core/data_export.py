@@ -0,0 +1,260 @@
+"""
+App/core/data_export.py
+Export pro analýzu se zachovanými typy: Parquet a Arrow IPC/Feather, je-li
+nainstalován pyarrow, jinak komprimovaný NumPy archiv (.npz, jen numpy).
+
+Formát se volí podle přípony souboru (export_file), .csv jde dál přes core.csv_export.
+Sloupce jsou t_s a kanály float64 (chybějící hodnota = NaN), filtr allowed_sensors
+je stejný jako u CSV. Názvy a jednotky kanálů (core.sensors) jsou v metadatech:
+  - Parquet/Feather: metadata každého pole {"name", "unit"} a metadata schématu
+    "temp_lab" (JSON: kanály, metadata run souboru, čas exportu),
+  - .npz: pole "meta" s týmž JSON (načte se i s allow_pickle=False).
+
+Data se čtou po blocích (iter_chunks zdroje) a zapisují po skupinách řádků
+(row groups / record batches), v paměti je vždy jen jeden blok. Jako u CSV se píše
+do dočasného souboru a po dokončení přejmenuje; zrušení -> ExportCancelled.
+"""
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from core.csv_export import ExportCancelled, export_csv
+from core.run_recorder import channel_info
+from core.sample_store import T_KEY
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:   # volitelná závislost
+    pa = None
+    pq = None
+
+ROW_GROUP_ROWS = 131072
+META_KEY = "temp_lab"
+
+# přípona -> formát
+FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".npz": "npz",
+}
+ARROW_FORMATS = {"parquet", "feather"}
+
+Block = Tuple[np.ndarray, List[np.ndarray]]
+
+
+def has_pyarrow() -> bool:
+    return pa is not None
+
+
+def available_formats() -> List[Tuple[str, str]]:
+    """(popis, maska) formátů, které jdou v tomto prostředí zapsat (pro dialog Uložit)."""
+    formats = [("CSV pro Excel", "*.csv")]
+    if has_pyarrow():
+        formats += [("Parquet", "*.parquet"), ("Feather / Arrow IPC", "*.feather *.arrow")]
+    formats.append(("NumPy archiv", "*.npz"))
+    return formats
+
+
+def format_for_path(filename: str) -> Optional[str]:
+    """Formát podle přípony; None, pokud přípona není známá nebo chybí pyarrow."""
+    fmt = FORMATS.get(os.path.splitext(filename)[1].lower())
+    if fmt in ARROW_FORMATS and not has_pyarrow():
+        return None
+    return fmt
+
+
+def export_channels(source, allowed_sensors: Optional[Set[str]] = None) -> List[str]:
+    """Kanály zdroje (bez t_s) filtrované allowed_sensors."""
+    return [k for k in source.channels if k != T_KEY and (not allowed_sensors or k in allowed_sensors)]
+
+
+def export_metadata(source, channels: List[str]) -> dict:
+    """Popis souboru: kanály s názvy a jednotkami, metadata run souboru, čas exportu."""
+    info = {T_KEY: {"name": "Čas od startu", "unit": "s"}}
+    info.update(channel_info(channels))
+    return {
+        "channels": info,
+        "run": dict(getattr(source, "meta", None) or {}),
+        "exported": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def iter_blocks(source, channels: List[str], total: int, block_rows: int = ROW_GROUP_ROWS) -> Iterator[Block]:
+    """
+    Bloky po block_rows řádcích (poslední kratší) ze source.iter_chunks(): t_s a sloupce
+    v pořadí channels, kanál chybějící v chunku je NaN. Končí po total řádcích,
+    takže vzorky přidané během exportu se už nepřidají.
+    """
+    pieces: List[Block] = []
+    buffered = 0
+    remaining = total
+    for t_s, cols in source.iter_chunks():
+        if remaining <= 0:
+            break
+        n = min(len(t_s), remaining)
+        remaining -= n
+        start = 0
+        while start < n:
+            take = min(n - start, block_rows - buffered)
+            stop = start + take
+            nan = None
+            block_cols = []
+            for key in channels:
+                col = cols.get(key)
+                if col is None:
+                    if nan is None:
+                        nan = np.full(take, np.nan)
+                    col = nan
+                else:
+                    col = col[start:stop]
+                block_cols.append(col)
+            pieces.append((t_s[start:stop], block_cols))
+            buffered += take
+            start = stop
+            if buffered == block_rows:
+                yield _join(pieces)
+                pieces, buffered = [], 0
+    if pieces:
+        yield _join(pieces)
+
+
+def _join(pieces: List[Block]) -> Block:
+    if len(pieces) == 1:
+        t_s, cols = pieces[0]
+        return np.ascontiguousarray(t_s, np.float64), [np.ascontiguousarray(c, np.float64) for c in cols]
+    t_s = np.concatenate([p[0] for p in pieces]).astype(np.float64, copy=False)
+    cols = [np.concatenate([p[1][j] for p in pieces]).astype(np.float64, copy=False)
+            for j in range(len(pieces[0][1]))]
+    return t_s, cols
+
+
+def export_file(filename: str, source, allowed_sensors: Optional[Set[str]] = None,
+                progress: Optional[Callable[[float], None]] = None,
+                cancel: Optional[threading.Event] = None,
+                block_rows: int = ROW_GROUP_ROWS) -> int:
+    """
+    Zapíše data ze source ve formátu podle přípony filename a vrátí počet řádků.
+    Neznámá přípona (nebo Parquet/Feather bez pyarrow) -> ValueError.
+    """
+    fmt = format_for_path(filename)
+    if fmt is None:
+        raise ValueError(f"Nepodporovaný formát exportu: {filename}")
+    if fmt == "csv":
+        return export_csv(filename, source, allowed_sensors, progress, cancel)
+
+    total = len(source)
+    if not total:
+        return 0
+    channels = export_channels(source, allowed_sensors)
+    meta = export_metadata(source, channels)
+    writer = {"parquet": _write_parquet, "feather": _write_feather, "npz": _write_npz}[fmt]
+
+    tmp = filename + ".part"
+    try:
+        writer(tmp, source, channels, meta, total, block_rows, _Progress(progress, cancel, total))
+        os.replace(tmp, filename)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return total
+
+
+class _Progress:
+    """Hlášení průběhu a kontrola zrušení mezi bloky."""
+
+    def __init__(self, callback: Optional[Callable[[float], None]], cancel: Optional[threading.Event], total: int):
+        self.callback = callback
+        self.cancel = cancel
+        self.total = total
+        self.done = 0
+
+    def check(self):
+        if self.cancel is not None and self.cancel.is_set():
+            raise ExportCancelled()
+
+    def advance(self, rows: int):
+        self.done += rows
+        if self.callback:
+            self.callback(min(1.0, self.done / self.total))
+
+
+def _arrow_schema(channels: List[str], meta: dict):
+    fields = []
+    for key in [T_KEY] + channels:
+        info = meta["channels"][key]
+        fields.append(pa.field(key, pa.float64(), metadata={"name": info["name"], "unit": info["unit"]}))
+    return pa.schema(fields, metadata={META_KEY: json.dumps(meta, ensure_ascii=False)})
+
+
+def _write_arrow(write_batch, source, channels: List[str], schema, total: int, block_rows: int,
+                 progress: _Progress):
+    for t_s, cols in iter_blocks(source, channels, total, block_rows):
+        progress.check()
+        write_batch(pa.record_batch([pa.array(t_s)] + [pa.array(c) for c in cols], schema=schema))
+        progress.advance(len(t_s))
+
+
+def _write_parquet(path: str, source, channels: List[str], meta: dict, total: int, block_rows: int,
+                   progress: _Progress):
+    schema = _arrow_schema(channels, meta)
+    with pq.ParquetWriter(path, schema) as writer:
+        # jeden blok = jedna row group
+        _write_arrow(writer.write_batch, source, channels, schema, total, block_rows, progress)
+
+
+def _write_feather(path: str, source, channels: List[str], meta: dict, total: int, block_rows: int,
+                   progress: _Progress):
+    # Feather v2 je soubor Arrow IPC; komprese jako u pyarrow.feather (lz4, je-li k dispozici)
+    schema = _arrow_schema(channels, meta)
+    compression = "lz4" if pa.Codec.is_available("lz4") else None
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+        _write_arrow(writer.write_batch, source, channels, schema, total, block_rows, progress)
+
+
+def _write_npz(path: str, source, channels: List[str], meta: dict, total: int, block_rows: int,
+               progress: _Progress):
+    """
+    Jako np.savez_compressed, ale bez celého pole v paměti: každý sloupec je v zipu
+    jeden .npy, jehož hlavička (délka total) se zapíše předem a data po blocích.
+    Sloupce se píší postupně, zdroj se proto čte jednou pro každý sloupec.
+    """
+    keys = [T_KEY] + channels
+    progress.total = total * len(keys)
+    header = {"descr": np.dtype("<f8").str, "fortran_order": False, "shape": (total,)}
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        for j, key in enumerate(keys):
+            with zf.open(key + ".npy", "w", force_zip64=True) as out:
+                np.lib.format.write_array_header_1_0(out, header)
+                wanted = channels[j - 1:j] if j else []
+                for t_s, cols in iter_blocks(source, wanted, total, block_rows):
+                    progress.check()
+                    out.write((cols[0] if j else t_s).astype("<f8", copy=False).tobytes())
+                    progress.advance(len(t_s))
+        zf.writestr("meta.npy", _npy_bytes(np.array(json.dumps(meta, ensure_ascii=False))))
+
+
+def _npy_bytes(arr: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, arr, allow_pickle=False)
+    return buf.getvalue()
+
+
+def load_npz(path: str) -> Tuple[Dict[str, np.ndarray], dict]:
+    """Načte export .npz: (sloupce, metadata)."""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"])) if "meta" in data.files else {}
+        columns = {k: data[k] for k in data.files if k != "meta"}
+    return columns, meta
@@ -0,0 +1,237 @@
+"""
+App/core/device_pool.py
+Souběžná obsluha více ESP32 stanic (např. řada stejných měřicích pracovišť).
+
+Všechna zařízení běží na jedné sdílené smyčce asyncio (AsyncSerialManager),
+takže ani při 20+ deskách nevzniká vlákno na zařízení: čtení obsluhuje
+loop.add_reader a hlídání všech měření jeden periodický tick ve stejné smyčce.
+
+Každé zařízení má vlastní inventář senzorů (z "hello"), vlastní instanci měření
+a statistiku propustnosti. Vzorky ze všech zařízení jdou do jednoho callbacku
+jako [(device_id, t_s, values), ...].
+
+Callbacky se volají ve vlákně smyčky asyncio, GUI si je musí převést signálem.
+"""
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from core.async_serial_manager import AsyncSerialManager, get_shared_loop
+from core.parser import parse_hello_inventory
+from measurements.base import BaseMeasurement
+
+TaggedSample = Tuple[str, float, dict]
+
+
+class DeviceSession:
+    """Stav jednoho zařízení v poolu."""
+
+    def __init__(self, device_id: str, port: str, serial_mgr: AsyncSerialManager):
+        self.device_id = device_id
+        self.port = port
+        self.serial = serial_mgr
+        self.inventory: List[str] = []
+        self.hello: Optional[dict] = None
+        self.measurement: Optional[BaseMeasurement] = None
+        self.connected = False
+        self.handshake_s = 0.0
+
+        self.lines = 0
+        self.samples = 0
+        self.t_start = 0.0
+        self.t_last_sample = 0.0
+        self._rate_mark: Tuple[float, int] = (0.0, 0)   # (čas, samples) při posledním stats()
+
+    def _count_lines(self, lines: list, t_arrival: float):
+        self.lines += len(lines)
+
+
+class DevicePool:
+    TICK_S = 0.1   # perioda hlídání měření (stejně jako vlastní watchdog měření)
+
+    def __init__(self, measurement_cls: Type[BaseMeasurement],
+                 loop: Optional[asyncio.AbstractEventLoop] = None, **measurement_kwargs):
+        self._loop = loop or get_shared_loop()
+        self._measurement_cls = measurement_cls
+        self._measurement_kwargs = measurement_kwargs
+        self._sessions: Dict[str, DeviceSession] = {}
+        self._on_samples: Optional[Callable[[List[TaggedSample]], None]] = None
+        self._on_device_finished: Optional[Callable[[str], None]] = None
+        self._on_device_lost: Optional[Callable[[str], None]] = None
+        self._tick_handle: Optional[asyncio.Handle] = None
+
+    # --- Konfigurace ---
+
+    def set_sample_callback(self, cb: Optional[Callable[[List[TaggedSample]], None]]):
+        """cb([(device_id, t_s, values), ...]) pro každou dávku vzorků z libovolného zařízení."""
+        self._on_samples = cb
+
+    def set_device_finished_callback(self, cb: Optional[Callable[[str], None]]):
+        self._on_device_finished = cb
+
+    def set_device_lost_callback(self, cb: Optional[Callable[[str], None]]):
+        self._on_device_lost = cb
+
+    @property
+    def devices(self) -> List[DeviceSession]:
+        return list(self._sessions.values())
+
+    def get(self, device_id: str) -> Optional[DeviceSession]:
+        return self._sessions.get(device_id)
+
+    # --- Připojení ---
+
+    def add_devices(self, ports: List[str], handshake_timeout: float = 3.0) -> Dict[str, Optional[Exception]]:
+        """
+        Připojí všechna zařízení souběžně (resety i handshake běží paralelně).
+        Vrátí {port: None | výjimka}.
+        """
+        coro = self._add_many(ports, handshake_timeout)
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def add_device(self, port: str, handshake_timeout: float = 3.0) -> DeviceSession:
+        err = self.add_devices([port], handshake_timeout)[port]
+        if err is not None:
+            raise err
+        return self._sessions[port]
+
+    def remove_device(self, device_id: str):
+        session = self._sessions.pop(device_id, None)
+        if session is None:
+            return
+        if session.measurement:
+            session.measurement.stop()
+        session.serial.close()
+
+    def close(self):
+        self.stop_all()
+        for device_id in list(self._sessions):
+            self.remove_device(device_id)
+
+    async def _add_many(self, ports: List[str], handshake_timeout: float) -> Dict[str, Optional[Exception]]:
+        results = await asyncio.gather(
+            *(self._connect(port, handshake_timeout) for port in ports), return_exceptions=True
+        )
+        return {port: (r if isinstance(r, Exception) else None) for port, r in zip(ports, results)}
+
+    async def _connect(self, port: str, handshake_timeout: float):
+        if port in self._sessions:
+            return
+        serial_mgr = AsyncSerialManager(self._loop)
+        session = DeviceSession(port, port, serial_mgr)
+        t0 = time.perf_counter()
+        await serial_mgr.open_async(port)
+        try:
+            hello = await serial_mgr.wait_for_message("hello", timeout=handshake_timeout)
+        except Exception:
+            await serial_mgr.close_async()
+            raise
+        session.handshake_s = time.perf_counter() - t0
+        session.hello = hello
+        session.inventory = parse_hello_inventory(hello)
+        session.connected = True
+        serial_mgr.add_line_listener(session._count_lines)
+        serial_mgr.set_connection_lost_callback(lambda s=session: self._on_lost(s))
+        self._sessions[session.device_id] = session
+
+    # --- Měření ---
+
+    def start_all(self) -> Dict[str, bool]:
+        """
+        Spustí měření na všech připojených zařízeních. Volá se mimo smyčku asyncio
+        (start čeká na potvrzení příkazů). Vrátí {device_id: běží}.
+        """
+        started = {}
+        for session in self.devices:
+            if not session.connected:
+                started[session.device_id] = False
+                continue
+            started[session.device_id] = self._start_session(session)
+        self._ensure_tick()
+        return started
+
+    def stop_all(self):
+        for session in self.devices:
+            if session.measurement:
+                session.measurement.stop()
+
+    def _start_session(self, session: DeviceSession) -> bool:
+        meas = self._measurement_cls(session.serial, **self._measurement_kwargs)
+        meas.external_watchdog = True
+        device_id = session.device_id
+
+        def on_batch(samples, s=session):
+            s.samples += len(samples)
+            s.t_last_sample = time.time()
+            if self._on_samples:
+                self._on_samples([(device_id, t_s, values) for t_s, values in samples])
+
+        meas.set_callbacks(
+            on_data=lambda t_s, values: on_batch([(t_s, values)]),
+            on_progress=lambda fraction: None,
+            on_finished=lambda: self._on_finished(device_id),
+            on_batch=on_batch,
+            on_error=lambda msg: print(f"[{device_id}] {msg}"),
+        )
+        session.measurement = meas
+        session.samples = 0
+        session.t_start = time.time()
+        session._rate_mark = (session.t_start, 0)
+        session.serial.set_batch_callback(meas.handle_lines)
+        meas.start()
+        return meas.is_running()
+
+    def _ensure_tick(self):
+        if self._tick_handle is None:
+            self._tick_handle = self._loop.call_soon_threadsafe(self._tick)
+
+    def _tick(self):
+        """Jeden tick hlídá všechna běžící měření (místo vlákna na každé měření)."""
+        active = False
+        for session in list(self._sessions.values()):
+            meas = session.measurement
+            if meas is not None and hasattr(meas, "watchdog_tick"):
+                active = meas.watchdog_tick() or active
+        if active:
+            self._tick_handle = self._loop.call_later(self.TICK_S, self._tick)
+        else:
+            self._tick_handle = None
+
+    def _on_finished(self, device_id: str):
+        if self._on_device_finished:
+            self._on_device_finished(device_id)
+
+    def _on_lost(self, session: DeviceSession):
+        session.connected = False
+        if session.measurement:
+            session.measurement.stop()
+        if self._on_device_lost:
+            self._on_device_lost(session.device_id)
+
+    # --- Statistika ---
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Propustnost po zařízeních: celkové počty, průměrná rychlost od startu
+        a okamžitá rychlost od předchozího volání stats().
+        """
+        now = time.time()
+        out = {}
+        for s in self.devices:
+            elapsed = now - s.t_start if s.t_start else 0.0
+            t_mark, n_mark = s._rate_mark
+            dt = now - t_mark
+            out[s.device_id] = {
+                "port": s.port,
+                "connected": s.connected,
+                "running": bool(s.measurement and s.measurement.is_running()),
+                "inventory": list(s.inventory),
+                "handshake_s": s.handshake_s,
+                "lines": s.lines,
+                "samples": s.samples,
+                "samples_per_s": s.samples / elapsed if elapsed > 0 else 0.0,
+                "recent_samples_per_s": (s.samples - n_mark) / dt if s.t_start and dt > 0 else 0.0,
+                "last_sample_age_s": now - s.t_last_sample if s.t_last_sample else None,
+            }
+            s._rate_mark = (now, s.samples)
+        return out
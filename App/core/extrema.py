@@ -0,0 +1,93 @@
+"""
+App/core/extrema.py
+Průběžné minimum a maximum pro automatické škálování grafu.
+
+RunningExtrema drží min/max všech dosavadních hodnot (graf, který se jen natahuje),
+SlidingExtrema min/max za posledních window_s sekund přes monotónní fronty:
+každá hodnota se do fronty jednou přidá a nejvýš jednou odebere, takže přidání
+bodu stojí amortizovaně O(1) bez ohledu na délku měření.
+NaN (chybějící hodnota) se ignoruje.
+"""
+from collections import deque
+from typing import Deque, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class RunningExtrema:
+    __slots__ = ("lo", "hi")
+
+    def __init__(self):
+        self.lo = float("inf")
+        self.hi = float("-inf")
+
+    def push(self, t_s: float, value: float):
+        if value < self.lo:
+            self.lo = value
+        if value > self.hi:
+            self.hi = value
+
+    def extend(self, t_s: np.ndarray, values: np.ndarray):
+        finite = values[~np.isnan(values)]
+        if len(finite):
+            self.lo = min(self.lo, float(finite.min()))
+            self.hi = max(self.hi, float(finite.max()))
+
+    def range(self) -> Optional[Tuple[float, float]]:
+        return (self.lo, self.hi) if self.lo <= self.hi else None
+
+
+class SlidingExtrema:
+    __slots__ = ("window_s", "_min", "_max")
+
+    def __init__(self, window_s: float):
+        self.window_s = window_s
+        self._min: Deque[Tuple[float, float]] = deque()   # hodnoty rostou od začátku
+        self._max: Deque[Tuple[float, float]] = deque()   # hodnoty klesají od začátku
+
+    def push(self, t_s: float, value: float):
+        if value != value:   # NaN
+            self.expire(t_s)
+            return
+        q = self._min
+        while q and q[-1][1] >= value:
+            q.pop()
+        q.append((t_s, value))
+        q = self._max
+        while q and q[-1][1] <= value:
+            q.pop()
+        q.append((t_s, value))
+        self.expire(t_s)
+
+    def extend(self, t_s: np.ndarray, values: np.ndarray):
+        # do okna se vejde jen konec pole, starší body by se hned zahodily
+        start = int(np.searchsorted(t_s, t_s[-1] - self.window_s, "left")) if len(t_s) else 0
+        for t, v in zip(t_s[start:].tolist(), values[start:].tolist()):
+            self.push(t, v)
+        if len(t_s):
+            self.expire(float(t_s[-1]))
+
+    def expire(self, t_now: float):
+        """Zahodí body starší než t_now - window_s."""
+        t_from = t_now - self.window_s
+        for q in (self._min, self._max):
+            while q and q[0][0] < t_from:
+                q.popleft()
+
+    def range(self) -> Optional[Tuple[float, float]]:
+        if not self._min:
+            return None
+        return self._min[0][1], self._max[0][1]
+
+
+def combine(ranges: Iterable[Optional[Tuple[float, float]]]) -> Optional[Tuple[float, float]]:
+    """Společný rozsah více křivek (např. všech křivek na jedné ose)."""
+    lo = hi = None
+    for r in ranges:
+        if r is None:
+            continue
+        if lo is None or r[0] < lo:
+            lo = r[0]
+        if hi is None or r[1] > hi:
+            hi = r[1]
+    return None if lo is None else (lo, hi)
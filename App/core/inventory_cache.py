@@ -0,0 +1,58 @@
+"""
+App/core/inventory_cache.py
+Poslední známý inventář senzorů (zpráva "hello") pro každý port.
+
+Při připojení bez resetu (attach) lze UI zpřístupnit hned z uložené hodnoty
+a odpověď na INFO ji jen potvrdí nebo aktualizuje.
+Ukládá se do JSON souboru v domovské složce uživatele.
+"""
+import json
+import os
+import time
+from typing import Dict, Optional
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".temp-lab", "inventory_cache.json")
+
+
+class InventoryCache:
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._entries: Dict[str, dict] = {}
+        self._load()
+
+    def get(self, port: str) -> Optional[dict]:
+        """Vrátí uloženou zprávu hello pro port (nebo None)."""
+        entry = self._entries.get(port)
+        return dict(entry["hello"]) if entry else None
+
+    def put(self, port: str, hello: dict):
+        # Stavové položky z INFO (running, uptime...) neukládáme, jen inventář
+        inventory = {k: v for k, v in hello.items() if k not in ("running", "rate_hz", "uptime_ms")}
+        entry = self._entries.get(port)
+        if entry and entry["hello"] == inventory:
+            return
+        self._entries[port] = {"hello": inventory, "saved": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        self._save()
+
+    def forget(self, port: str):
+        if self._entries.pop(port, None) is not None:
+            self._save()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._entries = {k: v for k, v in data.items() if isinstance(v, dict) and "hello" in v}
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Nelze uložit cache inventáře: {e}")
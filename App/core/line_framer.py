@@ -0,0 +1,197 @@
+"""
+App/core/line_framer.py
+Skládání řádků z proudu bajtů ze sériové linky.
+
+Data se kopírují do jednoho předalokovaného bufferu, konce řádků se hledají
+pomocí offsetů a rozpracovaný (neúplný) řádek zůstává na místě mezi čteními.
+Buffer se posouvá až ve chvíli, kdy na jeho konci dojde místo, a jen o
+rozpracovaný řádek. Každý bajt se tak kopíruje nejvýše dvakrát bez ohledu
+na to, kolik řádků přijde v jednom bloku.
+
+Krátká čtení (při 115200 Bd typicky desítky až stovky bajtů) jdou rychlou
+cestou přes bytes.split, dokud je buffer prázdný: neúplný konec se drží jako
+malý bytes objekt a do bufferu se přesune, až když přeroste SMALL_READ nebo
+přijde velký blok.
+
+Po zapnutí binary (SET FORMAT BIN) rozpozná i binární datové rámce
+(core.binary_protocol) a vrací je rovnou jako slovník zprávy "data".
+"""
+from typing import List, Sequence, Union
+
+from core.binary_protocol import SYNC0, SYNC1, HEADER_SIZE, checksum, decode_payload, is_valid_length
+
+SMALL_READ = 512
+_NO_LINES = ()   # sdílený prázdný výsledek, ušetří alokaci seznamu na každé čtení bez konce řádku
+
+
+class LineFramer:
+    def __init__(self, capacity: int = 4096):
+        self._buf = bytearray(max(64, capacity))
+        self._view = memoryview(self._buf)
+        self._start = 0   # začátek rozpracovaného řádku
+        self._end = 0     # konec platných dat
+        self._scan = 0    # odsud ještě nebylo hledáno '\n'
+        self._small = b""  # neúplný řádek z rychlé cesty (buffer je přitom prázdný)
+        self._binary = False
+        self._fast = True  # textový režim a prázdný buffer -> rychlá cesta
+
+    @property
+    def binary(self) -> bool:
+        return self._binary
+
+    @binary.setter
+    def binary(self, enabled: bool):
+        self._binary = enabled
+        self._fast = not enabled and not self._end
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    @property
+    def pending(self) -> int:
+        """Počet bajtů neúplného řádku, který čeká na další data."""
+        return self._end - self._start + len(self._small)
+
+    def reset(self):
+        self._start = self._end = self._scan = 0
+        self._small = b""
+        self._fast = not self._binary
+
+    def feed(self, data: bytes) -> Sequence[Union[str, dict]]:
+        """
+        Přidá přijatý blok a vrátí všechny řádky, které jím byly dokončeny.
+        Prázdné řádky (po odstranění bílých znaků) vynechá.
+        V binárním režimu obsahuje výsledek i slovníky z binárních rámců.
+        """
+        if self._fast and len(data) <= SMALL_READ:
+            # '\n' se hledá jen v novém bloku, ne v celém rozpracovaném řádku
+            last = data.rfind(b"\n")
+            small = self._small
+            if last < 0:
+                small += data
+                if len(small) <= SMALL_READ:
+                    self._small = small
+                    return _NO_LINES
+                self._small = b""
+                self._fast = False
+                return self._feed_buffer(small, len(small))
+            if small:
+                data = small + data
+                last += len(small)
+            self._small = data[last + 1:]
+            if data.find(b"\n") == last:
+                # nejčastější případ: blok dokončil právě jeden řádek
+                text = data[:last].decode("utf-8", "ignore").strip()
+                return [text] if text else []
+            lines = []
+            for part in data[:last].split(b"\n"):
+                text = part.decode("utf-8", "ignore").strip()
+                if text:
+                    lines.append(text)
+            return lines
+
+        if self._small:
+            data = self._small + data
+            self._small = b""
+        elif not data:
+            return []
+        lines = self._feed_buffer(data, len(data))
+        self._fast = not self._binary and not self._end
+        return lines
+
+    def _feed_buffer(self, data: bytes, n: int) -> List[Union[str, dict]]:
+        if self._end + n > len(self._buf):
+            self._reserve(n)
+        end = self._end + n
+        self._view[self._end:end] = data
+        self._end = end
+
+        if self._binary:
+            return self._drain_mixed()
+
+        if b"\n" not in data:
+            # Řádek pokračuje -> jen si zapamatujeme, kde příště hledat
+            self._scan = end
+            return []
+
+        lines: List[str] = []
+        buf = self._buf
+        start = self._start
+
+        nl = buf.find(b"\n", self._scan, end)
+        while nl >= 0:
+            text = buf[start:nl].decode("utf-8", "ignore").strip()
+            if text:
+                lines.append(text)
+            start = nl + 1
+            nl = buf.find(b"\n", start, end)
+
+        if start == end:
+            # Vše zpracováno -> buffer začne znovu od nuly (bez kopírování)
+            self._start = self._end = self._scan = 0
+        else:
+            self._start = start
+            self._scan = end
+        return lines
+
+    def _drain_mixed(self) -> List[Union[str, dict]]:
+        """Zpracuje buffer, ve kterém se střídají textové řádky a binární rámce."""
+        items: List[Union[str, dict]] = []
+        buf = self._buf
+        start = self._start
+        end = self._end
+
+        while start < end:
+            if buf[start] == SYNC0:
+                if end - start < HEADER_SIZE:
+                    break
+                length = buf[start + 2]
+                if buf[start + 1] == SYNC1 and is_valid_length(length):
+                    stop = start + HEADER_SIZE + length
+                    if stop >= end:
+                        break  # neúplný rámec, počkáme na další data
+                    payload = self._view[start + HEADER_SIZE:stop]
+                    if checksum(length, payload) == buf[stop]:
+                        items.append(decode_payload(payload))
+                        start = stop + 1
+                        continue
+                # Šum nebo poškozený rámec -> posun o bajt a nová synchronizace
+                start += 1
+                continue
+
+            nl = buf.find(b"\n", start, end)
+            if nl < 0:
+                break
+            text = buf[start:nl].decode("utf-8", "ignore").strip()
+            if text:
+                items.append(text)
+            start = nl + 1
+
+        if start == end:
+            self._start = self._end = self._scan = 0
+        else:
+            self._start = self._scan = start
+        return items
+
+    def _reserve(self, n: int):
+        """Zajistí místo pro n bajtů za koncem platných dat."""
+        pending = self._end - self._start
+        needed = pending + n
+        if needed > len(self._buf):
+            # Řádek je delší než buffer -> zdvojnásobíme kapacitu
+            new_cap = len(self._buf)
+            while new_cap < needed:
+                new_cap *= 2
+            new_buf = bytearray(new_cap)
+            new_buf[:pending] = self._view[self._start:self._end]
+            self._view.release()
+            self._buf = new_buf
+            self._view = memoryview(new_buf)
+        else:
+            # Přesuneme jen rozpracovaný řádek na začátek
+            self._view[:pending] = self._view[self._start:self._end]
+
+        self._scan -= self._start
+        self._start = 0
+        self._end = pending
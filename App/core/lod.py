@@ -0,0 +1,157 @@
+"""
+App/core/lod.py
+Úrovně detailu pro dlouhé křivky grafu: pyramida min/max nad CurveBuffer.
+
+Úroveň 1 shrnuje po FACTOR bodech surových dat, úroveň 2 po FACTOR přihrádkách
+úrovně 1 atd. Každá přihrádka si pamatuje minimum a maximum i s jejich časem,
+takže decimovaná křivka (obálka min/max) zachová i jednobodové špičky.
+update() dopočítá jen nově dokončené přihrádky (amortizovaně O(1) na bod).
+
+render(x0, x1, max_points) vrátí pro viditelný rozsah nejvýš zhruba max_points
+bodů: pokud se surová data vejdou, jsou to pohledy bez kopie, jinak obálka
+z nejjemnější úrovně, která se do limitu vejde. Cena nezávisí na délce měření.
+Předpokládá neklesající x (čas měření).
+
+minmax_envelope() dělá totéž pro jeden úsek dat bez pyramidy (posuvný graf nad
+RingCurveBuffer): cena je úměrná délce úseku, ta je ale omezená kapacitou bufferu.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+from core.curve_buffer import CurveBuffer
+
+FACTOR = 4
+
+
+def _bins(x: np.ndarray, y: np.ndarray, size: int) -> Tuple[np.ndarray, ...]:
+    """(x, y) minim a (x, y) maxim přihrádek po size bodech; len(x) je násobek size."""
+    rows = np.arange(len(x) // size)
+    block = y.reshape(-1, size)
+    xb = x.reshape(-1, size)
+    i = block.argmin(axis=1)
+    j = block.argmax(axis=1)
+    return xb[rows, i], block[rows, i], xb[rows, j], block[rows, j]
+
+
+def _interleave(mx: np.ndarray, my: np.ndarray, Mx: np.ndarray, My: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Minimum a maximum každé přihrádky za sebou v pořadí podle času."""
+    min_first = mx <= Mx
+    out_x = np.empty(2 * len(mx))
+    out_y = np.empty(2 * len(mx))
+    out_x[0::2] = np.where(min_first, mx, Mx)
+    out_y[0::2] = np.where(min_first, my, My)
+    out_x[1::2] = np.where(min_first, Mx, mx)
+    out_y[1::2] = np.where(min_first, My, my)
+    return out_x, out_y
+
+
+def minmax_envelope(x: np.ndarray, y: np.ndarray, max_points: int,
+                    start_index: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Obálka min/max úseku x, y s nejvýš zhruba max_points body; vejde-li se úsek
+    celý, vrátí se beze změny. start_index je pořadí bodu x[0] od začátku měření:
+    hranice přihrádek se drží absolutních indexů, takže se při posouvání okna
+    nepřelévají body mezi přihrádkami a obálka neposkakuje.
+    """
+    n = len(x)
+    if n <= max_points:
+        return x, y
+    size = -(-2 * n // max_points)
+    head = min(n, (-start_index) % size)
+    body = head + (n - head) // size * size
+    parts = [_bins(x[head:body], y[head:body], size)]
+    if head:
+        parts.insert(0, _bins(x[:head], y[:head], head))
+    if body < n:
+        parts.append(_bins(x[body:], y[body:], n - body))
+    return _interleave(*(np.concatenate(p) for p in zip(*parts)))
+
+
+class _Level:
+    """Přihrádky jedné úrovně: (čas, hodnota) minim a (čas, hodnota) maxim."""
+    __slots__ = ("mins", "maxs")
+
+    def __init__(self):
+        self.mins = CurveBuffer()
+        self.maxs = CurveBuffer()
+
+    def __len__(self) -> int:
+        return len(self.mins)
+
+
+class MinMaxPyramid:
+    def __init__(self, data: CurveBuffer, factor: int = FACTOR):
+        self.data = data
+        self.factor = factor
+        self._levels: List[_Level] = []
+
+    def clear(self):
+        self._levels = []
+
+    @property
+    def n_levels(self) -> int:
+        return len(self._levels)
+
+    def update(self):
+        """Dopočítá přihrádky pro body přidané do data od minula."""
+        f = self.factor
+        min_x = max_x = self.data.x
+        min_y = max_y = self.data.y
+        for depth in range(64):
+            if len(min_y) < f:
+                break
+            if depth == len(self._levels):
+                self._levels.append(_Level())
+            level = self._levels[depth]
+            done = len(level)
+            avail = len(min_y) // f
+            if avail > done:
+                a, b = done * f, avail * f
+                mx, my, _, _ = _bins(min_x[a:b], min_y[a:b], f)
+                level.mins.extend(mx, my)
+                _, _, Mx, My = _bins(max_x[a:b], max_y[a:b], f)
+                level.maxs.extend(Mx, My)
+            else:
+                break   # nic nového, vyšší úrovně se také nezmění
+            min_x, min_y = level.mins.x, level.mins.y
+            max_x, max_y = level.maxs.x, level.maxs.y
+
+    def render(self, x0: float, x1: float, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Body křivky pro rozsah x0..x1 (včetně jednoho bodu za každým okrajem)."""
+        x = self.data.x
+        n = len(x)
+        i0 = max(0, int(np.searchsorted(x, x0, "left")) - 1)
+        i1 = min(n, int(np.searchsorted(x, x1, "right")) + 1)
+        count = i1 - i0
+        if count <= max_points or not self._levels:
+            return x[i0:i1], self.data.y[i0:i1]
+
+        # nejjemnější úroveň, jejíž přihrádky (2 body na přihrádku) se vejdou do limitu
+        depth = 0
+        size = self.factor
+        while depth + 1 < len(self._levels) and 2 * count / size > max_points:
+            depth += 1
+            size *= self.factor
+        xs: List[np.ndarray] = []
+        ys: List[np.ndarray] = []
+        self._emit(i0, i1, depth, size, xs, ys)
+        return np.concatenate(xs), np.concatenate(ys)
+
+    def _emit(self, i0: int, i1: int, depth: int, size: int, xs: List[np.ndarray], ys: List[np.ndarray]):
+        """Body pro surové indexy i0..i1 z úrovně depth; nedokončený konec z nižších úrovní."""
+        if depth < 0:
+            xs.append(self.data.x[i0:i1])
+            ys.append(self.data.y[i0:i1])
+            return
+        level = self._levels[depth]
+        b0 = i0 // size
+        b1 = min(-(-i1 // size), len(level))
+        if b1 > b0:
+            out_x, out_y = _interleave(level.mins.x[b0:b1], level.mins.y[b0:b1],
+                                       level.maxs.x[b0:b1], level.maxs.y[b0:b1])
+            xs.append(out_x)
+            ys.append(out_y)
+        rest = max(i0, b1 * size)
+        if rest < i1:
+            self._emit(rest, i1, depth - 1, size // self.factor, xs, ys)
@@ -1,7 +1,12 @@
+import os
+import threading
+import time
 from typing import Optional, Dict, Type, Set, Any
 from PySide6.QtCore import QObject, Signal
 
 from core.serial_manager import SerialManager
+from core.parser import parse_json_message
+from core.run_recorder import DEFAULT_RUNS_DIR, RunRecorder, prune_runs
 from measurements.base import BaseMeasurement
 from measurements.streaming_measurement import StreamingTempMeasurement
 from measurements.bme_dallas_slow import BmeDallasSlowMeasurement
@@ -11,6 +16,7 @@ from measurements.part_three import PartThreeMeasurement
 
 class MeasurementManager(QObject):
     data_received = Signal(float, dict)
+    batch_received = Signal(list)   # [(t_s, values), ...] z jednoho čtení sériovky
     progress_updated = Signal(float)
     finished = Signal()
     error_occurred = Signal(str)
@@ -19,6 +25,17 @@ class MeasurementManager(QObject):
         super().__init__()
         self._serial_mgr = serial_mgr
         self._current_measurement: Optional[BaseMeasurement] = None
+        self._resume_event = threading.Event()
+        self._resume_hello: Optional[dict] = None
+        # Každé měření se průběžně zapisuje do run souboru (přežije pád, paměť neroste);
+        # vypnout jde přepínačem v sidebaru, pak zůstávají data jen v paměti.
+        # Ve složce zůstane nejvýš runs_keep posledních záznamů o celkové velikosti runs_max_bytes.
+        self.record_runs = True
+        self.runs_dir: Optional[str] = DEFAULT_RUNS_DIR
+        self.runs_keep = 20
+        self.runs_max_bytes: Optional[int] = 2 * 1024 ** 3
+        self.runs_fsync = False
+        self.run_path: Optional[str] = None
         
         self._types = {
             PartOneMeasurement.DISPLAY_NAME: PartOneMeasurement,
@@ -53,10 +70,15 @@ class MeasurementManager(QObject):
             self._current_measurement.set_callbacks(
                 on_data=self._on_data_callback,
                 on_progress=self.progress_updated.emit,
-                on_finished=self.finished.emit
+                on_finished=self.finished.emit,
+                on_batch=self.batch_received.emit,
+                on_error=self.error_occurred.emit
             )
 
-            self._serial_mgr.set_line_callback(self._current_measurement.handle_line)
+            self._attach_recorder(type_name)
+
+            # Dávkové doručení: jeden průchod a jeden signál na blok přijatých řádků
+            self._serial_mgr.set_batch_callback(self._current_measurement.handle_lines)
             self._current_measurement.start()
             
         except TypeError as e:
@@ -67,12 +89,85 @@ class MeasurementManager(QObject):
     def stop_measurement(self):
         if self._current_measurement:
             self._current_measurement.stop()
+        # Probudí případné čekání na handshake ve vlákně obnovy spojení
+        self._resume_event.set()
+
+    def close_recorder(self):
+        """Dopíše a uzavře run soubor (např. při zavření okna během měření)."""
+        meas = self._current_measurement
+        if meas is not None and meas.recorder is not None:
+            meas.recorder.close()
+
+    def _attach_recorder(self, type_name: str):
+        self.run_path = None
+        if not self.record_runs or not self.runs_dir:
+            return
+        meas = self._current_measurement
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}_{type(meas).__name__}.tlrun"
+        path = os.path.join(self.runs_dir, name)
+        try:
+            recorder = RunRecorder(path, {"measurement": type_name}, fsync=self.runs_fsync)
+            recorder.on_error = self.error_occurred.emit
+            meas.set_recorder(recorder)
+            self.run_path = path
+        except OSError as e:
+            print(f"Nelze založit run soubor {path}, data zůstanou jen v paměti: {e}")
+            return
+        for old in prune_runs(self.runs_dir, self.runs_keep - 1, self.runs_max_bytes, exclude=[path]):
+            print(f"Smazán starý záznam {old}")
+
+    def prepare_resume(self):
+        """
+        Volá se hned po výpadku spojení (před znovuotevřením portu):
+        začne sledovat, zda se ESP ozve (hello po restartu nebo data),
+        a běžící měření naváže časovou osu už na první vzorek po obnově.
+        """
+        self._resume_event.clear()
+        self._resume_hello = None
+        meas = self._current_measurement
+        if meas and hasattr(meas, "prepare_resume"):
+            meas.prepare_resume()
+        self._serial_mgr.add_line_listener(self._watch_resume)
+
+    def resume_after_reconnect(self, downtime_s: float, handshake_timeout: float = 3.0) -> Optional[dict]:
+        """
+        Po znovuotevření portu počká na handshake a naváže běžící měření.
+        Blokuje, volá se z vlákna obnovy spojení. Vrátí zprávu hello (pokud přišla).
+        """
+        if not self._resume_event.wait(handshake_timeout):
+            print("Po obnově spojení nepřišel handshake, pokračuji bez něj")
+        self._serial_mgr.remove_line_listener(self._watch_resume)
+
+        meas = self._current_measurement
+        if meas and meas.is_running() and hasattr(meas, "resume"):
+            meas.resume(downtime_s)
+        return self._resume_hello
+
+    def _watch_resume(self, lines: list, t_arrival: float):
+        for text in lines:
+            msg = parse_json_message(text) if isinstance(text, dict) or text.startswith("{") else None
+            if msg is None:
+                continue
+            if msg.get("type") == "hello":
+                self._resume_hello = msg
+                self._resume_event.set()
+            elif msg.get("type") == "data":
+                # ESP nerestartovalo a pořád posílá data
+                self._resume_event.set()
+
+    def snapshot(self):
+        """Snímek dat aktuálního měření (viz BaseMeasurement.snapshot), jinak None."""
+        if not self._current_measurement:
+            return None
+        return self._current_measurement.snapshot()
 
-    def export_data(self, filename: str, allowed_sensors: Optional[Set[str]] = None) -> bool:
+    def export_data(self, filename: str, allowed_sensors: Optional[Set[str]] = None,
+                    progress=None, cancel: Optional[threading.Event] = None) -> bool:
+        """Export podle přípony souboru; lze volat z pracovního vlákna (progress callback, cancel Event)."""
         if not self._current_measurement: return False
         
-        if hasattr(self._current_measurement, "export_to_csv"):
-            return self._current_measurement.export_to_csv(filename, allowed_sensors)
+        if hasattr(self._current_measurement, "export_to_file"):
+            return self._current_measurement.export_to_file(filename, allowed_sensors, progress, cancel)
         return False
 
     def is_running(self) -> bool:
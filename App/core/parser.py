@@ -1,5 +1,9 @@
-from typing import Dict, Optional
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Pattern, Tuple, Union
 import json
+import re
+
+import numpy as np
 
 
 def parse_temp_line(line: str) -> Dict[str, float]:
@@ -32,11 +36,14 @@ def parse_temp_line(line: str) -> Dict[str, float]:
     return result
 
 
-def parse_json_message(line: str) -> Optional[dict]:
+def parse_json_message(line: Union[str, dict]) -> Optional[dict]:
     """
     Pokusí se dekódovat řádek jako JSON objekt.
     Očekává zprávy z SerialProtocol na ESP32.
+    Již dekódovaný binární rámec (dict z LineFramer) vrátí beze změny.
     """
+    if isinstance(line, dict):
+        return line
     try:
         obj = json.loads(line)
     except json.JSONDecodeError:
@@ -47,6 +54,34 @@ def parse_json_message(line: str) -> Optional[dict]:
     return None
 
 
+def parse_hello_inventory(msg: dict) -> List[str]:
+    """
+    Ze zprávy "hello" sestaví seznam senzorů, které ESP hlásí:
+      {"type":"hello","bme":true,"dallas":2,"adc":true,"tmp":true}
+      -> ["T_TMP", "T_BME", "V_ADS_R", "V_ADS_NTC", "V_ESP_R", "V_ESP_NTC", "T_DS0", "T_DS1"]
+    Názvy odpovídají klíčům, které ESP posílá v sendData.
+    """
+    sensors: List[str] = []
+
+    if str(msg.get("tmp")).lower() == "true":
+        sensors.append("T_TMP")
+
+    if str(msg.get("bme")).lower() == "true":
+        sensors.append("T_BME")
+
+    if str(msg.get("adc")).lower() == "true":
+        sensors.extend(["V_ADS_R", "V_ADS_NTC", "V_ESP_R", "V_ESP_NTC"])
+
+    try:
+        dallas_count = int(msg.get("dallas", 0))
+        for i in range(dallas_count):
+            sensors.append(f"T_DS{i}")
+    except (TypeError, ValueError):
+        pass
+
+    return sensors
+
+
 def extract_data_values(msg: dict) -> Dict[str, float]:
     """
     Z JSON zprávy typu "data" vytáhne numerické hodnoty senzorů.
@@ -71,3 +106,354 @@ def extract_data_values(msg: dict) -> Dict[str, float]:
             result[key] = float(val)
 
     return result
+
+
+def classify_message(line: Union[str, dict]) -> Optional[str]:
+    """
+    Vrátí "type" zprávy bez úplného dekódování JSON.
+    SerialProtocol posílá "type" vždy jako první klíč, takže stačí přečíst prefix;
+    jiný tvar řádku se dekóduje celý. Pro řádky, které nejsou JSON, vrací None.
+    """
+    if isinstance(line, dict):
+        return line.get("type")
+    if line.startswith('{"type":"'):
+        end = line.find('"', 9)
+        if end > 9:
+            return line[9:end]
+    if line.startswith("{"):
+        msg = parse_json_message(line)
+        return msg.get("type") if msg else None
+    return None
+
+
+# Hodnota v datové zprávě: číslo nebo null. Znakovou třídu místo plné gramatiky čísla
+# regex projde mnohem rychleji, tvar čísla pak ověří float().
+_VALUE = r"(null|[-+.\deE]+)"
+
+
+class DataLineParser:
+    """
+    Rychlé dekódování zpráv "data" se stálým pořadím klíčů (SerialProtocol::sendData).
+
+    Z první datové zprávy se naučí rozložení klíčů a sestaví pro něj regulární
+    výraz; další řádky se dekódují jedním match() bez json.loads a bez druhého
+    průchodu v extract_data_values. Řádek, který výrazu neodpovídá (jiné senzory,
+    jiný formát), se dekóduje obecně přes json.loads a rozložení se přeučí.
+    Pro řádky z firmware je výsledek stejný jako parse_json_message + extract_data_values.
+    """
+
+    def __init__(self):
+        self._regex: Optional[Pattern] = None
+        self._keys: Tuple[str, ...] = ()
+        self._compiled: Dict[Tuple[str, ...], Optional[Pattern]] = {}
+        self.fast_hits = 0
+        self.fallbacks = 0
+
+    def parse(self, line: Union[str, dict]) -> Optional[Tuple[Optional[float], Dict[str, float]]]:
+        """Vrátí (t_ms, hodnoty) pro zprávu "data", jinak None. t_ms je None, pokud chybí."""
+        rx = self._regex
+        if rx is not None and not isinstance(line, dict):
+            m = rx.match(line)
+            if m is not None:
+                g = m.groups()
+                try:
+                    if "null" in g:
+                        values = {k: float(v) for k, v in zip(self._keys, g[1:]) if v != "null"}
+                    else:
+                        values = dict(zip(self._keys, map(float, g[1:])))
+                    self.fast_hits += 1
+                    return int(g[0]), values
+                except ValueError:
+                    pass   # např. "1e" -> obecná cesta rozhodne stejně jako dřív
+
+        self.fallbacks += 1
+        msg = parse_json_message(line)
+        if msg is None or msg.get("type") != "data":
+            return None
+        if not isinstance(line, dict):
+            self._learn(line, msg)
+        t_ms = msg.get("t_ms")
+        return (t_ms if isinstance(t_ms, (int, float)) else None), extract_data_values(msg)
+
+    def _learn(self, line: str, msg: dict):
+        keys = tuple(msg.keys())
+        if keys in self._compiled:
+            rx = self._compiled[keys]
+        else:
+            rx = self._build(msg)
+            # Výraz musí sedět i na řádek, ze kterého vznikl (jinak je formát jiný, než čekáme)
+            if rx is not None and rx.match(line) is None:
+                rx = None
+            self._compiled[keys] = rx
+        self._regex = rx
+        self._keys = keys[2:] if rx is not None else ()
+
+    @staticmethod
+    def _build(msg: dict) -> Optional[Pattern]:
+        keys = list(msg.keys())
+        if keys[:2] != ["type", "t_ms"] or not isinstance(msg["t_ms"], int):
+            return None
+        parts = [r'\{"type":"data","t_ms":(\d+)']
+        for key in keys[2:]:
+            val = msg[key]
+            # Jen čísla a null, jinak by se výsledek lišil od extract_data_values
+            if isinstance(val, bool) or not (val is None or isinstance(val, (int, float))):
+                return None
+            parts.append(f',"{re.escape(key)}":{_VALUE}')
+        return re.compile("".join(parts) + r"\}$")
+
+
+# --- Dávkové (sloupcové) parsování velkých záznamů ---
+
+DATA_PREFIX = b'{"type":"data","t_ms":'
+_NUM_CHARS = b"0123456789.+-na"   # znaky čísel včetně "nan" (null se na něj přepíše)
+_TO_SPACE = bytes(c if c in _NUM_CHARS else 0x20 for c in range(256))
+_LEGACY_TO_SPACE = _TO_SPACE[:0x2C] + b"." + _TO_SPACE[0x2D:]   # desetinná čárka -> tečka
+
+
+@dataclass
+class ColumnarBatch:
+    """
+    Výsledek dávkového parseru: čas a jedno pole float64 na kanál, řádky odpovídají vzorkům.
+    Chybějící hodnota (null, nan, kanál chybí v řádku) je NaN; legacy formát nemá čas -> t_ms = NaN.
+    """
+    t_ms: np.ndarray
+    columns: Dict[str, np.ndarray] = field(default_factory=dict)
+    malformed: int = 0   # řádky, které nejsou platnou zprávou ani legacy daty (šum, useknutý řádek...)
+    other: int = 0       # platné zprávy jiného typu (ack, hello, error...)
+
+    def __len__(self) -> int:
+        return len(self.t_ms)
+
+    @classmethod
+    def concat(cls, batches: Iterable["ColumnarBatch"]) -> "ColumnarBatch":
+        batches = list(batches)
+        return _assemble([(b.t_ms, b.columns) for b in batches],
+                         sum(b.malformed for b in batches), sum(b.other for b in batches))
+
+
+def parse_lines_columnar(lines: Iterable[Union[str, bytes]]) -> ColumnarBatch:
+    """Dávková obdoba DataLineParser / parse_temp_line pro seznam řádků."""
+    return parse_buffer_columnar(b"\n".join(l.encode() if isinstance(l, str) else l for l in lines))
+
+
+def parse_buffer_columnar(data: bytes) -> ColumnarBatch:
+    """
+    Dekóduje blok celých řádků (JSON zprávy z SerialProtocol i legacy "T_BME=...;")
+    do sloupců. Úseky řádků se stejným rozložením se převádějí naráz: pár průchodů
+    bytes.replace/translate a jeden převod na pole NumPy přes celý úsek místo json.loads na řádek.
+    Úsek, který nejde převést naráz, se půlí a nakonec parsuje po řádcích.
+    """
+    data = data.replace(b"\r", b"")
+    block = data.strip(b"\n")
+    if block.startswith(DATA_PREFIX):
+        # Běžný případ: souvislý blok datových řádků -> bez dělení na řádky
+        n = block.count(b"\n") + 1
+        if block.count(DATA_PREFIX) == n:
+            piece = _parse_uniform(block, block[:block.find(b"\n")] if n > 1 else block, n)
+            if piece is not None:
+                return _assemble([piece], 0, 0)
+
+    lines = data.split(b"\n")
+    data_lines = [l for l in lines if l.startswith(DATA_PREFIX)]
+    malformed = other = 0
+    if len(data_lines) != len(lines) - lines.count(b""):
+        data_lines, malformed, other = _classify_lines(lines)
+    pieces: List[Tuple[np.ndarray, Dict[str, np.ndarray]]] = []
+    malformed += _parse_block(data_lines, pieces, 0)
+    return _assemble(pieces, malformed, other)
+
+
+def iter_columnar_chunks(f: BinaryIO, chunk_bytes: int = 8 << 20) -> Iterator[ColumnarBatch]:
+    """Čte binární soubor po blocích a vrací ColumnarBatch pro každý blok celých řádků."""
+    tail = b""
+    while True:
+        chunk = f.read(chunk_bytes)
+        if not chunk:
+            break
+        buf = tail + chunk if tail else chunk
+        cut = buf.rfind(b"\n")
+        if cut < 0:
+            tail = buf
+            continue
+        tail = buf[cut + 1:]
+        yield parse_buffer_columnar(buf[:cut])
+    if tail.strip():
+        yield parse_buffer_columnar(tail)
+
+
+_FAST_MIN_LINES = 64    # menší úseky se vyplatí rovnou po řádcích
+_FAST_MAX_SPLITS = 3    # kolikrát nejvýš úsek půlit, než se přejde na řádky
+
+
+def _decode(line: bytes) -> Optional[str]:
+    try:
+        return line.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def _classify_lines(lines: List[bytes]) -> Tuple[List[bytes], int, int]:
+    """Oddělí datové řádky od ostatních zpráv a šumu (pomalejší cesta pro smíšený obsah)."""
+    data_lines: List[bytes] = []
+    malformed = other = 0
+    for line in lines:
+        if line.startswith(DATA_PREFIX):
+            data_lines.append(line)
+        elif not line.strip():
+            continue
+        elif line.startswith(b"{"):
+            text = _decode(line)
+            msg = parse_json_message(text) if text is not None else None
+            if msg is None:
+                malformed += 1
+            elif msg.get("type") == "data":
+                data_lines.append(line)
+            else:
+                other += 1
+        elif b"T_BME" in line:
+            data_lines.append(line)
+        else:
+            malformed += 1
+    return data_lines, malformed, other
+
+
+def _parse_block(lines: List[bytes], pieces: list, depth: int) -> int:
+    """Přidá sloupce úseku do pieces, vrátí počet vadných řádků."""
+    if len(lines) >= _FAST_MIN_LINES:
+        piece = _parse_uniform(b"\n".join(lines), lines[0], len(lines))
+        if piece is not None:
+            pieces.append(piece)
+            return 0
+        if depth < _FAST_MAX_SPLITS and len(lines) >= 2 * _FAST_MIN_LINES:
+            mid = len(lines) // 2
+            return _parse_block(lines[:mid], pieces, depth + 1) + _parse_block(lines[mid:], pieces, depth + 1)
+    return _parse_per_line(lines, pieces)
+
+
+def _row_layout(line: bytes) -> Optional[Tuple[List[str], List[Tuple[int, float]], List[int], bool]]:
+    """
+    Rozložení tokenů jednoho řádku po převodu přes _TO_SPACE:
+    (klíče, [(index, hodnota)] tokenů pocházejících z názvů klíčů, indexy hodnot, legacy).
+    Tokeny z klíčů (např. 0 z T_DS0) slouží ke kontrole pořadí klíčů v každém řádku.
+    """
+    if line.startswith(DATA_PREFIX):
+        text = _decode(line)
+        msg = parse_json_message(text) if text is not None else None
+        if msg is None:
+            return None
+        keys = list(msg.keys())
+        if keys[:2] != ["type", "t_ms"] or isinstance(msg["t_ms"], bool) or not isinstance(msg["t_ms"], int):
+            return None
+        for key in keys[2:]:
+            val = msg[key]
+            if isinstance(val, bool) or not (val is None or isinstance(val, (int, float))):
+                return None
+        keys, n_tokens, legacy = keys[2:], 1, False   # token 0 = t_ms
+    else:
+        parts = [p.strip() for p in line.split(b";") if p.strip()]
+        if not parts or any(b"=" not in p for p in parts):
+            return None
+        keys = [_decode(p.split(b"=", 1)[0].strip()) or "" for p in parts]
+        if not all(keys) or len(set(keys)) != len(keys):
+            return None
+        n_tokens, legacy = 0, True
+
+    key_tokens: List[Tuple[int, float]] = []
+    value_idx: List[int] = []
+    for key in keys:
+        for tok in key.encode().translate(_TO_SPACE).split():
+            try:
+                key_tokens.append((n_tokens, float(tok)))
+            except ValueError:
+                return None   # název klíče obsahuje "n"/"a" apod., rychlá cesta by se v něm ztratila
+            n_tokens += 1
+        value_idx.append(n_tokens)
+        n_tokens += 1
+    return keys, key_tokens, value_idx, legacy
+
+
+def _parse_uniform(block: bytes, first: bytes, n: int) -> Optional[Tuple[np.ndarray, Dict[str, np.ndarray]]]:
+    """
+    Převede naráz n řádků spojených '\\n', pokud mají všechny stejné rozložení
+    jako první řádek (first); jinak None.
+    """
+    layout = _row_layout(first)
+    if layout is None:
+        return None
+    keys, key_tokens, value_idx, legacy = layout
+    n_tokens = value_idx[-1] + 1 if value_idx else 1
+
+    # Kostra (vše kromě číselných znaků) musí být ve všech řádcích stejná
+    row_skeleton = first.translate(None, _NUM_CHARS)
+    if block.translate(None, _NUM_CHARS) != b"\n".join([row_skeleton] * n):
+        return None
+
+    if legacy:
+        text = block.translate(_LEGACY_TO_SPACE)
+    else:
+        text = block.replace(DATA_PREFIX, b" ").replace(b"null", b"nan").translate(_TO_SPACE)
+    try:
+        values = np.array(text.split(), dtype=np.float64)
+    except ValueError:
+        return None   # nečíselný token (kostra sedí, ale hodnota ne, např. "1.2.3")
+    if values.size != n * n_tokens:
+        return None
+    table = values.reshape(n, n_tokens)
+    for idx, expected in key_tokens:
+        if not (table[:, idx] == expected).all():
+            return None   # jiné pořadí klíčů se stejnou kostrou (T_DS1 před T_DS0)
+
+    t_ms = np.full(n, np.nan) if legacy else table[:, 0].copy()
+    return t_ms, {key: table[:, idx].copy() for key, idx in zip(keys, value_idx)}
+
+
+def _parse_per_line(lines: List[bytes], pieces: list) -> int:
+    t_list: List[float] = []
+    rows: List[Dict[str, float]] = []
+    malformed = 0
+    for line in lines:
+        text = _decode(line)
+        if text is None:
+            malformed += 1
+            continue
+        if text.startswith("{"):
+            msg = parse_json_message(text)
+            if msg is None or msg.get("type") != "data":
+                malformed += 1
+                continue
+            t_ms = msg.get("t_ms")
+            t_list.append(float(t_ms) if isinstance(t_ms, (int, float)) and not isinstance(t_ms, bool) else np.nan)
+            rows.append(extract_data_values(msg))
+        else:
+            values = parse_temp_line(text)
+            if not values:
+                malformed += 1
+                continue
+            t_list.append(np.nan)
+            rows.append(values)
+    if rows:
+        names: Dict[str, None] = {}
+        for row in rows:
+            names.update(dict.fromkeys(row))
+        cols = {name: np.array([row.get(name, np.nan) for row in rows], dtype=np.float64) for name in names}
+        pieces.append((np.array(t_list, dtype=np.float64), cols))
+    return malformed
+
+
+def _assemble(pieces: List[Tuple[np.ndarray, Dict[str, np.ndarray]]], malformed: int, other: int) -> ColumnarBatch:
+    """Spojí úseky za sebe; kanál, který v úseku chybí, se doplní NaN."""
+    if not pieces:
+        return ColumnarBatch(np.empty(0), {}, malformed, other)
+    if len(pieces) == 1:
+        t_ms, cols = pieces[0]
+        return ColumnarBatch(t_ms, dict(cols), malformed, other)
+    names: Dict[str, None] = {}
+    for _, cols in pieces:
+        names.update(dict.fromkeys(cols))
+    t_ms = np.concatenate([t for t, _ in pieces])
+    columns = {
+        name: np.concatenate([cols[name] if name in cols else np.full(len(t), np.nan) for t, cols in pieces])
+        for name in names
+    }
+    return ColumnarBatch(t_ms, columns, malformed, other)
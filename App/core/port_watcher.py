@@ -0,0 +1,93 @@
+"""
+App/core/port_watcher.py
+Sledování připojení/odpojení sériových portů mimo GUI vlákno.
+
+Výčet portů (serial.tools.list_ports.comports) trvá na Linuxu s mnoha tty
+zařízeními desítky ms, proto běží ve vlastním vlákně. Na systémech s /dev
+se navíc výčet spouští jen tehdy, když se změní čas modifikace /dev
+(vznik/zánik uzlu zařízení), jinak se jen porovná jedno stat().
+Ven jdou pouze rozdíly jako signály ports_added / ports_removed.
+"""
+import os
+import threading
+from typing import Callable, List, Optional
+
+from PySide6.QtCore import QObject, Signal
+
+from core.serial_manager import SerialManager
+
+
+class PortWatcher(QObject):
+    ports_added = Signal(list)
+    ports_removed = Signal(list)
+
+    DEV_DIR = "/dev"
+
+    def __init__(self, port_provider: Optional[Callable[[], List[str]]] = None,
+                 interval_s: float = 1.0, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._provider = port_provider or SerialManager.list_ports
+        self.interval_s = interval_s
+        self._ports: List[str] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._dev_mtime: Optional[int] = None
+        self.scans = 0   # kolikrát opravdu proběhl výčet (pro ladění)
+
+    @property
+    def ports(self) -> List[str]:
+        return list(self._ports)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="port-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def rescan(self):
+        """Vynutí nový výčet při nejbližší kontrole (např. po ručním obnovení)."""
+        self._dev_mtime = None
+
+    def _run(self):
+        while True:
+            if self._changed():
+                self._scan()
+            if self._stop.wait(self.interval_s):
+                return
+
+    def _changed(self) -> bool:
+        # Vlastní zdroj portů (např. replay) ani systém bez /dev stat neumí -> výčet vždy
+        if self._provider is not SerialManager.list_ports or not os.path.isdir(self.DEV_DIR):
+            return True
+        try:
+            mtime = os.stat(self.DEV_DIR).st_mtime_ns
+        except OSError:
+            return True
+        if mtime == self._dev_mtime:
+            return False
+        self._dev_mtime = mtime
+        return True
+
+    def _scan(self):
+        try:
+            ports = self._provider()
+        except Exception as e:
+            print(f"Výčet portů selhal: {e}")
+            return
+        self.scans += 1
+        old = set(self._ports)
+        new = set(ports)
+        added = [p for p in ports if p not in old]
+        removed = [p for p in self._ports if p not in new]
+        self._ports = list(ports)
+        if removed and not self._stop.is_set():
+            self.ports_removed.emit(removed)
+        if added and not self._stop.is_set():
+            self.ports_added.emit(added)
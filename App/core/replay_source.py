@@ -0,0 +1,254 @@
+"""
+App/core/replay_source.py
+Přehrávání záznamu z core.capture místo skutečného ESP32.
+
+ReplaySerialSource má stejné rozhraní jako SerialManager, takže ho lze předat
+MeasurementManageru i MainWindow. Chování:
+  - open(): úvodní zprávy záznamu (hello) se přehrají, jakmile je nastaven
+    callback (nejpozději při START), vždy před daty -> handshake projde
+  - příkazy s potvrzením (SET RATE, START, ...) potvrdí hned vlastním ackem,
+    zaznamenané acky se nepřehrávají
+  - START spustí / STOP pozastaví přehrávání datové části záznamu
+  - speed: 1.0 = reálný čas, N = N-krát rychleji, 0 = co nejrychleji
+"""
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from core.capture import RX, read_capture
+from core.command_channel import expected_ack
+
+
+class ReplaySerialSource:
+    MAX_BATCH = 512        # max. řádků v jedné dávce při speed=0
+    MAX_SLEEP_S = 0.05     # jak často vlákno kontroluje STOP/close
+
+    def __init__(self, path: str, speed: float = 1.0):
+        self.path = path
+        self.speed = max(0.0, speed)
+        self._preamble: List[str] = []
+        self._preamble_pending: List[str] = []   # úvodní zprávy čekající na callback
+        self._outbox: List[str] = []             # odpovědi k doručení vláknem přehrávání
+        self._records: List[Tuple[float, str]] = []   # (t_s, řádek) od první datové zprávy
+        self._load()
+
+        self._open = False
+        self._playing = False
+        self._pos = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._line_callback: Optional[Callable[[str], None]] = None
+        self._batch_callback: Optional[Callable[[List[str], float], None]] = None
+        self._line_listeners: Tuple[Callable[[List[str], float], None], ...] = ()
+        self._connection_lost_callback: Optional[Callable[[], None]] = None
+        self.last_open_timings = {"open_s": 0.0, "reset_s": 0.0}
+
+    def _load(self):
+        in_data = False
+        for t_s, direction, text in read_capture(self.path):
+            if direction != RX or '"type":"ack"' in text:
+                continue
+            if not in_data and '"type":"data"' in text:
+                in_data = True
+            if in_data:
+                self._records.append((t_s, text))
+            else:
+                self._preamble.append(text)
+
+    @property
+    def total_lines(self) -> int:
+        return len(self._records)
+
+    @property
+    def position(self) -> int:
+        return self._pos
+
+    def list_ports(self) -> List[str]:
+        return [f"replay:{self.path}"]
+
+    def is_open(self) -> bool:
+        return self._open
+
+    def open(self, port: str = "", baudrate: int = 115200, timeout: float = 0.1, reset: bool = True):
+        self.close()
+        self._open = True
+        self._pos = 0
+        # Úvodní zprávy doručíme až po nastavení callbacku (MainWindow ho nastaví po open)
+        with self._cond:
+            self._preamble_pending = list(self._preamble)
+            self._outbox = []
+        self._thread = threading.Thread(target=self._play_loop, name="replay", daemon=True)
+        self._thread.start()
+        if self._line_callback or self._batch_callback:
+            self._release_preamble()
+
+    def close(self):
+        with self._cond:
+            self._open = False
+            self._playing = False
+            self._cond.notify_all()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def set_connection_lost_callback(self, cb: Optional[Callable[[], None]]):
+        self._connection_lost_callback = cb
+
+    def set_line_callback(self, cb: Optional[Callable[[str], None]]):
+        self._batch_callback = None
+        self._line_callback = cb
+        if cb is not None:
+            self._release_preamble()
+
+    def set_batch_callback(self, cb: Optional[Callable[[List[str], float], None]]):
+        self._line_callback = None
+        self._batch_callback = cb
+        if cb is not None:
+            self._release_preamble()
+
+    def set_binary_frames(self, enabled: bool):
+        # Binární rámce jsou v záznamu uložené jako JSON, není co přepínat
+        pass
+
+    def add_line_listener(self, cb: Callable[[List[str], float], None]):
+        self._line_listeners = self._line_listeners + (cb,)
+
+    def remove_line_listener(self, cb: Callable[[List[str], float], None]):
+        self._line_listeners = tuple(l for l in self._line_listeners if l != cb)
+
+    def start_capture(self, path: str):
+        raise RuntimeError("Záznam z přehrávání není podporován")
+
+    def stop_capture(self):
+        pass
+
+    def set_reconnect_policy(self, policy):
+        # Záznam se nemůže odpojit
+        pass
+
+    def set_reconnect_callbacks(self, on_reconnecting, on_reconnected):
+        pass
+
+    def reconnect_stats(self) -> dict:
+        return {"reconnects": 0, "attempts": 0, "downtime_s": 0.0, "last_downtime_s": 0.0, "reconnecting": False}
+
+    def write(self, data: str):
+        if not self._open:
+            return
+        for command in data.splitlines():
+            self._handle_command(command.strip())
+
+    def write_line(self, line: str):
+        self.write(line + "\n")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return True
+
+    def queue_depth(self) -> int:
+        return 0
+
+    def write_stats(self) -> dict:
+        return {"writes": 0, "coalesced": 0, "errors": 0, "dropped": 0, "queue_depth": 0,
+                "latency_mean_s": 0.0, "latency_max_s": 0.0, "latency_last_s": 0.0}
+
+    # --- Interní ---
+
+    def _handle_command(self, command: str):
+        if not command:
+            return
+        up = command.upper()
+        ack = expected_ack(command)
+        if up == "START":
+            # Úvod záznamu musí přijít před ackem i daty, i když callback nikdo nenastavil
+            self._release_preamble()
+        if ack:
+            self._post([f'{{"type":"ack","cmd":"{ack}"}}'])
+        if up == "INFO":
+            # Odpověď na INFO = zaznamenané hello
+            hello = [text for text in self._preamble if '"type":"hello"' in text]
+            self._post(hello[-1:])
+        elif up == "START":
+            with self._cond:
+                self._playing = True
+                self._cond.notify_all()
+        elif up == "STOP":
+            with self._cond:
+                self._playing = False
+
+    def _release_preamble(self):
+        with self._cond:
+            lines, self._preamble_pending = self._preamble_pending, []
+        self._post(lines)
+
+    def _post(self, lines: List[str]):
+        # Odpovědi doručí vlákno přehrávání (jako čtecí vlákno u skutečného portu),
+        # ne volající vlákno uprostřed write_line; pořadí: úvod, odpovědi, data
+        with self._cond:
+            self._outbox.extend(lines)
+            self._cond.notify_all()
+
+    def _deliver(self, lines: List[str]):
+        if not lines or not self._open:
+            return
+        t_arrival = time.time()
+        for listener in self._line_listeners:
+            listener(lines, t_arrival)
+        if self._batch_callback:
+            self._batch_callback(lines, t_arrival)
+        elif self._line_callback:
+            for text in lines:
+                self._line_callback(text)
+
+    def _play_loop(self):
+        records = self._records
+        n = len(records)
+        # Kotva: čas záznamu odpovídající okamžiku (znovu)spuštění přehrávání
+        anchor_wall: Optional[float] = None
+        anchor_rec = 0.0
+
+        while True:
+            with self._cond:
+                while self._open and not self._outbox and not (self._playing and self._pos < n):
+                    anchor_wall = None
+                    self._cond.wait()
+                if not self._open:
+                    return
+                outbox, self._outbox = self._outbox, []
+                pos = self._pos
+
+            if outbox:
+                # Úvodní zprávy a odpovědi mají přednost před daty
+                self._deliver(outbox)
+                continue
+
+            if self.speed == 0:
+                end = min(n, pos + self.MAX_BATCH)
+                # Dávku ukončíme na hranici čtení, aby zůstalo zachované původní dávkování
+                t_last = records[end - 1][0]
+                while end < n and records[end][0] == t_last and end - pos < 4 * self.MAX_BATCH:
+                    end += 1
+            else:
+                now = time.monotonic()
+                if anchor_wall is None:
+                    anchor_wall, anchor_rec = now, records[pos][0]
+                t_rec = anchor_rec + (now - anchor_wall) * self.speed
+                end = pos
+                while end < n and records[end][0] <= t_rec:
+                    end += 1
+                if end == pos:
+                    wait = (records[pos][0] - t_rec) / self.speed
+                    time.sleep(min(self.MAX_SLEEP_S, max(0.0, wait)))
+                    continue
+
+            self._pos = end
+            if self.speed == 0:
+                self._deliver([text for _, text in records[pos:end]])
+            else:
+                # Řádky přijaté stejným čtením doručíme jako jednu dávku
+                start = pos
+                while start < end:
+                    stop = start + 1
+                    while stop < end and records[stop][0] == records[start][0]:
+                        stop += 1
+                    self._deliver([text for _, text in records[start:stop]])
+                    start = stop
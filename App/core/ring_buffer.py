@@ -0,0 +1,79 @@
+"""
+App/core/ring_buffer.py
+Posledních capacity bodů jedné křivky v polích pevné velikosti (posuvný graf).
+
+Každý bod se zapíše dvakrát, na pozici i a i + capacity, takže posledních n
+bodů leží v polích vždy souvisle a x a y jsou pohledy bez kopie. Paměť je
+pevná (2 x 2 x capacity floatů) a append stojí O(1) bez ohledu na délku měření.
+Na rozdíl od CurveBuffer se pohledy dalšími zápisy přepisují: kdo je potřebuje
+držet déle (např. pyqtgraph mezi setData a překreslením), musí si je zkopírovat.
+"""
+import numpy as np
+
+RING_CAPACITY = 65536
+
+
+class RingCurveBuffer:
+    __slots__ = ("_x", "_y", "_cap", "_head", "_n", "total")
+
+    def __init__(self, capacity: int = RING_CAPACITY):
+        self._cap = capacity
+        self._x = np.empty(2 * capacity, dtype=np.float64)
+        self._y = np.empty(2 * capacity, dtype=np.float64)
+        self._head = 0     # kam se zapíše další bod (0..capacity-1)
+        self._n = 0
+        self.total = 0     # počet bodů zapsaných od clear(), včetně přepsaných
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def capacity(self) -> int:
+        return self._cap
+
+    @property
+    def x(self) -> np.ndarray:
+        end = self._head + self._cap
+        return self._x[end - self._n:end]
+
+    @property
+    def y(self) -> np.ndarray:
+        end = self._head + self._cap
+        return self._y[end - self._n:end]
+
+    @property
+    def nbytes(self) -> int:
+        return self._x.nbytes + self._y.nbytes
+
+    def append(self, x: float, y: float):
+        h = self._head
+        self._x[h] = self._x[h + self._cap] = x
+        self._y[h] = self._y[h + self._cap] = y
+        self._head = h + 1 if h + 1 < self._cap else 0
+        if self._n < self._cap:
+            self._n += 1
+        self.total += 1
+
+    def extend(self, xs: np.ndarray, ys: np.ndarray):
+        count = len(xs)
+        self.total += count
+        cap = self._cap
+        if count > cap:   # starší body by se hned přepsaly
+            xs, ys = xs[-cap:], ys[-cap:]
+            count = cap
+        h = self._head
+        first = min(count, cap - h)
+        rest = count - first
+        for dst, src in ((self._x, xs), (self._y, ys)):
+            dst[h:h + first] = src[:first]
+            dst[h + cap:h + cap + first] = src[:first]
+            if rest:
+                dst[:rest] = src[first:]
+                dst[cap:cap + rest] = src[first:]
+        self._head = (h + count) % cap
+        self._n = min(self._n + count, cap)
+
+    def clear(self):
+        self._head = 0
+        self._n = 0
+        self.total = 0
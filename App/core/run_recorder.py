@@ -0,0 +1,734 @@
+"""
+App/core/run_recorder.py
+Průběžný zápis měření na disk (run soubor, .tlrun), aby pád aplikace ani zavření
+okna nepřišly o data a paměť nerostla s délkou měření. Soubor je zároveň nativní
+formát pro opětovné otevření: RunReader ho mapuje přes mmap.
+
+Soubor je append-only:
+    hlavička souboru:  MAGIC (8 B) | délka JSON (uint32) | 4 B výplň | JSON metadata (zarovnáno na 8 B)
+    záznamy, každý s 24 B hlavičkou  magic | a | b | c (uint32) | crc32 těla | 4 B výplň:
+      "TLCK" chunk:   a=n_rows, b=n_cols, c=délka názvů
+                      názvy kanálů ('\\n', zarovnáno na 8 B) | t_s float64[n_rows] | n_cols x float64[n_rows]
+      "TLMD" kanály:  c=délka JSON {kanál: {"name", "unit"}} z core.sensors;
+                      zapisuje se před prvním chunkem, ve kterém se kanál objeví
+      "TLMU" metadata: c=délka JSON {klíč: hodnota} doplněných za běhu (set_meta,
+                      např. výpadky spojení); zapisuje se před dalším chunkem
+      "TLIX" index:   a=počet chunků, c=délka JSON {"layouts", "channels", "meta"}
+                      JSON (zarovnáno na 8 B) | pole INDEX_DTYPE (jen po řádném close)
+    konec:             "TLND" | 4 B výplň | offset indexu (uint64) | 8 B výplň
+Sloupce mají pevnou šířku (float64, NaN = chybějící hodnota) a jsou zarovnané
+na 8 B, takže z mmap jdou číst jako pole NumPy bez kopie. Index (řídký časový
+index: jeden řádek na chunk s t_first/t_last) umožní otevřít řádně uzavřený
+soubor přečtením pár stránek z konce bez ohledu na délku záznamu.
+
+Po pádu zůstanou na disku všechny celé chunky; neúplný konec čtení přeskočí
+(RunReader) a zápis ho před pokračováním odřízne (RunRecorder nad existujícím souborem).
+Při nízké frekvenci se chunky slučují (min_chunk_rows, max_flush_delay_s), aby
+hlavička a názvy kanálů nevážily víc než samotná data.
+
+RunRecorder má stejné rozhraní jako SampleStore (append, len, řádky jako slovníky),
+takže ho měření používá přímo jako recorded_data a export čte data ze souboru.
+RunRecorder.snapshot() vrací RunSnapshot: zapsané chunky (na disku se už nemění)
+a snímky paměťových bufferů, čtení pak zámek recorderu nepotřebuje.
+"""
+import bisect
+import itertools
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from core.sample_store import SampleSnapshot, SampleStore, T_KEY
+from core.sensors import get_sensor_name, get_sensor_unit
+
+MAGIC = b"TLRUN\x00\x01\x00"
+FILE_HEAD = struct.Struct("<8sI4x")
+RECORD_HEAD = struct.Struct("<4sIIII4x")
+END_TAIL = struct.Struct("<4s4xQ8x")
+CHUNK_MAGIC = b"TLCK"
+META_MAGIC = b"TLMD"
+RUN_META_MAGIC = b"TLMU"
+INDEX_MAGIC = b"TLIX"
+END_MAGIC = b"TLND"
+
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("n_rows", "<u4"), ("layout", "<u4"),
+                        ("t_first", "<f8"), ("t_last", "<f8")])
+
+DEFAULT_RUNS_DIR = os.path.join(os.path.expanduser("~"), ".temp-lab", "runs")
+RUN_SUFFIX = ".tlrun"
+
+Columns = Tuple[np.ndarray, Dict[str, np.ndarray]]
+
+
+def _pad8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _padded(raw: bytes) -> bytes:
+    return raw + bytes(_pad8(len(raw)) - len(raw))
+
+
+def encode_record(magic: bytes, a: int, b: int, c: int, body: bytes) -> bytes:
+    return RECORD_HEAD.pack(magic, a, b, c, zlib.crc32(body)) + body
+
+
+def encode_chunk(t_s: np.ndarray, columns: Mapping[str, np.ndarray]) -> bytes:
+    names = "\n".join(columns).encode("utf-8")
+    n_rows = len(t_s)
+    body = b"".join([
+        _padded(names),
+        np.ascontiguousarray(t_s, dtype="<f8").tobytes(),
+        *(np.ascontiguousarray(col[:n_rows], dtype="<f8").tobytes() for col in columns.values()),
+    ])
+    return encode_record(CHUNK_MAGIC, n_rows, len(columns), len(names), body)
+
+
+def channel_info(keys: Iterable[str]) -> Dict[str, dict]:
+    """Popis kanálů, který se ukládá do souboru (čitelný název a jednotka)."""
+    return {key: {"name": get_sensor_name(key), "unit": get_sensor_unit(key)} for key in keys}
+
+
+class _ChunkRef:
+    """Poloha jednoho chunku v souboru (data se čtou až na vyžádání)."""
+    __slots__ = ("offset", "n_rows", "names", "t_first", "t_last")
+
+    def __init__(self, offset: int, n_rows: int, names: List[str], t_first: float, t_last: float):
+        self.offset = offset       # začátek sloupce t_s
+        self.n_rows = n_rows
+        self.names = names
+        self.t_first = t_first
+        self.t_last = t_last
+
+
+def _chunk_view(mm: mmap.mmap, offset: int, n_rows: int, names: Iterable[str]) -> Columns:
+    """Sloupce chunku jako pohledy do mmap (bez kopie)."""
+    names = tuple(names)
+    table = np.frombuffer(mm, dtype="<f8", count=n_rows * (len(names) + 1),
+                          offset=offset).reshape(len(names) + 1, n_rows)
+    return table[0], {name: table[j + 1] for j, name in enumerate(names)}
+
+
+def _iter_rows(t_s: np.ndarray, columns: Mapping[str, np.ndarray]) -> Iterator[Dict[str, float]]:
+    keys = list(columns)
+    blocks = [columns[k].tolist() for k in keys]
+    for i, t in enumerate(t_s.tolist()):
+        row = {T_KEY: t}
+        for key, block in zip(keys, blocks):
+            val = block[i]
+            if val == val:
+                row[key] = val
+        yield row
+
+
+class RunReader:
+    """
+    Čtení run souboru přes mmap. Řádně uzavřený soubor se otevře jen přečtením
+    indexu na konci; sloupce jsou pohledy do mmap, takže se z disku načtou jen
+    stránky, na které se opravdu sáhne (slice() přes časový index a binární hledání).
+    Neukončený soubor (po pádu) se projde po hlavičkách záznamů a neúplný konec se přeskočí.
+    Předpokládá neklesající t_s (zajišťuje StreamingTempMeasurement).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.meta: dict = {}
+        self.complete = False        # soubor byl řádně uzavřen
+        self.indexed = False         # otevřeno z indexu bez procházení souboru
+        self.valid_bytes = 0         # konec posledního celého chunku (sem navazuje další zápis)
+        self.truncated_bytes = 0     # useknutý konec po pádu
+        self._layouts: List[Tuple[str, ...]] = []
+        self._channel_info: Dict[str, dict] = {}
+        self._index = np.zeros(0, dtype=INDEX_DTYPE)
+
+        self._f = open(path, "rb")
+        size = os.fstat(self._f.fileno()).st_size
+        if size < FILE_HEAD.size:
+            self._f.close()
+            raise ValueError(f"{path}: není run soubor Temp-Lab")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open(size)
+        except Exception:
+            self.close()
+            raise
+
+    # --- Přehled ---
+
+    def __len__(self) -> int:
+        return int(self._index["n_rows"].sum())
+
+    @property
+    def n_chunks(self) -> int:
+        return len(self._index)
+
+    @property
+    def channels(self) -> List[str]:
+        names: Dict[str, None] = {}
+        for layout in self._layouts:
+            names.update(dict.fromkeys(layout))
+        return list(names)
+
+    @property
+    def t_range(self) -> Tuple[float, float]:
+        if not len(self._index):
+            return 0.0, 0.0
+        return float(self._index["t_first"][0]), float(self._index["t_last"][-1])
+
+    def channel_info(self, key: str) -> dict:
+        """{"name", "unit"} uložené v souboru (u starších souborů dopočtené z core.sensors)."""
+        return dict(self._channel_info.get(key) or channel_info([key])[key])
+
+    # --- Data ---
+
+    def chunk(self, i: int) -> Columns:
+        """Sloupce jednoho chunku jako pohledy do mmap (bez kopie)."""
+        entry = self._index[i]
+        return _chunk_view(self._mm, int(entry["offset"]), int(entry["n_rows"]),
+                           self._layouts[int(entry["layout"])])
+
+    def iter_chunks(self) -> Iterator[Columns]:
+        for i in range(len(self._index)):
+            yield self.chunk(i)
+
+    def __iter__(self) -> Iterator[Dict[str, float]]:
+        for t_s, cols in self.iter_chunks():
+            yield from _iter_rows(t_s, cols)
+
+    def slice(self, t_from: Optional[float] = None, t_to: Optional[float] = None,
+              channels: Optional[Iterable[str]] = None) -> Columns:
+        """
+        Vzorky s t_from <= t_s <= t_to. Čtou se jen chunky, které do rozsahu zasahují;
+        leží-li výsledek v jednom chunku, jsou sloupce pohledy do mmap.
+        channels omezí (a seřadí) vrácené kanály, chybějící kanál je NaN.
+        """
+        idx = self._index
+        first = 0 if t_from is None else int(np.searchsorted(idx["t_last"], t_from, "left"))
+        last = len(idx) if t_to is None else int(np.searchsorted(idx["t_first"], t_to, "right"))
+        wanted = list(channels) if channels is not None else None
+        pieces: List[Columns] = []
+        for i in range(first, last):
+            t_s, cols = self.chunk(i)
+            lo = 0 if t_from is None else int(np.searchsorted(t_s, t_from, "left"))
+            hi = len(t_s) if t_to is None else int(np.searchsorted(t_s, t_to, "right"))
+            if hi > lo:
+                keys = wanted if wanted is not None else cols
+                pieces.append((t_s[lo:hi], {k: cols[k][lo:hi] for k in keys if k in cols}))
+        names = wanted if wanted is not None else self.channels
+        if len(pieces) == 1 and all(k in pieces[0][1] for k in names):
+            return pieces[0]
+        if not pieces:
+            return np.empty(0), {k: np.empty(0) for k in names}
+        t_all = np.concatenate([t for t, _ in pieces])
+        return t_all, {k: np.concatenate([cols[k] if k in cols else np.full(len(t), np.nan) for t, cols in pieces])
+                       for k in names}
+
+    def to_store(self) -> SampleStore:
+        store = SampleStore(max(16, len(self)))
+        for t_s, cols in self.iter_chunks():
+            store.extend(t_s, cols)
+        return store
+
+    def close(self):
+        try:
+            self._mm.close()
+        except BufferError:
+            pass   # někdo ještě drží pohled do mmap, uvolní se s ním
+        except AttributeError:
+            pass
+        self._f.close()
+
+    def __enter__(self) -> "RunReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Interní ---
+
+    def _open(self, size: int):
+        mm = self._mm
+        magic, meta_len = FILE_HEAD.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path}: není run soubor Temp-Lab")
+        try:
+            self.meta = json.loads(mm[FILE_HEAD.size:FILE_HEAD.size + meta_len].decode("utf-8"))
+        except ValueError:
+            self.meta = {}
+        pos = FILE_HEAD.size + _pad8(meta_len)
+        if not self._read_index(pos, size):
+            self._scan(pos, size)
+
+    def _read_index(self, data_start: int, size: int) -> bool:
+        mm = self._mm
+        if size - END_TAIL.size < data_start:
+            return False
+        magic, index_offset = END_TAIL.unpack_from(mm, size - END_TAIL.size)
+        if magic != END_MAGIC or index_offset < data_start:
+            return False   # bez indexu (po pádu nebo starší soubor) -> projít záznamy
+        magic, n_chunks, _, json_len, crc = RECORD_HEAD.unpack_from(mm, index_offset)
+        body = index_offset + RECORD_HEAD.size
+        body_len = _pad8(json_len) + n_chunks * INDEX_DTYPE.itemsize
+        if magic != INDEX_MAGIC or body + body_len != size - END_TAIL.size:
+            return False
+        if zlib.crc32(mm[body:body + body_len]) != crc:
+            return False
+        info = json.loads(mm[body:body + json_len].decode("utf-8"))
+        self._layouts = [tuple(layout) for layout in info.get("layouts", [])]
+        self._channel_info = info.get("channels", {})
+        self.meta.update(info.get("meta", {}))
+        self._index = np.frombuffer(mm, dtype=INDEX_DTYPE, count=n_chunks, offset=body + _pad8(json_len)).copy()
+        self.valid_bytes = index_offset
+        self.complete = self.indexed = True
+        return True
+
+    def _scan(self, pos: int, size: int):
+        mm = self._mm
+        entries = []
+        layout_ids: Dict[Tuple[str, ...], int] = {}
+        self.valid_bytes = pos
+        while pos + RECORD_HEAD.size <= size:
+            magic, a, b, c, crc = RECORD_HEAD.unpack_from(mm, pos)
+            if magic == END_MAGIC:
+                self.complete = True
+                break
+            if magic == CHUNK_MAGIC:
+                body_len = _pad8(c) + 8 * a * (b + 1)
+            elif magic in (META_MAGIC, RUN_META_MAGIC):
+                body_len = _pad8(c)
+            elif magic == INDEX_MAGIC:
+                body_len = _pad8(c) + a * INDEX_DTYPE.itemsize
+            else:
+                break
+            body = pos + RECORD_HEAD.size
+            if body + body_len > size or zlib.crc32(mm[body:body + body_len]) != crc:
+                break
+            if magic == CHUNK_MAGIC and a:
+                names = tuple(mm[body:body + c].decode("utf-8").split("\n")) if b else ()
+                layout = layout_ids.get(names)
+                if layout is None:
+                    layout = layout_ids[names] = len(self._layouts)
+                    self._layouts.append(names)
+                t_off = body + _pad8(c)
+                t_first = struct.unpack_from("<d", mm, t_off)[0]
+                t_last = struct.unpack_from("<d", mm, t_off + 8 * (a - 1))[0]
+                entries.append((t_off, a, layout, t_first, t_last))
+            elif magic == META_MAGIC:
+                self._channel_info.update(json.loads(mm[body:body + c].decode("utf-8")))
+            elif magic == RUN_META_MAGIC:
+                self.meta.update(json.loads(mm[body:body + c].decode("utf-8")))
+            pos = body + body_len
+            if magic != INDEX_MAGIC:
+                self.valid_bytes = pos
+        self._index = np.array(entries, dtype=INDEX_DTYPE)
+        self.truncated_bytes = size - pos - (END_TAIL.size if self.complete else 0)
+
+
+class RunSnapshot:
+    """
+    Konzistentní stav RunRecorderu v jednom okamžiku: chunky v souboru a snímky
+    nezapsaných bufferů (bez kopie). Recorder může mezitím dál zapisovat;
+    snímek jeho novější data nevidí a k zámku recorderu už nesahá.
+    Soubor se namapuje (mmap) při prvním čtení a mapování se drží po celou
+    dobu života snímku; snímek[i] najde chunk binárním hledáním.
+    """
+
+    def __init__(self, path: str, meta: dict, chunks: List[_ChunkRef], stores: List[SampleSnapshot]):
+        self.path = path
+        self.meta = meta
+        self._chunks = chunks
+        self._stores = [s for s in stores if len(s)]
+        # Začátky částí (chunky, pak paměťové buffery) v číslování řádků; poslední = počet řádků
+        sizes = [c.n_rows for c in chunks] + [len(s) for s in self._stores]
+        self._starts = list(itertools.accumulate(sizes, initial=0))
+        self._n = self._starts[-1]
+        self._mm: Optional[mmap.mmap] = None
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def channels(self) -> List[str]:
+        names: Dict[str, None] = {}
+        for ref in self._chunks:
+            names.update(dict.fromkeys(ref.names))
+        for store in self._stores:
+            names.update(dict.fromkeys(store.channels))
+        return list(names)
+
+    def iter_chunks(self) -> Iterator[Columns]:
+        """Sloupce po chuncích: nejdřív ze souboru (pohledy do mmap), pak nezapsaná data z paměti."""
+        for i in range(len(self._chunks)):
+            yield self._chunk(i)
+        for store in self._stores:
+            yield from store.iter_chunks()
+
+    def column(self, key: str) -> np.ndarray:
+        """Celý sloupec (T_KEY = čas) jako jedno pole, chybějící úseky NaN."""
+        parts = [t_s if key == T_KEY else cols.get(key, np.full(len(t_s), np.nan))
+                 for t_s, cols in self.iter_chunks()]
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def __getitem__(self, index: int) -> Dict[str, float]:
+        if index < 0:
+            index += self._n
+        if not 0 <= index < self._n:
+            raise IndexError("index mimo rozsah záznamu")
+        part = bisect.bisect_right(self._starts, index) - 1
+        index -= self._starts[part]
+        if part >= len(self._chunks):
+            return self._stores[part - len(self._chunks)][index]
+        t_s, cols = self._chunk(part)
+        return next(_iter_rows(t_s[index:index + 1], {k: c[index:index + 1] for k, c in cols.items()}))
+
+    def __iter__(self) -> Iterator[Dict[str, float]]:
+        for t_s, cols in self.iter_chunks():
+            yield from _iter_rows(t_s, cols)
+
+    def _chunk(self, i: int) -> Columns:
+        if self._mm is None:
+            # Soubor je append-only, všechny chunky snímku v něm už celé leží
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        ref = self._chunks[i]
+        return _chunk_view(self._mm, ref.offset, ref.n_rows, ref.names)
+
+
+class RunRecorder:
+    """
+    Zapisovač run souboru. append() jen přidá vzorek do paměťového bufferu,
+    zápis na disk dělá vlákno na pozadí, když buffer dosáhne flush_samples,
+    nebo po flush_interval_s, má-li buffer aspoň min_chunk_rows vzorků
+    (nejpozději ale po max_flush_delay_s). V paměti zůstává jen nezapsaný
+    buffer a posledních tail_samples vzorků (tail()). close() dopíše časový index.
+
+    fsync=True vynutí po každém zápisu os.fsync (přežije i výpadek napájení,
+    ale stojí čas a opotřebení disku); pádu aplikace stačí flush do OS.
+
+    Selže-li zápis (plný disk, zamčený soubor), data zůstanou v paměti, zápis
+    se opakuje s rostoucí prodlevou (RETRY_MIN_S až RETRY_MAX_S) a on_error
+    dostane jednu zprávu za každou sérii chyb. Po úspěšném opakování se
+    nezapsané buffery dopíšou ve správném pořadí a paměť se zase uvolní.
+
+    Nad existujícím souborem pokračuje v zápisu: neúplný konec po pádu odřízne.
+    """
+
+    RETRY_MIN_S = 1.0
+    RETRY_MAX_S = 30.0
+
+    def __init__(self, path: str, meta: Optional[dict] = None, flush_samples: int = 4096,
+                 flush_interval_s: float = 1.0, tail_samples: int = 10000, fsync: bool = False,
+                 min_chunk_rows: int = 64, max_flush_delay_s: float = 10.0):
+        self.path = path
+        self.flush_samples = flush_samples
+        self.flush_interval_s = flush_interval_s
+        self.min_chunk_rows = min_chunk_rows
+        self.max_flush_delay_s = max_flush_delay_s
+        self.tail_samples = tail_samples
+        self.fsync = fsync
+        self.error: Optional[str] = None
+        # Volá se (z vlákna zápisu) při první chybě zápisu v sérii, např. MeasurementManager -> UI
+        self.on_error: Optional[Callable[[str], None]] = None
+        self._retry_delay = 0.0
+        self._retry_at = 0.0
+        self.recovered_bytes = 0   # kolik bajtů useknutého konce se při otevření odřízlo
+
+        self._lock = threading.Lock()
+        self._pending = SampleStore(min(flush_samples, 1024))
+        self._pending_since = 0.0   # monotonic čas prvního vzorku v _pending
+        self._flushing: Optional[SampleStore] = None
+        self._unwritten: List[SampleStore] = []   # buffery, které se nepodařilo zapsat
+        self._recent: Deque[Columns] = deque()
+        self._recent_rows = 0
+        self._closed = False
+        self._chunks: List[_ChunkRef] = []
+        self._described: Dict[str, dict] = {}     # kanály, jejichž popis už v souboru je
+        self._meta_dirty: Dict[str, object] = {}  # set_meta(), které ještě nejsou v souboru
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with RunReader(path) as reader:
+                self.meta = reader.meta
+                for entry in reader._index:
+                    self._chunks.append(_ChunkRef(int(entry["offset"]), int(entry["n_rows"]),
+                                                  list(reader._layouts[int(entry["layout"])]),
+                                                  float(entry["t_first"]), float(entry["t_last"])))
+                self._described = dict(reader._channel_info)
+                self.recovered_bytes = reader.truncated_bytes
+                valid_bytes = reader.valid_bytes
+            self._f = open(path, "r+b")
+            self._f.truncate(valid_bytes)   # odřízne useknutý konec i index a značku konce
+            self._f.seek(valid_bytes)
+            self._good_offset = valid_bytes
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.meta = {"version": 1, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), **(meta or {})}
+            raw = json.dumps(self.meta).encode("utf-8")
+            self._f = open(path, "wb")
+            self._f.write(FILE_HEAD.pack(MAGIC, len(raw)) + _padded(raw))
+            self._f.flush()
+            self._good_offset = self._f.tell()   # konec posledního úspěšného zápisu
+
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name="run-recorder", daemon=True)
+        self._thread.start()
+
+    # --- Zápis (rozhraní SampleStore) ---
+
+    def append(self, t_s: float, values: Mapping[str, float]):
+        with self._lock:
+            if not len(self._pending):
+                self._pending_since = time.monotonic()
+            self._pending.append(t_s, values)
+            full = len(self._pending) >= self.flush_samples
+        if full:
+            self._wake.set()
+
+    def extend(self, t_s: np.ndarray, columns: Mapping[str, np.ndarray]):
+        with self._lock:
+            if not len(self._pending):
+                self._pending_since = time.monotonic()
+            self._pending.extend(t_s, columns)
+        self._wake.set()
+
+    def set_meta(self, key: str, value):
+        """
+        Doplní metadata běhu (např. výpadky spojení). Do souboru se zapíšou
+        s dalším chunkem a znovu v indexu při close().
+        """
+        with self._lock:
+            self.meta[key] = value
+            self._meta_dirty[key] = value
+
+    def flush(self):
+        """Zapíše buffery hned (blokuje volajícího), po chybě i bez čekání na další pokus."""
+        while True:
+            with self._lock:
+                store = self._take_pending()
+            if store is None or not self._write(store):
+                return
+
+    def close(self):
+        with self._lock:
+            # stop() měření i úklid okna mohou zavírat současně, zavře jen první
+            if self._closed:
+                return
+            self._closed = True
+        self._wake.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=5.0)
+        self.flush()
+        try:
+            if not self.error:
+                self._write_index()
+            self._sync()
+            self._f.close()
+        except OSError as e:
+            self._fail(e)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def channels(self) -> List[str]:
+        """Názvy kanálů v pořadí prvního výskytu (soubor i nezapsaná data)."""
+        return self.snapshot().channels
+
+    # --- Čtení ---
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(c.n_rows for c in self._chunks) + sum(len(s) for s in self._memory_stores())
+
+    def snapshot(self) -> RunSnapshot:
+        """Stav záznamu v tomto okamžiku; zámek se drží jen po dobu převzetí seznamů."""
+        with self._lock:
+            chunks = list(self._chunks)
+            stores = [s.snapshot() for s in self._memory_stores()]
+        return RunSnapshot(self.path, self.meta, chunks, stores)
+
+    def __getitem__(self, index: int) -> Dict[str, float]:
+        """Jeden řádek; při čtení po řádcích je levnější vzít si jednou snapshot()."""
+        return self.snapshot()[index]
+
+    def __iter__(self) -> Iterator[Dict[str, float]]:
+        """Řádky ze souboru a pak z paměti (stav v okamžiku zavolání)."""
+        return iter(self.snapshot())
+
+    def iter_chunks(self) -> Iterator[Columns]:
+        """Sloupce po chuncích: nejdřív ze souboru, pak nezapsaná data z paměti."""
+        return self.snapshot().iter_chunks()
+
+    def tail(self, n: Optional[int] = None) -> List[Dict[str, float]]:
+        """Posledních n (nejvýš tail_samples) vzorků z paměti bez čtení souboru."""
+        n = self.tail_samples if n is None else min(n, self.tail_samples)
+        with self._lock:
+            parts: List[Columns] = list(self._recent)
+            snaps = [s.snapshot() for s in self._memory_stores()]
+        parts += [(s.column(T_KEY), {k: s.column(k) for k in s.channels}) for s in snaps]
+        rows: List[Dict[str, float]] = []
+        for t_s, cols in reversed(parts):
+            if len(rows) >= n:
+                break
+            take = min(len(t_s), n - len(rows))
+            rows[:0] = _iter_rows(t_s[-take:], {k: c[-take:] for k, c in cols.items()})
+        return rows
+
+    # --- Interní ---
+
+    def _memory_stores(self) -> List[SampleStore]:
+        # _flushing je vždy nejstarší (po chybě se bere z čela _unwritten)
+        stores = [self._flushing] if self._flushing is not None else []
+        stores += self._unwritten
+        stores.append(self._pending)
+        return stores
+
+    def _take_pending(self) -> Optional[SampleStore]:
+        if self._flushing is not None:
+            return None
+        if self._unwritten:
+            # po chybě se nejdřív dopíše, co se zapsat nepodařilo
+            self._flushing = self._unwritten.pop(0)
+            return self._flushing
+        if not len(self._pending):
+            return None
+        self._flushing = self._pending
+        self._pending = SampleStore(min(self.flush_samples, 1024))
+        return self._flushing
+
+    def _flush_due(self) -> bool:
+        if self.error:
+            return time.monotonic() >= self._retry_at
+        n = len(self._pending)
+        return bool(n) and (n >= self.min_chunk_rows
+                            or time.monotonic() - self._pending_since >= self.max_flush_delay_s)
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            if self._closed:
+                return
+            with self._lock:
+                due = self._flush_due()
+            if due:
+                self.flush()
+
+    def _write(self, store: SampleStore) -> bool:
+        n = len(store)
+        t_s = np.array(store.column(T_KEY))
+        cols = {k: np.array(store.column(k)) for k in store.channels}
+        new = channel_info(k for k in cols if k not in self._described)
+        with self._lock:
+            updates, self._meta_dirty = self._meta_dirty, {}
+        try:
+            if self.error:
+                # předchozí zápis mohl skončit v půlce -> navážeme za posledním celým záznamem
+                self._f.seek(self._good_offset)
+                self._f.truncate()
+            out = b""
+            if updates:
+                raw = json.dumps(updates, ensure_ascii=False).encode("utf-8")
+                out = encode_record(RUN_META_MAGIC, 0, 0, len(raw), _padded(raw))
+            if new:
+                raw = json.dumps(new, ensure_ascii=False).encode("utf-8")
+                out += encode_record(META_MAGIC, 0, 0, len(raw), _padded(raw))
+            offset = self._f.tell() + len(out) + RECORD_HEAD.size
+            names_len = len("\n".join(cols).encode("utf-8"))
+            self._f.write(out + encode_chunk(t_s, cols))
+            self._sync()
+        except (OSError, ValueError) as e:
+            with self._lock:
+                self._unwritten.insert(0, store)
+                self._flushing = None
+                self._meta_dirty = {**updates, **self._meta_dirty}
+            self._fail(e)
+            return False
+        self._good_offset = self._f.tell()
+        if self.error:
+            print(f"Zápis záznamu {self.path} znovu funguje")
+            self.error = None
+            self._retry_delay = 0.0
+        self._described.update(new)
+        ref = _ChunkRef(offset + _pad8(names_len), n, list(cols), float(t_s[0]), float(t_s[-1]))
+        with self._lock:
+            self._chunks.append(ref)
+            self._flushing = None
+            self._recent.append((t_s, cols))
+            self._recent_rows += n
+            while self._recent and self._recent_rows - len(self._recent[0][0]) >= self.tail_samples:
+                self._recent_rows -= len(self._recent.popleft()[0])
+        return True
+
+    def _write_index(self):
+        layouts: Dict[Tuple[str, ...], int] = {}
+        index = np.zeros(len(self._chunks), dtype=INDEX_DTYPE)
+        for i, ref in enumerate(self._chunks):
+            layout = layouts.setdefault(tuple(ref.names), len(layouts))
+            index[i] = (ref.offset, ref.n_rows, layout, ref.t_first, ref.t_last)
+        with self._lock:
+            meta = dict(self.meta)
+        raw = json.dumps({"layouts": [list(l) for l in layouts], "channels": self._described, "meta": meta},
+                         ensure_ascii=False).encode("utf-8")
+        index_offset = self._f.tell()
+        self._f.write(encode_record(INDEX_MAGIC, len(index), 0, len(raw), _padded(raw) + index.tobytes()))
+        self._f.write(END_TAIL.pack(END_MAGIC, index_offset))
+
+    def _sync(self):
+        self._f.flush()
+        if self.fsync:
+            os.fsync(self._f.fileno())
+
+    def _fail(self, e: Exception):
+        first = self.error is None
+        self.error = str(e)
+        self._retry_delay = min(self.RETRY_MAX_S, max(self.RETRY_MIN_S, 2 * self._retry_delay))
+        self._retry_at = time.monotonic() + self._retry_delay
+        if first:
+            message = f"Zápis záznamu {self.path} selhal, data zůstávají v paměti a zápis se bude opakovat: {e}"
+            print(message)
+            if self.on_error:
+                self.on_error(message)
+
+
+def prune_runs(runs_dir: str, keep: int, max_bytes: Optional[int] = None, exclude: Iterable[str] = ()) -> List[str]:
+    """
+    Úklid složky s run soubory: ponechá nejnovějších keep souborů, dokud jejich
+    součet nepřekročí max_bytes, ostatní smaže. Soubory v exclude (právě
+    zapisovaný záznam) se nepočítají ani nemažou. Vrátí seznam smazaných cest.
+    """
+    skip = {os.path.abspath(p) for p in exclude}
+    try:
+        names = [n for n in os.listdir(runs_dir) if n.endswith(RUN_SUFFIX)]
+    except OSError:
+        return []
+    runs = []
+    for name in names:
+        path = os.path.join(runs_dir, name)
+        if os.path.abspath(path) in skip:
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        runs.append((st.st_mtime, st.st_size, path))
+    runs.sort(reverse=True)
+
+    removed: List[str] = []
+    total = 0
+    for i, (_, size, path) in enumerate(runs):
+        total += size
+        if i < keep and (max_bytes is None or total <= max_bytes):
+            continue
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            print(f"Starý záznam {path} nelze smazat: {e}")
+    return removed
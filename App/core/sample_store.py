@@ -0,0 +1,218 @@
+"""
+App/core/sample_store.py
+Sloupcové úložiště naměřených vzorků (náhrada seznamu slovníků recorded_data).
+
+Každý kanál má vlastní pole float64, čas je společný sloupec "t_s". Pole rostou
+zdvojením kapacity, takže append je amortizovaně O(1) a vzorek stojí ~8 B na kanál
+místo slovníku s klíči a zabalenými floaty (~100 B na hodnotu).
+Chybějící hodnota (kanál ve vzorku není, null z ESP, kanál přibyl později) je NaN.
+
+Pro zpětnou kompatibilitu se úložiště chová jako sekvence řádků jen pro čtení:
+store[i] a iterace vrací slovník {"t_s": ..., kanál: hodnota} bez NaN hodnot,
+tedy stejný řádek, jaký se dřív ukládal do recorded_data.
+
+Snímek (snapshot()) je konzistentní pohled na vzorky zapsané do daného okamžiku
+bez kopie dat a bez zámku: zapisuje jedno vlákno (čtení sériovky), které hodnoty
+vzorku zapíše dřív, než zvýší počet vzorků, a zapsanou část pole už nikdy nemění.
+Při zvětšení kapacity vzniknou nová pole, stará si snímek drží dál.
+Čtení z jiného vlákna (export, graf historie, analýza) jde vždy přes snímek.
+"""
+import math
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+T_KEY = "t_s"
+
+Columns = Tuple[np.ndarray, Dict[str, np.ndarray]]
+
+
+class SampleSnapshot:
+    """Neměnný pohled na prvních n vzorků úložiště (pole se sdílí, nekopírují)."""
+
+    def __init__(self, n: int, t: np.ndarray, cols: Dict[str, np.ndarray]):
+        self._n = n
+        self._t = t
+        self._cols = cols
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def channels(self) -> List[str]:
+        return list(self._cols)
+
+    @property
+    def t_range(self) -> Optional[Tuple[float, float]]:
+        if not self._n:
+            return None
+        return float(self._t[0]), float(self._t[self._n - 1])
+
+    def column(self, key: str) -> np.ndarray:
+        """Pohled jen pro čtení na sloupec (T_KEY = čas)."""
+        src = self._t if key == T_KEY else self._cols[key]
+        view = src[:self._n]
+        view.flags.writeable = False
+        return view
+
+    def until(self, t_s: float) -> "SampleSnapshot":
+        """Prefix se vzorky t <= t_s (čas roste, stačí binární hledání)."""
+        n = int(np.searchsorted(self._t[:self._n], t_s, "right"))
+        return SampleSnapshot(n, self._t, self._cols)
+
+    def snapshot(self) -> "SampleSnapshot":
+        return self
+
+    def iter_chunks(self, block: int = 65536) -> Iterator[Columns]:
+        """Sloupce po blocích (t_s, {kanál: pole}) jako pohledy bez kopie."""
+        n = self._n
+        for start in range(0, n, block):
+            stop = min(n, start + block)
+            yield self._t[start:stop], {k: col[start:stop] for k, col in self._cols.items()}
+
+    def __getitem__(self, index: int) -> Dict[str, float]:
+        n = self._n
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("index mimo rozsah úložiště")
+        row = {T_KEY: float(self._t[index])}
+        for key, col in self._cols.items():
+            val = float(col[index])
+            if not math.isnan(val):
+                row[key] = val
+        return row
+
+    def __iter__(self) -> Iterator[Dict[str, float]]:
+        # Řádky bereme po blocích přes tolist(), je to výrazně rychlejší než indexovat numpy po prvcích
+        n = self._n
+        step = 4096
+        keys = list(self._cols)
+        for start in range(0, n, step):
+            stop = min(n, start + step)
+            t_block = self._t[start:stop].tolist()
+            blocks = [self._cols[k][start:stop].tolist() for k in keys]
+            for i, t_s in enumerate(t_block):
+                row = {T_KEY: t_s}
+                for key, block in zip(keys, blocks):
+                    val = block[i]
+                    if val == val:   # NaN != NaN
+                        row[key] = val
+                yield row
+
+
+class SampleStore:
+    def __init__(self, capacity: int = 1024):
+        self._capacity = max(16, capacity)
+        self._n = 0
+        self._t = np.empty(self._capacity, dtype=np.float64)
+        self._cols: Dict[str, np.ndarray] = {}
+        self._since: Dict[str, int] = {}   # kanál -> index prvního vzorku, kde se objevil
+        self._generation = 0               # mění se při clear()
+
+    # --- Zápis ---
+
+    def append(self, t_s: float, values: Mapping[str, float]):
+        """Přidá jeden vzorek. Nový kanál dostane u dřívějších vzorků NaN."""
+        n = self._n
+        if n == self._capacity:
+            self._grow(n + 1)
+        self._t[n] = t_s
+        cols = self._cols
+        for key, val in values.items():
+            col = cols.get(key)
+            if col is None:
+                col = self._add_column(key)
+            col[n] = val
+        self._n = n + 1
+
+    def extend(self, t_s: np.ndarray, columns: Mapping[str, np.ndarray]):
+        """Přidá více vzorků naráz (např. ColumnarBatch z core.parser)."""
+        count = len(t_s)
+        if count == 0:
+            return
+        n = self._n
+        if n + count > self._capacity:
+            self._grow(n + count)
+        self._t[n:n + count] = t_s
+        for key, col in columns.items():
+            dst = self._cols.get(key)
+            if dst is None:
+                dst = self._add_column(key)
+            dst[n:n + count] = col
+        self._n = n + count
+
+    def clear(self):
+        # pořadí je kvůli snapshot(): nejdřív generace a počet, pak nová pole
+        self._generation += 1
+        self._n = 0
+        self._cols = {}
+        self._since = {}
+        self._t = np.empty(self._capacity, dtype=np.float64)
+
+    # --- Čtení ---
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def channels(self) -> List[str]:
+        """Názvy kanálů v pořadí, v jakém se poprvé objevily."""
+        return list(self._cols)
+
+    @property
+    def nbytes(self) -> int:
+        """Obsazená paměť polí (včetně rezervy pro další vzorky)."""
+        return self._t.nbytes + sum(col.nbytes for col in self._cols.values())
+
+    def snapshot(self) -> SampleSnapshot:
+        """Konzistentní pohled na dosud zapsané vzorky, bez kopie a bez zámku."""
+        while True:
+            generation = self._generation
+            n = self._n          # nejdřív počet, pak pole: zápis je publikuje v opačném pořadí
+            t = self._t
+            cols = dict(self._cols)
+            since = dict(self._since)
+            if generation == self._generation:
+                break
+        # kanál přidaný až po n-tém vzorku do snímku nepatří
+        return SampleSnapshot(n, t, {k: c for k, c in cols.items() if since.get(k, n) < n})
+
+    def column(self, key: str) -> np.ndarray:
+        """Pohled jen pro čtení na platnou část sloupce (T_KEY = čas)."""
+        return self.snapshot().column(key)
+
+    def iter_chunks(self, block: int = 65536) -> Iterator[Columns]:
+        """Sloupce po blocích (t_s, {kanál: pole}) jako pohledy bez kopie."""
+        return self.snapshot().iter_chunks(block)
+
+    def __getitem__(self, index: int) -> Dict[str, float]:
+        return self.snapshot()[index]
+
+    def __iter__(self) -> Iterator[Dict[str, float]]:
+        return iter(self.snapshot())
+
+    # --- Interní ---
+
+    def _add_column(self, key: str) -> np.ndarray:
+        col = np.full(self._capacity, np.nan)
+        self._since[key] = self._n
+        self._cols[key] = col
+        return col
+
+    def _grow(self, needed: int):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        n = self._n
+        t = np.empty(capacity, dtype=np.float64)
+        t[:n] = self._t[:n]
+        cols = {}
+        for key, old in self._cols.items():
+            col = np.full(capacity, np.nan)
+            col[:n] = old[:n]
+            cols[key] = col
+        # stará pole se nemění, snímky nad nimi zůstávají platné
+        self._t = t
+        self._cols = cols
+        self._capacity = capacity
@@ -1,79 +1,375 @@
 import threading
 import time
-from typing import Callable, Optional, List
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional, List, Tuple, Deque, Dict
 
 import serial
 from serial.tools import list_ports
 
+from core.capture import CaptureWriter
+from core.line_framer import LineFramer
+
+
+class _WriteItem:
+    __slots__ = ("data", "key", "t_enqueued")
+
+    def __init__(self, data: bytes, key: Optional[str], t_enqueued: float):
+        self.data = data
+        self.key = key
+        self.t_enqueued = t_enqueued
+
+
+@dataclass
+class ReconnectPolicy:
+    """Jak znovu otevírat port po výpadku: prodleva roste exponenciálně až do max_delay_s."""
+    initial_delay_s: float = 0.5
+    max_delay_s: float = 10.0
+    backoff: float = 2.0
+    give_up_after_s: Optional[float] = 600.0   # None = zkoušet donekonečna
+
 
 class SerialManager:
+    MAX_READ_SIZE = 65536
+    FLUSH_TIMEOUT_S = 0.5
+
     def __init__(self):
         self._ser: Optional[serial.Serial] = None
         self._reader_thread: Optional[threading.Thread] = None
         self._running = False
         self._line_callback: Optional[Callable[[str], None]] = None
+        self._batch_callback: Optional[Callable[[List[str], float], None]] = None
+        # Posluchači vidí každý přijatý blok před hlavním callbackem (např. CommandChannel)
+        self._line_listeners: Tuple[Callable[[List[str], float], None], ...] = ()
         self._connection_lost_callback: Optional[Callable[[], None]] = None
+        self._framer = LineFramer()
+        self._capture: Optional[CaptureWriter] = None
+        self._port = ""
+        self._open_args: Tuple[str, int, float, bool] = ("", 115200, 0.1, True)
+        # Doba jednotlivých fází posledního otevření portu (s)
+        self.last_open_timings: Dict[str, float] = {}
+
+        # Automatické obnovení spojení (vypnuto, dokud není nastavena politika)
+        self._reconnect_policy: Optional[ReconnectPolicy] = None
+        self._reconnecting_callback: Optional[Callable[[], None]] = None
+        self._reconnected_callback: Optional[Callable[[float], None]] = None
+        self._reconnect_thread: Optional[threading.Thread] = None
+        self._reconnect_stop = threading.Event()
+        # Otevírání portu vláknem obnovy a jeho zavírání v close() se nesmí prolnout
+        self._port_lock = threading.RLock()
+        self._reconnecting = False
+        self._stat_reconnects = 0
+        self._stat_reconnect_attempts = 0
+        self._stat_downtime_s = 0.0
+        self._stat_last_downtime_s = 0.0
+
+        # Fronta zápisů obsluhovaná vlastním vláknem (write() nikdy neblokuje volajícího)
+        self._writer_thread: Optional[threading.Thread] = None
+        self._writer_running = False
+        self._write_cond = threading.Condition()
+        self._write_queue: Deque[_WriteItem] = deque()
+        self._write_in_flight = False
+        # Čekající "SET PWM <ch>" podle kanálu -> novější hodnota přepíše starší
+        self._coalesce_slots: Dict[str, _WriteItem] = {}
+        self._stat_writes = 0
+        self._stat_coalesced = 0
+        self._stat_errors = 0
+        self._stat_dropped = 0
+        self._stat_latency_sum = 0.0
+        self._stat_latency_max = 0.0
+        self._stat_latency_last = 0.0
 
     @staticmethod
     def list_ports() -> List[str]:
         return [p.device for p in list_ports.comports()]
 
+    @staticmethod
+    def set_reset_lines(ser: serial.Serial, asserted: bool) -> bool:
+        """Nastaví DTR i RTS. Vrátí False, pokud port modemové linky nepodporuje."""
+        try:
+            ser.dtr = asserted
+            ser.rts = asserted
+            return True
+        except OSError:
+            return False
+
     def is_open(self) -> bool:
         return self._ser is not None and self._ser.is_open
 
-    def open(self, port: str, baudrate: int = 115200, timeout: float = 0.1):
+    def open(self, port: str, baudrate: int = 115200, timeout: float = 0.1, reset: bool = True):
+        """
+        Otevře port. S reset=True restartuje ESP32 přes DTR/RTS (cca 0,4 s),
+        s reset=False se jen připojí k běžící desce (attach) a její stav zůstane.
+        """
         self.close()
-        
+        # Nová událost: vlákno obnovy, na které close() nečekalo, drží tu starou (nastavenou)
+        self._reconnect_stop = threading.Event()
+        self._open_args = (port, baudrate, timeout, reset)
+        self._open_port(port, baudrate, timeout, reset)
+        self._start_reader()
+        self._start_writer()
+
+    def _open_port(self, port: str, baudrate: int, timeout: float, reset: bool = True):
+        t0 = time.perf_counter()
         # 1. Otevření portu
-        self._ser = serial.Serial(port=port, baudrate=baudrate, timeout=timeout)
+        if reset:
+            self._ser = serial.Serial(port=port, baudrate=baudrate, timeout=timeout)
+        else:
+            # Linky nastavíme ještě před otevřením, jinak je ovladač nahodí a deska se restartuje
+            ser = serial.Serial(baudrate=baudrate, timeout=timeout)
+            ser.port = port
+            ser.dtr = False
+            ser.rts = False
+            ser.open()
+            self._ser = ser
+        self._port = port
+        self._framer = LineFramer()
+        t_opened = time.perf_counter()
+        self.last_open_timings = {"open_s": t_opened - t0, "reset_s": 0.0}
 
         # 2. HARD RESET ESP32 (Agresivní metoda ala esptool)
         # Mnoho desek potřebuje specifickou sekvenci DTR/RTS
-        self._ser.dtr = False
-        self._ser.rts = False
-        time.sleep(0.1)
-        
-        self._ser.dtr = True
-        self._ser.rts = True
-        time.sleep(0.1)
-        
-        self._ser.dtr = False
-        self._ser.rts = False
-        time.sleep(0.2)  # Chvilku počkáme, než ESP nastartuje
-
-        self._start_reader()
+        # Port bez modemových linek (např. pty místo desky) reset přeskočí
+        if reset and self.set_reset_lines(self._ser, False):
+            time.sleep(0.1)
+            
+            self.set_reset_lines(self._ser, True)
+            time.sleep(0.1)
+            
+            self.set_reset_lines(self._ser, False)
+            time.sleep(0.2)  # Chvilku počkáme, než ESP nastartuje
+            self.last_open_timings["reset_s"] = time.perf_counter() - t_opened
 
     def set_connection_lost_callback(self, cb: Optional[Callable[[], None]]):
         """Nastaví funkci, která se zavolá při neočekávané ztrátě spojení."""
         self._connection_lost_callback = cb
 
+    def set_reconnect_policy(self, policy: Optional[ReconnectPolicy]):
+        """
+        Zapne automatické obnovení spojení. Po chybě čtení se port znovu otevírá
+        s rostoucí prodlevou; connection_lost callback se zavolá až po vzdání se.
+        """
+        self._reconnect_policy = policy
+
+    def set_reconnect_callbacks(self, on_reconnecting: Optional[Callable[[], None]],
+                                on_reconnected: Optional[Callable[[float], None]]):
+        """
+        on_reconnecting() ... spojení spadlo, začíná obnova (ještě před prvním pokusem)
+        on_reconnected(downtime_s) ... port je znovu otevřen a čtení běží
+        Oba se volají z vlákna obnovy, on_reconnected v něm smí i blokovat (handshake, START).
+        """
+        self._reconnecting_callback = on_reconnecting
+        self._reconnected_callback = on_reconnected
+
+    def is_reconnecting(self) -> bool:
+        return self._reconnecting
+
+    def reconnect_stats(self) -> Dict[str, float]:
+        return {
+            "reconnects": self._stat_reconnects,
+            "attempts": self._stat_reconnect_attempts,
+            "downtime_s": self._stat_downtime_s,
+            "last_downtime_s": self._stat_last_downtime_s,
+            "reconnecting": self._reconnecting,
+        }
+
     def close(self):
-        self._running = False
-        if self._reader_thread and self._reader_thread.is_alive():
-            self._reader_thread.join(timeout=1.0)
-        self._reader_thread = None
+        # Obnova spojení už nemá pokračovat. Vlákno může být v on_reconnected
+        # (handshake, startovací příkazy); déle než 1 s na něj GUI nečeká.
+        # Po zastavení už port znovu neotevře a ten, který právě otevírá,
+        # zavřeme níže pod _port_lock.
+        self._reconnect_stop.set()
+        thread = self._reconnect_thread
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+        self._reconnect_thread = None
+        self._reconnecting = False
 
-        if self._ser is not None:
-            try:
-                self._ser.close()
-            except Exception:
-                pass
-            self._ser = None
+        # Nejdřív odešleme, co ještě čeká ve frontě (např. STOP, SET PWM x 0)
+        self.flush(self.FLUSH_TIMEOUT_S)
+        self._stop_writer()
+
+        with self._port_lock:
+            self._running = False
+            if self._reader_thread and self._reader_thread.is_alive():
+                self._reader_thread.join(timeout=1.0)
+            self._reader_thread = None
+
+            if self._ser is not None:
+                try:
+                    self._ser.close()
+                except Exception:
+                    pass
+                self._ser = None
 
     def set_line_callback(self, cb: Optional[Callable[[str], None]]):
+        """Callback volaný pro každý přijatý řádek zvlášť (zruší případný dávkový callback)."""
+        self._batch_callback = None
         self._line_callback = cb
 
+    def set_batch_callback(self, cb: Optional[Callable[[List[str], float], None]]):
+        """
+        Callback volaný jednou pro všechny řádky dokončené jedním čtením:
+        cb(lines, t_arrival), kde t_arrival je time.time() příjmu bloku.
+        Nahrazuje callback nastavený přes set_line_callback.
+        """
+        self._line_callback = None
+        self._batch_callback = cb
+
+    def set_binary_frames(self, enabled: bool):
+        """
+        Zapne rozpoznávání binárních datových rámců (po příkazu SET FORMAT BIN).
+        Rámce se doručují callbackům jako hotový slovník zprávy "data".
+        """
+        self._framer.binary = enabled
+
+    def add_line_listener(self, cb: Callable[[List[str], float], None]):
+        """Přidá posluchače cb(lines, t_arrival), nezávislého na line/batch callbacku."""
+        self._line_listeners = self._line_listeners + (cb,)
+
+    def remove_line_listener(self, cb: Callable[[List[str], float], None]):
+        self._line_listeners = tuple(l for l in self._line_listeners if l != cb)
+
+    def start_capture(self, path: str) -> CaptureWriter:
+        """
+        Začne zapisovat všechny přijaté a odeslané řádky do souboru (viz core.capture).
+        Záznam lze přehrát přes ReplaySerialSource.
+        """
+        self.stop_capture()
+        self._capture = CaptureWriter(path, self._port)
+        return self._capture
+
+    def stop_capture(self):
+        cap, self._capture = self._capture, None
+        if cap is not None:
+            cap.close()
+
     def write(self, data: str):
+        """
+        Zařadí data do fronty zápisů a hned se vrátí.
+        Dosud neodeslaný "SET PWM <ch> ..." se stejným kanálem je nahrazen novou hodnotou.
+        """
         if not self.is_open():
             return
-        try:
-            self._ser.write(data.encode("utf-8"))
-        except Exception:
-            pass
+        key = self._coalesce_key(data)
+        payload = data.encode("utf-8")
+        with self._write_cond:
+            slot = self._coalesce_slots.get(key) if key else None
+            if slot is not None:
+                slot.data = payload
+                self._stat_coalesced += 1
+                return
+            item = _WriteItem(payload, key, time.perf_counter())
+            if key:
+                self._coalesce_slots[key] = item
+            elif not data.strip().upper().startswith("PING"):
+                # Jiný příkaz je bariéra: PWM zařazené později ho nesmí předběhnout
+                self._coalesce_slots.clear()
+            self._write_queue.append(item)
+            self._write_cond.notify()
 
     def write_line(self, line: str):
         self.write(line + "\n")
 
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Počká, až se fronta zápisů vyprázdní. Vrátí False při vypršení timeoutu."""
+        if not self._writer_running:
+            return not self._write_queue
+        with self._write_cond:
+            return self._write_cond.wait_for(
+                lambda: not self._write_queue and not self._write_in_flight, timeout
+            )
+
+    def queue_depth(self) -> int:
+        return len(self._write_queue)
+
+    def write_stats(self) -> Dict[str, float]:
+        """
+        Statistika zápisů: počty, sloučené PWM, chyby, zahozené příkazy (port zavřený
+        během obnovy spojení) a latence fronta -> port (s).
+        """
+        with self._write_cond:
+            n = self._stat_writes
+            return {
+                "writes": n,
+                "coalesced": self._stat_coalesced,
+                "errors": self._stat_errors,
+                "dropped": self._stat_dropped,
+                "queue_depth": len(self._write_queue),
+                "latency_mean_s": self._stat_latency_sum / n if n else 0.0,
+                "latency_max_s": self._stat_latency_max,
+                "latency_last_s": self._stat_latency_last,
+            }
+
+    @staticmethod
+    def _coalesce_key(data: str) -> Optional[str]:
+        up = data.strip().upper()
+        if not up.startswith("SET PWM "):
+            return None
+        parts = up.split()
+        return f"SET PWM {parts[2]}" if len(parts) >= 4 else None
+
+    def _start_writer(self):
+        if not self._ser:
+            return
+        self._writer_running = True
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
+
+    def _stop_writer(self):
+        with self._write_cond:
+            self._writer_running = False
+            self._write_queue.clear()
+            self._coalesce_slots.clear()
+            self._write_cond.notify_all()
+        if self._writer_thread and self._writer_thread.is_alive():
+            self._writer_thread.join(timeout=1.0)
+        self._writer_thread = None
+
+    def _writer_loop(self):
+        while True:
+            with self._write_cond:
+                while not self._write_queue and self._writer_running:
+                    self._write_cond.wait()
+                if not self._writer_running:
+                    break
+                item = self._write_queue.popleft()
+                if item.key and self._coalesce_slots.get(item.key) is item:
+                    del self._coalesce_slots[item.key]
+                self._write_in_flight = True
+
+            ser = self._ser
+            if ser is None:
+                # Port je během obnovy spojení zavřený: příkaz se neodeslal,
+                # nepočítá se tedy mezi zápisy ani se nezapíše do záznamu jako TX
+                print(f"Port není otevřený, příkaz zahozen: {item.data.decode('utf-8', 'ignore').strip()}")
+                with self._write_cond:
+                    self._write_in_flight = False
+                    self._stat_dropped += 1
+                    self._write_cond.notify_all()
+                continue
+            try:
+                ser.write(item.data)
+                ok = True
+                cap = self._capture
+                if cap is not None:
+                    cap.write_tx(item.data.decode("utf-8", "ignore"))
+            except Exception as e:
+                print(f"Chyba zápisu na sériový port: {e}")
+                ok = False
+
+            latency = time.perf_counter() - item.t_enqueued
+            with self._write_cond:
+                self._write_in_flight = False
+                if ok:
+                    self._stat_writes += 1
+                    self._stat_latency_sum += latency
+                    self._stat_latency_last = latency
+                    self._stat_latency_max = max(self._stat_latency_max, latency)
+                else:
+                    self._stat_errors += 1
+                self._write_cond.notify_all()
+
     def _start_reader(self):
         if not self._ser:
             return
@@ -82,23 +378,90 @@ class SerialManager:
         self._reader_thread.start()
 
     def _reader_loop(self):
-        buffer = b""
+        framer = self._framer
         while self._running and self._ser and self._ser.is_open:
             try:
-                chunk = self._ser.read(128)
+                # Přečteme vše, co už čeká v ovladači (min. 1 bajt -> blokuje do timeoutu)
+                waiting = self._ser.in_waiting
+                chunk = self._ser.read(max(1, min(waiting, self.MAX_READ_SIZE)))
                 if not chunk:
                     continue
-                buffer += chunk
-                while b"\n" in buffer:
-                    line, buffer = buffer.split(b"\n", 1)
-                    text = line.decode(errors="ignore").strip()
-                    if text and self._line_callback:
+                lines = framer.feed(chunk)
+                if not lines:
+                    continue
+                t_arrival = time.time()
+                cap = self._capture
+                if cap is not None:
+                    cap.write_rx(lines)
+                for listener in self._line_listeners:
+                    listener(lines, t_arrival)
+                batch_cb = self._batch_callback
+                if batch_cb:
+                    batch_cb(lines, t_arrival)
+                elif self._line_callback:
+                    for text in lines:
                         self._line_callback(text)
             except Exception:
                 # V případě odpojení USB za chodu
                 self._running = False
-                
+
+                if self._reconnect_policy is not None and not self._reconnect_stop.is_set():
+                    self._begin_reconnect()
                 # NOVÉ: Pokud máme nastavený callback, zavoláme ho
-                if self._connection_lost_callback:
+                elif self._connection_lost_callback:
                     self._connection_lost_callback()
-                break
\ No newline at end of file
+                break
+
+    def _begin_reconnect(self):
+        self._reconnecting = True
+        self._reconnect_thread = threading.Thread(
+            target=self._reconnect_loop, args=(self._reconnect_stop,), name="serial-reconnect", daemon=True
+        )
+        self._reconnect_thread.start()
+
+    def _reconnect_loop(self, stop: threading.Event):
+        policy = self._reconnect_policy
+        t_lost = time.monotonic()
+        ser, self._ser = self._ser, None
+        if ser is not None:
+            try:
+                ser.close()
+            except Exception:
+                pass
+
+        if self._reconnecting_callback:
+            self._reconnecting_callback()
+
+        delay = policy.initial_delay_s
+        while not stop.wait(delay):
+            with self._port_lock:
+                if stop.is_set():
+                    # close() proběhl během čekání, port už neotevíráme
+                    break
+                self._stat_reconnect_attempts += 1
+                try:
+                    self._open_port(*self._open_args)
+                except Exception as e:
+                    self._ser = None
+                    print(f"Obnova spojení se nezdařila ({e}), další pokus za {delay:.1f} s")
+                    if policy.give_up_after_s is not None and time.monotonic() - t_lost > policy.give_up_after_s:
+                        break
+                    delay = min(policy.max_delay_s, delay * policy.backoff)
+                    continue
+
+                downtime = time.monotonic() - t_lost
+                self._stat_reconnects += 1
+                self._stat_downtime_s += downtime
+                self._stat_last_downtime_s = downtime
+                self._start_reader()
+                self._reconnecting = False
+            print(f"Spojení obnoveno po {downtime:.2f} s")
+            if self._reconnected_callback:
+                self._reconnected_callback(downtime)
+            return
+
+        if stop.is_set():
+            return
+        self._reconnecting = False
+        if self._connection_lost_callback:
+            self._connection_lost_callback()
\ No newline at end of file
@@ -1,16 +1,37 @@
+import argparse
 import sys
 
 from PySide6.QtWidgets import QApplication
 from ui.main_window import MainWindow
 
 
+def parse_args(argv):
+    ap = argparse.ArgumentParser(description="Temp-Lab Dashboard")
+    ap.add_argument("--replay", metavar="SOUBOR", help="přehrát záznam místo připojení k ESP32")
+    ap.add_argument("--speed", type=float, default=1.0, help="rychlost přehrávání (0 = co nejrychleji)")
+    ap.add_argument("--capture", metavar="SOUBOR", help="zaznamenat komunikaci s ESP32 do souboru")
+    # Zbytek argumentů (např. -platform) patří Qt
+    return ap.parse_known_args(argv[1:])
+
+
 def main():
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv)
+    app = QApplication(sys.argv[:1] + qt_args)
+
+    serial_mgr = None
+    if args.replay:
+        from core.replay_source import ReplaySerialSource
+        serial_mgr = ReplaySerialSource(args.replay, speed=args.speed)
 
-    window = MainWindow()
+    window = MainWindow(serial_mgr)
+    if args.capture:
+        window.serial_mgr.start_capture(args.capture)
     window.show()
 
-    sys.exit(app.exec())
+    code = app.exec()
+    if args.capture:
+        window.serial_mgr.stop_capture()
+    sys.exit(code)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,12 @@
+import threading
 import time
-import csv
 from abc import ABC, abstractmethod
-from typing import Callable, Optional, Set, List
+from typing import Callable, Optional, Set, List, Tuple
 
+from core.csv_export import ExportCancelled, export_csv
+from core.data_export import export_file
+from core.run_recorder import RunRecorder
+from core.sample_store import SampleStore
 from core.serial_manager import SerialManager
 
 
@@ -11,7 +15,7 @@ class BaseMeasurement(ABC):
     Základ pro všechna měření:
       - správa start/stop
       - callbacky pro nové datové body a změnu stavu
-      - univerzální export do CSV
+      - univerzální export do CSV (a Parquet/Feather/.npz přes export_to_file)
     """
 
     def __init__(self, serial_mgr: SerialManager):
@@ -19,22 +23,38 @@ class BaseMeasurement(ABC):
         self._on_data: Optional[Callable[[float, dict], None]] = None
         self._on_progress: Optional[Callable[[float], None]] = None
         self._on_finished: Optional[Callable[[], None]] = None
+        self._on_batch: Optional[Callable[[List[Tuple[float, dict]]], None]] = None
+        self._on_error: Optional[Callable[[str], None]] = None
         self._running = False
         self._t0 = 0.0
         
-        # Zde se mohou ukládat data pro export (seznam slovníků)
+        # Zde se mohou ukládat data pro export (SampleStore, řádky čte jako slovníky)
         # Pokud měření data neukládá, zůstane toto None nebo prázdné
-        self.recorded_data: Optional[List[dict]] = None
+        self.recorded_data: Optional[SampleStore] = None
+        # Volitelný zápis na disk; pak je recorded_data přímo recorder a export čte ze souboru
+        self.recorder: Optional[RunRecorder] = None
 
     def set_callbacks(
         self,
         on_data: Callable[[float, dict], None],
         on_progress: Callable[[float], None],
         on_finished: Callable[[], None],
+        on_batch: Optional[Callable[[List[Tuple[float, dict]]], None]] = None,
+        on_error: Optional[Callable[[str], None]] = None,
     ):
         self._on_data = on_data
         self._on_progress = on_progress
         self._on_finished = on_finished
+        self._on_batch = on_batch
+        self._on_error = on_error
+
+    def set_recorder(self, recorder: Optional[RunRecorder]):
+        """Vzorky se budou průběžně zapisovat do run souboru (nastavuje se před start())."""
+        self.recorder = recorder
+
+    def make_recorded_data(self):
+        """Úložiště vzorků pro nový běh: recorder, pokud je nastaven, jinak SampleStore v paměti."""
+        return self.recorder if self.recorder is not None else SampleStore()
 
     def start(self):
         if self._running:
@@ -48,6 +68,8 @@ class BaseMeasurement(ABC):
             return
         self._running = False
         self.on_stop()
+        if self.recorder is not None:
+            self.recorder.close()
         if self._on_finished:
             self._on_finished()
 
@@ -61,54 +83,71 @@ class BaseMeasurement(ABC):
         if self._on_data:
             self._on_data(t_s, values)
 
+    def emit_batch(self, samples: List[Tuple[float, dict]]):
+        """Předá více vzorků najednou (jedním voláním, pokud je nastaven on_batch)."""
+        if self._on_batch:
+            self._on_batch(samples)
+        elif self._on_data:
+            for t_s, values in samples:
+                self._on_data(t_s, values)
+
+    def emit_error(self, message: str):
+        if self._on_error:
+            self._on_error(message)
+
     def emit_progress(self, fraction: float):
         if self._on_progress:
             self._on_progress(max(0.0, min(1.0, fraction)))
 
-    def export_to_csv(self, filename: str, allowed_sensors: Optional[Set[str]] = None) -> bool:
+    def snapshot(self):
+        """
+        Konzistentní pohled na dosud naměřená data (SampleSnapshot / RunSnapshot), bez kopie.
+        Lze volat z libovolného vlákna i během měření; zápis nových vzorků nijak nebrzdí.
+        """
+        if self.recorded_data is None:
+            return None
+        return self.recorded_data.snapshot()
+
+    def export_to_csv(self, filename: str, allowed_sensors: Optional[Set[str]] = None,
+                      progress: Optional[Callable[[float], None]] = None,
+                      cancel: Optional[threading.Event] = None) -> bool:
         """
-        Univerzální export uložených dat do CSV.
+        Univerzální export uložených dat do CSV (core.csv_export).
         - Používá středník jako oddělovač (Excel friendly).
         - Převádí desetinné tečky na čárky.
         - Filtruje sloupce podle allowed_sensors (pokud je zadáno).
+        Lze volat z pracovního vlákna i během měření: exportuje se snímek dat
+        v okamžiku volání. Zrušení přes cancel vyhodí ExportCancelled.
         """
-        if not self.recorded_data:
+        data = self.snapshot()
+        if not data:
             return False
-        
+
         try:
-            # 1. Zjistíme všechny dostupné klíče z prvního řádku
-            all_keys = list(self.recorded_data[0].keys())
-            
-            # 2. Filtrace sloupců
-            if allowed_sensors:
-                # Vždy zachováme 't_s', zbytek filtrujeme
-                fieldnames = [k for k in all_keys if k == "t_s" or k in allowed_sensors]
-            else:
-                fieldnames = all_keys
-            
-            # 3. Zajistíme, že t_s je první
-            if "t_s" in fieldnames:
-                fieldnames.remove("t_s")
-                fieldnames.insert(0, "t_s")
-            
-            # 4. Zápis do souboru
-            with open(filename, mode='w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=';')
-                writer.writeheader()
-                
-                for row in self.recorded_data:
-                    # Vytvoříme filtrovaný řádek s formátovanými čísly
-                    out_row = {}
-                    for k in fieldnames:
-                        if k in row:
-                            val = row[k]
-                            if isinstance(val, float):
-                                # Trik pro český Excel: 10.5 -> 10,5
-                                out_row[k] = str(val).replace('.', ',')
-                            else:
-                                out_row[k] = val
-                    writer.writerow(out_row)
+            export_csv(filename, data, allowed_sensors, progress, cancel)
             return True
+        except ExportCancelled:
+            raise
+        except Exception as e:
+            print(f"Export error: {e}")
+            return False
+
+    def export_to_file(self, filename: str, allowed_sensors: Optional[Set[str]] = None,
+                       progress: Optional[Callable[[float], None]] = None,
+                       cancel: Optional[threading.Event] = None) -> bool:
+        """
+        Export ve formátu podle přípony (core.data_export): .csv jako export_to_csv,
+        .parquet/.feather (s pyarrow) a .npz se zachovanými typy a jednotkami v metadatech.
+        """
+        data = self.snapshot()
+        if not data:
+            return False
+
+        try:
+            export_file(filename, data, allowed_sensors, progress, cancel)
+            return True
+        except ExportCancelled:
+            raise
         except Exception as e:
             print(f"Export error: {e}")
             return False
@@ -127,4 +166,12 @@ class BaseMeasurement(ABC):
         Každé měření si samo rozhodne, co s přijatým řádkem ze sériovky.
         Volá UI / jádro přes SerialManager.set_line_callback(...)
         """
-        ...
\ No newline at end of file
+        ...
+
+    def handle_lines(self, lines: List[str], t_arrival: float):
+        """
+        Dávková varianta handle_line pro SerialManager.set_batch_callback(...).
+        Výchozí implementace jen volá handle_line pro každý řádek.
+        """
+        for line in lines:
+            self.handle_line(line)
\ No newline at end of file
@@ -1,4 +1,5 @@
-import time
+from typing import List
+
 from measurements.streaming_measurement import StreamingTempMeasurement
 
 class PartOneMeasurement(StreamingTempMeasurement):
@@ -15,21 +16,19 @@ class PartOneMeasurement(StreamingTempMeasurement):
         self._pwm_value = pwm_value
         self._adc_filter = adc_filter
 
-    def on_start(self):
+    def startup_commands(self) -> List[str]:
         """
         Specifická logika pro start Části 1:
         Nastavíme PWM, Filtr a pak pustíme standardní měření.
+        Vše jde jednou dávkou, čeká se jen na potvrzení od ESP.
         """
-        if self.serial.is_open():
-            # 1. Nastavení PWM
-            print(f"PartOne: Nastavuji PWM CH{self._pwm_channel} -> {self._pwm_value}%")
-            self.serial.write_line(f"SET PWM {self._pwm_channel} {self._pwm_value}")
-            time.sleep(0.1)
-            
-            # 2. Nastavení Filtru
-            filter_val = 1 if self._adc_filter else 0
-            print(f"PartOne: Nastavuji Filter -> {filter_val}")
-            self.serial.write_line(f"SET FILTER {filter_val}")
-            time.sleep(0.1)
+        # 1. Nastavení PWM
+        print(f"PartOne: Nastavuji PWM CH{self._pwm_channel} -> {self._pwm_value}%")
+        commands = [f"SET PWM {self._pwm_channel} {self._pwm_value}"]
+        
+        # 2. Nastavení Filtru
+        filter_val = 1 if self._adc_filter else 0
+        print(f"PartOne: Nastavuji Filter -> {filter_val}")
+        commands.append(f"SET FILTER {filter_val}")
             
-        super().on_start()
\ No newline at end of file
+        return commands + super().startup_commands()
\ No newline at end of file
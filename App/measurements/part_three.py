@@ -49,6 +49,12 @@ class PartThreeMeasurement(StreamingTempMeasurement):
             self.serial.write_line("SET PWM 0 0") 
             self.serial.write_line("SET PWM 1 0") 
 
+    def resume(self, downtime_s: float = 0.0) -> bool:
+        # ESP po restartu začíná s vypnutým PWM -> příští zásah regulátoru se musí odeslat
+        self.last_pwm_heat = 0
+        self.last_pwm_cool = 0
+        return super().resume(downtime_s)
+
     # Metodu handle_line() jsme smazali -> použije se ta z StreamingTempMeasurement,
     # která správně parsuje data z ESP32.
 
@@ -1,15 +1,17 @@
 import threading
 import time
-from typing import Optional
+from typing import Optional, List, Tuple
 
 from measurements.base import BaseMeasurement
-from core.parser import parse_json_message, extract_data_values
+from core.command_channel import CommandChannel, CommandError
+from core.parser import DataLineParser, classify_message, parse_json_message
+from core.sample_store import SampleStore
 
 
 class StreamingTempMeasurement(BaseMeasurement):
     """
     Měření přes JSON protokol.
-    Start: Pošle "SET RATE" a pak "START".
+    Start: Pošle "SET RATE" a pak "START" a počká na jejich potvrzení.
     Stop: Pošle "STOP".
     Data: Parsuje JSON, posílá do grafu a UKLÁDÁ PRO EXPORT.
     """
@@ -18,6 +20,7 @@ class StreamingTempMeasurement(BaseMeasurement):
     SAMPLE_RATE_HZ = 2.0  # Defaultní frekvence (lze přepsat v potomcích)
     NO_DATA_TIMEOUT_S = 5.0
     SHOW_REFERENCE_CURVE = False
+    BINARY_FORMAT = False   # True -> data jako binární rámce (SET FORMAT BIN), jinak JSON
 
     def __init__(self, serial_mgr, **kwargs):
         super().__init__(serial_mgr)
@@ -26,8 +29,21 @@ class StreamingTempMeasurement(BaseMeasurement):
         self._t0_ms: Optional[float] = None
         self._last_data_time = 0.0
         self._last_ping_time = 0.0 
+        self._last_t_s = 0.0   # čas posledního vzorku podle t_ms z ESP
+        self._last_t_ms = 0    # t_ms posledního vzorku (pokles = ESP restartovalo)
+        self._commands: Optional[CommandChannel] = None
+        self._parser = DataLineParser()
+        # True -> hlídání řídí někdo jiný voláním watchdog_tick() (např. DevicePool),
+        # měření pak nespouští vlastní vlákno
+        self.external_watchdog = False
+
+        # Obnova po výpadku spojení: první vzorek po prepare_resume() znovu ukotví časovou osu
+        self._resume_pending = False
+        self.gaps: List[Tuple[float, float]] = []   # (začátek, konec) výpadků v t_s
+        self.reconnects = 0
+        self.downtime_s = 0.0
         
-        self.recorded_data = []
+        self.recorded_data = SampleStore()
 
     def on_start(self):
         """
@@ -38,76 +54,203 @@ class StreamingTempMeasurement(BaseMeasurement):
             return
 
         self._stop_flag = False
-        self.recorded_data = [] 
+        self.recorded_data = self.make_recorded_data()
         
         self._t0_ms = None 
+        self._last_t_s = 0.0
+        self._last_t_ms = 0
+        self._resume_pending = False
+        self.gaps = []
+        self.reconnects = 0
+        self.downtime_s = 0.0
         self._last_data_time = time.time()
         self._last_ping_time = time.time()
 
-        # --- NOVÉ: Odeslání vzorkovací frekvence ---
+        # Příkazy odešleme hned za sebou, start trvá jen tak dlouho, jak rychle ESP potvrzuje
+        self._commands = CommandChannel(self.serial)
+        if self.external_watchdog:
+            # DevicePool volá start mimo GUI i mimo smyčku asyncio a na výsledek čeká
+            self._send_startup(self._commands)
+        else:
+            # Na potvrzení čeká vlákno měření, ne GUI (ESP, které mlčí, by ho zablokovalo
+            # na celý ack timeout); chyba startu přijde přes emit_error a on_finished
+            self._worker_thread = threading.Thread(target=self._run_worker, args=(self._commands,), daemon=True)
+            self._worker_thread.start()
+
+    def _send_startup(self, commands: CommandChannel) -> bool:
+        try:
+            results = commands.pipeline(self.startup_commands())
+        except CommandError as e:
+            if self._stop_flag:
+                return False   # měření mezitím zastavil uživatel
+            print(f"Start měření selhal: {e}")
+            self.emit_error(f"Start měření selhal: {e}")
+            self.stop()
+            return False
+
+        for r in results:
+            print(f"  {r.command}: potvrzeno za {r.rtt_s * 1000:.1f} ms")
+        return True
+
+    def _run_worker(self, commands: CommandChannel):
+        if self._send_startup(commands):
+            self._watchdog_loop()
+
+    def startup_commands(self) -> List[str]:
+        """Příkazy odeslané při startu (potomci mohou přidat vlastní nastavení)."""
+        commands = []
         if hasattr(self, "SAMPLE_RATE_HZ") and self.SAMPLE_RATE_HZ > 0:
             print(f"Nastavuji vzorkovací frekvenci: {self.SAMPLE_RATE_HZ} Hz")
-            self.serial.write_line(f"SET RATE {self.SAMPLE_RATE_HZ}")
-            time.sleep(0.1) # Krátká pauza pro zpracování
-        # -------------------------------------------
+            commands.append(f"SET RATE {self.SAMPLE_RATE_HZ}")
+        if self.BINARY_FORMAT:
+            print("Přepínám data na binární rámce")
+            self.serial.set_binary_frames(True)
+            commands.append("SET FORMAT BIN")
+        commands.append("START")
+        return commands
 
-        print("Odesílám příkaz START...")
-        self.serial.write_line("START")
-        
-        self._worker_thread = threading.Thread(target=self._watchdog_loop, daemon=True)
-        self._worker_thread.start()
+    def prepare_resume(self):
+        """
+        Spojení spadlo (volá se ještě před znovuotevřením portu): první vzorek,
+        který pak dorazí, naváže časovou osu a zapíše výpadek. Musí to být
+        nastavené dřív, než se znovu spustí čtení, jinak by se data z desky,
+        která nerestartovala, zpracovala ještě před resume().
+        """
+        if not self._stop_flag and self.is_running():
+            self._resume_pending = True
+
+    def resume(self, downtime_s: float = 0.0) -> bool:
+        """
+        Pokračování běžícího měření po obnovení spojení (SerialManager reconnect).
+        Znovu pošle startovací příkazy (ESP mohlo mezitím restartovat).
+        """
+        if self._stop_flag or not self.is_running():
+            return False
+
+        self.reconnects += 1
+        self.downtime_s += downtime_s
+
+        if self._commands is None:
+            self._commands = CommandChannel(self.serial)
+        try:
+            self._commands.pipeline(self.startup_commands())
+        except CommandError as e:
+            if self._stop_flag:
+                return False   # měření mezitím zastavil uživatel
+            if self.BINARY_FORMAT:
+                # ESP po restartu posílá JSON, framer nesmí zůstat v binárním režimu
+                self.serial.set_binary_frames(False)
+            print(f"Obnovení měření selhalo: {e}")
+            self.emit_error(f"Obnovení měření selhalo: {e}")
+            self.stop()
+            return False
+        print(f"Měření pokračuje (obnova č. {self.reconnects}, výpadek {downtime_s:.2f} s)")
+        return True
 
     def on_stop(self):
         self._stop_flag = True
         if self.serial.is_open():
             print("Odesílám příkaz STOP...")
             self.serial.write_line("STOP")
+            if self.BINARY_FORMAT:
+                self.serial.write_line("SET FORMAT JSON")
+        if self.BINARY_FORMAT:
+            # Další měření na stejném spojení může chtít JSON
+            self.serial.set_binary_frames(False)
+        if self._commands:
+            self._commands.close()
+            self._commands = None
 
     def handle_line(self, line: str):
-        msg = parse_json_message(line)
-        if msg is None: return
+        sample = self._process_line(line, time.time())
+        if sample is not None:
+            self.emit_data(*sample)
+
+    def handle_lines(self, lines: List[str], t_arrival: float):
+        """Zpracuje celý blok řádků a odešle vzorky jedním voláním emit_batch."""
+        samples = []
+        for line in lines:
+            sample = self._process_line(line, t_arrival)
+            if sample is not None:
+                samples.append(sample)
+        if samples:
+            self.emit_batch(samples)
 
-        if msg.get("type") == "error":
+    def _process_line(self, line: str, t_arrival: float) -> Optional[Tuple[float, dict]]:
+        """Naparsuje řádek, uloží vzorek pro export a vrátí (t_s, data) pro UI."""
+        kind = classify_message(line)
+        if kind == "error":
+            msg = parse_json_message(line) or {}
             print(f"-> ESP HLÁSÍ CHYBU: {msg.get('msg')}")
-            return
-        
-        if msg.get("type") == "ack": return
+            return None
+        if kind != "data": return None
 
-        data = extract_data_values(msg)
-        #if not data: return
+        parsed = self._parser.parse(line)
+        if parsed is None: return None
+        t_ms, data = parsed
 
-        self._last_data_time = time.time()
+        prev_data_time = self._last_data_time
+        self._last_data_time = t_arrival
 
-        t_ms = msg.get("t_ms")
-        if isinstance(t_ms, (int, float)):
+        if t_ms is not None:
+            rebooted = t_ms < self._last_t_ms
+            if self._t0_ms is not None and (self._resume_pending or rebooted):
+                self._resume_pending = False
+                gap_start = self._last_t_s
+                if rebooted:
+                    # ESP restartovalo (t_ms od nuly) -> posuneme kotvu tak, aby t_s
+                    # navázal na poslední vzorek plus skutečnou délku výpadku
+                    gap_end = gap_start + max(0.0, t_arrival - prev_data_time)
+                    self._t0_ms = float(t_ms) - gap_end * 1000.0
+                else:
+                    # ESP běželo dál, t_ms je souvislé a výpadek je přesně mezera v něm
+                    gap_end = (float(t_ms) - self._t0_ms) / 1000.0
+                self._record_gap(gap_start, gap_end)
             if self._t0_ms is None:
                 self._t0_ms = float(t_ms)
+            self._last_t_ms = t_ms
             t_s = max(0.0, (float(t_ms) - self._t0_ms) / 1000.0)
         else:
             t_s = self.now_s()
 
-        row = {"t_s": round(t_s, 3), **data}
-        self.recorded_data.append(row)
+        self._last_t_s = t_s
+        self.recorded_data.append(round(t_s, 3), data)
+
+        return t_s, data
+
+    def _record_gap(self, start_s: float, end_s: float):
+        """Výpadek se uloží do self.gaps a do metadat run souboru (ne mezi vzorky)."""
+        self.gaps.append((start_s, end_s))
+        if self.recorder is not None:
+            self.recorder.set_meta("gaps", [[round(a, 3), round(b, 3)] for a, b in self.gaps])
+
+    def watchdog_tick(self) -> bool:
+        """
+        Jeden krok hlídání: průběh, PING a konec po DURATION_S.
+        Vrátí False, jakmile měření skončilo.
+        """
+        if self._stop_flag or not self.is_running():
+            return False
+        now = time.time()
+        # Při přehrávání záznamu rychleji než v reálném čase běží čas dat napřed
+        elapsed = max(self.now_s(), self._last_t_s)
+        
+        self.emit_progress(min(1.0, elapsed / self.DURATION_S))
+        
+        if now - self._last_ping_time > 1.0:
+            self.serial.write_line("PING")
+            self._last_ping_time = now
+
+        if (now - self._last_data_time) > self.NO_DATA_TIMEOUT_S:
+            # Timeout logic...
+            pass
+        
+        if elapsed >= self.DURATION_S:
+            self.stop()
+            return False
 
-        self.emit_data(t_s, data)
+        return True
 
     def _watchdog_loop(self):
-        while not self._stop_flag and self.is_running():
-            now = time.time()
-            elapsed = self.now_s()
-            
-            self.emit_progress(min(1.0, elapsed / self.DURATION_S))
-            
-            if now - self._last_ping_time > 1.0:
-                self.serial.write_line("PING")
-                self._last_ping_time = now
-
-            if (now - self._last_data_time) > self.NO_DATA_TIMEOUT_S:
-                # Timeout logic...
-                pass
-            
-            if elapsed >= self.DURATION_S:
-                self.stop()
-                break
-                
+        while self.watchdog_tick():
             time.sleep(0.1)
\ No newline at end of file
@@ -0,0 +1,11 @@
+"""
+App/tests/conftest.py
+Testy se spouštějí ze složky App (python -m pytest tests); moduly se importují
+stejně jako v aplikaci (from core.x import Y).
+"""
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
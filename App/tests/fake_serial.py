@@ -0,0 +1,49 @@
+"""
+App/tests/fake_serial.py
+Náhrada SerialManageru pro testy: zaznamenává odeslané příkazy a přijaté řádky
+doručuje posluchačům stejně jako čtecí vlákno. Odpovědi může vracet respond().
+"""
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class FakeSerial:
+    def __init__(self, respond: Optional[Callable[[str], List[str]]] = None):
+        self.respond = respond
+        self.sent: List[str] = []
+        self.binary = False
+        self.open = True
+        self._listeners = ()
+        self._batch_callback = None
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        return self.open
+
+    def add_line_listener(self, cb):
+        self._listeners = self._listeners + (cb,)
+
+    def remove_line_listener(self, cb):
+        self._listeners = tuple(l for l in self._listeners if l != cb)
+
+    def set_batch_callback(self, cb):
+        self._batch_callback = cb
+
+    def set_binary_frames(self, enabled: bool):
+        self.binary = enabled
+
+    def write_line(self, line: str):
+        with self._lock:
+            self.sent.append(line)
+        if self.respond is not None:
+            replies = self.respond(line)
+            if replies:
+                self.receive(replies)
+
+    def receive(self, lines: List[str]):
+        t_arrival = time.time()
+        for listener in self._listeners:
+            listener(lines, t_arrival)
+        if self._batch_callback:
+            self._batch_callback(lines, t_arrival)
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import pty
+import time
+import tty
+
+import pytest
+
+from core.async_serial_manager import AsyncSerialManager, DeviceError
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="pseudo-terminál jen na POSIX")
+
+
+@pytest.fixture
+def pty_port():
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    os.set_blocking(master, False)
+    yield master, os.ttyname(slave)
+    for fd in (master, slave):
+        os.close(fd)
+
+
+@pytest.fixture
+def mgr():
+    manager = AsyncSerialManager()
+    yield manager
+    manager.close()
+
+
+def read_exactly(fd: int, n: int, timeout: float = 5.0) -> bytes:
+    out = bytearray()
+    deadline = time.monotonic() + timeout
+    while len(out) < n and time.monotonic() < deadline:
+        try:
+            out += os.read(fd, 65536)
+        except BlockingIOError:
+            time.sleep(0.001)
+    return bytes(out)
+
+
+def numbered_lines(count: int) -> str:
+    return "".join(f"{i:07d}\n" for i in range(count))
+
+
+def test_attach_open_and_request(pty_port, mgr):
+    master, port = pty_port
+    mgr.open(port, timeout=0.05, reset=False)
+    assert mgr.is_open()
+    reply = asyncio.run_coroutine_threadsafe(mgr.request("PING"), mgr.loop)
+    assert read_exactly(master, 5) == b"PING\n"
+    os.write(master, b'{"type":"ack","cmd":"ping"}\n')
+    assert reply.result(timeout=2.0) == {"type": "ack", "cmd": "ping"}
+
+
+def test_large_write_does_not_block_loop(pty_port, mgr):
+    master, port = pty_port
+    mgr.open(port, reset=False)
+    # o řád víc, než pojme buffer pty -> zbytek musí počkat na add_writer
+    payload = numbered_lines(100000)
+    mgr.write(payload)
+
+    # smyčka mezitím obsluhuje ostatní (nečeká v blokujícím write)
+    t0 = time.perf_counter()
+    asyncio.run_coroutine_threadsafe(asyncio.sleep(0), mgr.loop).result(timeout=1.0)
+    assert time.perf_counter() - t0 < 0.5
+    assert mgr._out
+
+    assert read_exactly(master, len(payload)) == payload.encode()
+    time.sleep(0.05)
+    assert not mgr._out
+
+
+def test_write_async_waits_for_drain(pty_port, mgr):
+    master, port = pty_port
+    mgr.open(port, reset=False)
+    payload = numbered_lines(30000)
+    done = asyncio.run_coroutine_threadsafe(mgr.write_async(payload), mgr.loop)
+    time.sleep(0.1)
+    assert not done.done()   # zbytek čeká, až si druhá strana přečte
+    assert read_exactly(master, len(payload)) == payload.encode()
+    done.result(timeout=2.0)
+
+
+def test_close_fails_pending_drain(pty_port, mgr):
+    _, port = pty_port
+    mgr.open(port, reset=False)
+    done = asyncio.run_coroutine_threadsafe(mgr.write_async(numbered_lines(30000)), mgr.loop)
+    time.sleep(0.05)
+    mgr.close()
+    with pytest.raises(ConnectionError):
+        done.result(timeout=2.0)
+
+
+def test_error_fails_only_the_matching_request(pty_port, mgr):
+    master, port = pty_port
+    mgr.open(port, reset=False)
+    start = asyncio.run_coroutine_threadsafe(mgr.request("START"), mgr.loop)
+    rate = asyncio.run_coroutine_threadsafe(mgr.request("SET RATE 999"), mgr.loop)
+    assert read_exactly(master, 19) == b"START\nSET RATE 999\n"
+
+    os.write(master, b'{"type":"error","cmd":"set_pwm","msg":"bad channel"}\n')   # nikdo nečeká
+    os.write(master, b'{"type":"error","cmd":"set_rate","msg":"rate out of range"}\n')
+    with pytest.raises(DeviceError, match="rate out of range"):
+        rate.result(timeout=2.0)
+    assert not start.done()
+    os.write(master, b'{"type":"ack","cmd":"start"}\n')
+    assert start.result(timeout=2.0)["cmd"] == "start"
+
+
+def test_error_without_cmd_fails_oldest_request(pty_port, mgr):
+    master, port = pty_port
+    mgr.open(port, reset=False)
+    start = asyncio.run_coroutine_threadsafe(mgr.request("START"), mgr.loop)
+    rate = asyncio.run_coroutine_threadsafe(mgr.request("SET RATE 2"), mgr.loop)
+    assert read_exactly(master, 17) == b"START\nSET RATE 2\n"
+
+    os.write(master, b'{"type":"error","msg":"busy"}\n')
+    with pytest.raises(DeviceError, match="busy"):
+        start.result(timeout=2.0)
+    assert not rate.done()
+    os.write(master, b'{"type":"ack","cmd":"set_rate"}\n')
+    assert rate.result(timeout=2.0)["cmd"] == "set_rate"
@@ -0,0 +1,70 @@
+import time
+
+from core.binary_protocol import decode_frames_columnar, decode_payload, encode_frame, HEADER_SIZE
+from core.line_framer import LineFramer
+from core.parser import DataLineParser
+from measurements.streaming_measurement import StreamingTempMeasurement
+from tests.fake_serial import FakeSerial
+
+VALUES = [22.0024, None, 1234.56, 2345.67, 1200.0, 2300.01, 23.5625, -10.1234]
+JSON_LINE = ('{"type":"data","t_ms":500,"T_TMP":22.0024,"T_BME":null,"V_ADS_R":1234.56,'
+             '"V_ADS_NTC":2345.67,"V_ESP_R":1200.00,"V_ESP_NTC":2300.01,'
+             '"T_DS0":23.5625,"T_DS1":-10.1234}')
+
+
+def test_payload_is_rounded_like_json():
+    frame = encode_frame(500, VALUES)
+    msg = decode_payload(memoryview(frame)[HEADER_SIZE:-1])
+    assert msg["T_TMP"] == 22.0024   # ne 22.002399444580078
+    assert msg["T_BME"] is None
+    assert msg["V_ESP_NTC"] == 2300.01
+
+
+def test_binary_and_json_give_same_values():
+    framer = LineFramer()
+    framer.binary = True
+    (msg,) = framer.feed(encode_frame(500, VALUES))
+    assert DataLineParser().parse(msg) == DataLineParser().parse(JSON_LINE)
+
+
+def test_columnar_matches_payload():
+    data = encode_frame(0, VALUES) + encode_frame(10, VALUES)
+    t_ms, cols, skipped = decode_frames_columnar(data)
+    assert skipped == 0 and list(t_ms) == [0, 10]
+    assert cols["T_DS1"].tolist() == [-10.1234, -10.1234]
+    # pomalá cesta (rámce různé délky) zaokrouhluje stejně
+    _, cols, _ = decode_frames_columnar(data + encode_frame(20, VALUES[:6]))
+    assert cols["V_ADS_R"].tolist() == [1234.56] * 3
+
+
+class _Binary(StreamingTempMeasurement):
+    DURATION_S = 60.0
+    BINARY_FORMAT = True
+
+
+def test_stop_switches_framer_back_to_text():
+    acks = {"SET RATE 2.0": "set_rate", "SET FORMAT BIN": "set_format", "START": "start"}
+    serial = FakeSerial(lambda line: [f'{{"type":"ack","cmd":"{acks[line]}"}}'] if line in acks else [])
+    meas = _Binary(serial)
+    meas.set_callbacks(on_data=lambda *a: None, on_progress=lambda f: None, on_finished=lambda: None)
+    meas.start()
+    time.sleep(0.2)
+    assert serial.binary
+    meas.stop()
+    assert serial.sent[-2:] == ["STOP", "SET FORMAT JSON"]
+    assert not serial.binary
+
+
+def test_failed_resume_switches_framer_back_to_text():
+    acks = {"SET RATE 2.0": "set_rate", "SET FORMAT BIN": "set_format", "START": "start"}
+    serial = FakeSerial(lambda line: [f'{{"type":"ack","cmd":"{acks[line]}"}}'] if line in acks else [])
+    meas = _Binary(serial)
+    errors = []
+    meas.set_callbacks(on_data=lambda *a: None, on_progress=lambda f: None,
+                       on_finished=lambda: None, on_error=errors.append)
+    meas.start()
+    time.sleep(0.2)
+    serial.respond = None   # po obnově spojení ESP nepotvrdí nic
+    meas._commands.ack_timeout = 0.05
+    assert not meas.resume(1.0)
+    assert errors and not serial.binary
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from core.command_channel import CommandChannel, CommandError
+from measurements.streaming_measurement import StreamingTempMeasurement
+from tests.fake_serial import FakeSerial
+
+ACKS = {"START": "start", "STOP": "stop", "SET RATE 2.0": "set_rate", "SET PWM 0 50": "set_pwm"}
+
+
+def ack_all(line: str):
+    name = ACKS.get(line)
+    return [f'{{"type":"ack","cmd":"{name}"}}'] if name else []
+
+
+def test_pipeline_pairs_acks():
+    channel = CommandChannel(FakeSerial(ack_all))
+    results = channel.pipeline(["SET RATE 2.0", "START"])
+    assert [r.ack["cmd"] for r in results] == ["set_rate", "start"]
+
+
+def test_error_with_cmd_goes_to_that_command():
+    serial = FakeSerial()
+    channel = CommandChannel(serial, ack_timeout=2.0)
+
+    def reply():
+        time.sleep(0.05)
+        # ack pro START dorazí, chyba patří SET RATE, i když START je v pořadí až druhý
+        serial.receive(['{"type":"error","msg":"invalid_rate","cmd":"set_rate"}'])
+        serial.receive(['{"type":"ack","cmd":"start"}'])
+
+    threading.Thread(target=reply).start()
+    with pytest.raises(CommandError, match="SET RATE 99"):
+        channel.pipeline(["SET RATE 99", "START"])
+
+
+def test_error_for_unknown_cmd_is_ignored():
+    serial = FakeSerial()
+    channel = CommandChannel(serial, ack_timeout=1.0)
+
+    def reply():
+        time.sleep(0.05)
+        serial.receive(['{"type":"error","msg":"invalid_rate","cmd":"set_rate"}', '{"type":"ack","cmd":"start"}'])
+
+    threading.Thread(target=reply).start()
+    assert channel.send("START").ack == {"type": "ack", "cmd": "start"}
+
+
+def test_error_without_cmd_goes_to_oldest():
+    serial = FakeSerial()
+    channel = CommandChannel(serial, ack_timeout=2.0)
+
+    def reply():
+        time.sleep(0.05)
+        serial.receive(['{"type":"error","msg":"busy"}'])
+
+    threading.Thread(target=reply).start()
+    with pytest.raises(CommandError, match="SET PWM 0 50: ESP hlásí chybu 'busy'"):
+        channel.pipeline(["SET PWM 0 50", "START"])
+
+
+def test_missing_ack_times_out():
+    channel = CommandChannel(FakeSerial(), ack_timeout=0.05)
+    with pytest.raises(CommandError, match="bez potvrzení"):
+        channel.send("START")
+
+
+class _Quick(StreamingTempMeasurement):
+    DURATION_S = 60.0
+
+
+def test_start_does_not_wait_for_silent_board():
+    meas = _Quick(FakeSerial())
+    errors, finished = [], threading.Event()
+    meas.set_callbacks(on_data=lambda *a: None, on_progress=lambda f: None,
+                       on_finished=finished.set, on_error=errors.append)
+    t0 = time.perf_counter()
+    meas.start()
+    assert time.perf_counter() - t0 < 0.2   # ack timeout je 1 s, start na něj nečeká
+    assert finished.wait(3.0)
+    assert errors and "bez potvrzení" in errors[0]
+    assert not meas.is_running()
+
+
+def test_start_with_acks_keeps_running():
+    serial = FakeSerial(ack_all)
+    meas = _Quick(serial)
+    meas.set_callbacks(on_data=lambda *a: None, on_progress=lambda f: None, on_finished=lambda: None)
+    meas.start()
+    time.sleep(0.2)
+    assert meas.is_running()
+    assert serial.sent[:2] == ["SET RATE 2.0", "START"]
+    meas.stop()
+    assert "STOP" in serial.sent
@@ -0,0 +1,98 @@
+from core.binary_protocol import encode_frame
+from core.line_framer import SMALL_READ, LineFramer
+
+
+def feed_all(framer, chunks):
+    out = []
+    for chunk in chunks:
+        out.extend(framer.feed(chunk))
+    return out
+
+
+def test_complete_lines_in_one_block():
+    assert LineFramer().feed(b"a\nbb\nccc\n") == ["a", "bb", "ccc"]
+
+
+def test_partial_line_waits_for_rest():
+    framer = LineFramer()
+    assert list(framer.feed(b'{"type":"da')) == []
+    assert framer.pending == 11
+    assert framer.feed(b'ta"}\n{"x"') == ['{"type":"data"}']
+    assert framer.pending == 4
+    assert framer.feed(b":1}\n") == ['{"x":1}']
+    assert framer.pending == 0
+
+
+def test_byte_by_byte_equals_whole_block():
+    data = b"first\r\nsecond line\r\n\r\nthird\n"
+    assert feed_all(LineFramer(), [data[i:i + 1] for i in range(len(data))]) == ["first", "second line", "third"]
+
+
+def test_crlf_and_blank_lines_are_stripped():
+    assert LineFramer().feed(b"  x \r\n\r\n\n y\r\n") == ["x", "y"]
+
+
+def test_crlf_split_between_reads():
+    framer = LineFramer()
+    assert list(framer.feed(b"abc\r")) == []
+    assert framer.feed(b"\ndef\r\n") == ["abc", "def"]
+
+
+def test_line_longer_than_buffer_grows_capacity():
+    framer = LineFramer(capacity=64)
+    long_line = b"x" * 10000
+    chunks = [long_line[i:i + 100] for i in range(0, len(long_line), 100)] + [b"\nend\n"]
+    assert feed_all(framer, chunks) == ["x" * 10000, "end"]
+    assert framer.capacity >= 10000
+    assert framer.pending == 0
+
+
+def test_small_reads_overflowing_fast_path():
+    # rozpracovaný řádek přeroste SMALL_READ -> přesun do bufferu bez ztráty dat
+    framer = LineFramer()
+    line = b"y" * (3 * SMALL_READ)
+    chunks = [line[i:i + 50] for i in range(0, len(line), 50)] + [b"\nz\n"]
+    assert feed_all(framer, chunks) == ["y" * (3 * SMALL_READ), "z"]
+
+
+def test_mixed_small_and_large_reads():
+    lines = [f'{{"type":"data","t_ms":{i},"T_TMP":2{i % 10}.5}}'.encode() for i in range(2000)]
+    data = b"\r\n".join(lines) + b"\r\n"
+    chunks, pos = [], 0
+    for size in (7, 128, 5000, 1, 300, 65536) * 40:
+        chunks.append(data[pos:pos + size])
+        pos += size
+    chunks.append(data[pos:])
+    assert feed_all(LineFramer(), chunks) == [line.decode() for line in lines]
+
+
+def test_reset_drops_partial_line():
+    framer = LineFramer()
+    framer.feed(b"garbage")
+    framer.reset()
+    assert framer.pending == 0
+    assert framer.feed(b"ok\n") == ["ok"]
+
+
+def test_invalid_utf8_is_ignored():
+    assert LineFramer().feed(b"T\xff=1\n") == ["T=1"]
+
+
+def test_binary_frames_between_text_lines():
+    framer = LineFramer()
+    framer.binary = True
+    frame = encode_frame(1500, [21.5, None])
+    data = b'{"type":"ack"}\n' + frame + b"noise\n" + frame
+    items = feed_all(framer, [data[i:i + 3] for i in range(0, len(data), 3)])
+    assert items[0] == '{"type":"ack"}'
+    assert items[1] == {"type": "data", "t_ms": 1500, "T_TMP": 21.5, "T_BME": None}
+    assert items[2] == "noise"
+    assert items[3]["t_ms"] == 1500
+
+
+def test_partial_text_survives_switch_to_binary():
+    framer = LineFramer()
+    assert list(framer.feed(b'{"type":"ack","cmd":"SET FORMAT BIN"')) == []
+    framer.binary = True
+    frame = encode_frame(7, [20.0])
+    assert framer.feed(b"}\n" + frame) == ['{"type":"ack","cmd":"SET FORMAT BIN"}', {"type": "data", "t_ms": 7, "T_TMP": 20.0}]
@@ -0,0 +1,69 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PySide6.QtWidgets")
+
+from core.sample_store import SampleStore
+from ui.realtime_plot import RealtimePlotWidget
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def wait_for(app, cond, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        app.processEvents()
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def make_store(n: int) -> SampleStore:
+    store = SampleStore()
+    t = np.arange(n) * 0.01
+    store.extend(t, {"T_TMP": 20.0 + np.sin(t), "T_BME": np.full(n, 21.0)})
+    return store
+
+
+def test_history_loads_in_background_and_keeps_live_points(app):
+    n = 400_000
+    store = make_store(n)
+    plot = RealtimePlotWidget(time_window_s=60.0, scrolling=True, ring_capacity=1024)
+    plot.set_reference_mode(False)
+    for t_s, cols in store.snapshot().iter_chunks():
+        plot.append_point(float(t_s[-1]), {k: float(c[-1]) for k, c in cols.items()})
+
+    plot.set_scrolling(False)
+    plot.load_history(store.snapshot())
+    # GUI vlákno záznam nečte, historie se použije až ze smyčky událostí
+    assert len(plot._buffers["T_TMP"]) < n
+
+    # vzorek, který přišel během načítání, se za historii připojí
+    t_live = n * 0.01
+    plot.append_point(t_live, {"T_TMP": 25.0, "T_BME": 21.0})
+    assert wait_for(app, lambda: len(plot._buffers["T_TMP"]) == n + 1)
+    assert plot._buffers["T_TMP"].x[-1] == t_live
+    assert plot._extrema["T_TMP"].range()[1] == 25.0
+    # vzorky ze snímku, které ještě čekaly ve frontě, se podruhé nepřidají
+    plot.append_point(1.0, {"T_TMP": 99.0})
+    assert len(plot._buffers["T_TMP"]) == n + 1
+
+
+def test_stale_history_is_dropped(app):
+    store = make_store(10_000)
+    plot = RealtimePlotWidget(time_window_s=60.0)
+    plot.set_reference_mode(False)
+    plot.append_point(0.0, {"T_TMP": 20.0})
+    plot.load_history(store.snapshot())
+    plot.clear()
+    plot.append_point(0.0, {"T_TMP": 20.0})
+    wait_for(app, lambda: False, timeout=0.5)
+    assert len(plot._buffers["T_TMP"]) == 1
@@ -0,0 +1,149 @@
+import sys
+import threading
+import time
+
+import pytest
+import serial
+
+from core.measurement_manager import MeasurementManager
+from core.run_recorder import RunReader
+from core.serial_manager import ReconnectPolicy, SerialManager
+from measurements.streaming_measurement import StreamingTempMeasurement
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="emulátor potřebuje pty")
+
+
+class _Fast(StreamingTempMeasurement):
+    DURATION_S = 60.0
+    SAMPLE_RATE_HZ = 20.0
+
+
+def drop_link(mgr: SerialManager):
+    """Příští čtení selže jako při odpojení USB; deska ale běží dál (bez restartu)."""
+    ser = mgr._ser
+    read = ser.read
+
+    def fail(*args, **kwargs):
+        ser.read = read
+        raise serial.SerialException("device disconnected")
+
+    ser.read = fail
+
+
+def wait_until(cond, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_outage_without_reboot_records_real_gap(tmp_path):
+    from tools.esp32_emulator import Esp32Emulator
+
+    emu = Esp32Emulator(safety_timeout=False)
+    port = emu.start()
+    mgr = SerialManager()
+    meas_mgr = MeasurementManager(mgr)
+    meas_mgr.record_runs = True
+    meas_mgr.runs_dir = str(tmp_path)
+    meas_mgr._types["test"] = _Fast
+    mgr.set_reconnect_policy(ReconnectPolicy(initial_delay_s=0.6))
+    mgr.set_reconnect_callbacks(meas_mgr.prepare_resume, meas_mgr.resume_after_reconnect)
+    try:
+        mgr.open(port, reset=False)
+        meas_mgr.start_measurement("test")
+        meas = meas_mgr._current_measurement
+        assert wait_until(lambda: len(meas.recorded_data) >= 10)
+
+        drop_link(mgr)
+        assert wait_until(lambda: meas.reconnects == 1 and meas.gaps)
+        assert wait_until(lambda: len(meas.recorded_data) >= 40)
+        meas_mgr.stop_measurement()
+    finally:
+        mgr.close()
+        emu.stop()
+
+    (gap_start, gap_end), = meas.gaps
+    # výpadek trval aspoň prodlevu před znovuotevřením portu, ne jen jednu periodu vzorkování
+    assert gap_end - gap_start >= 0.5
+
+    with RunReader(meas_mgr.run_path) as reader:
+        assert reader.meta["gaps"] == [[round(gap_start, 3), round(gap_end, 3)]]
+        assert "gap_s" not in reader.channels
+        t_s = reader.slice()[0]
+        assert (t_s[1:] > t_s[:-1]).all()
+
+
+class _Capture:
+    def __init__(self):
+        self.tx = []
+
+    def write_tx(self, text):
+        self.tx.append(text)
+
+
+def test_queued_write_is_dropped_while_port_is_closed():
+    mgr = SerialManager()
+    mgr._ser = serial.serial_for_url("loop://", timeout=0.1)
+    mgr._capture = capture = _Capture()
+    mgr._start_writer()
+    try:
+        with mgr._write_cond:   # zapisovač čeká, než port "spadne"
+            mgr.write_line("SET PWM 0 50")
+            mgr._ser = None
+        assert mgr.flush(timeout=2.0)
+        stats = mgr.write_stats()
+        assert stats["writes"] == 0 and stats["errors"] == 0 and stats["dropped"] == 1
+        assert capture.tx == []
+    finally:
+        mgr._stop_writer()
+
+
+def test_close_does_not_wait_for_blocked_reconnect_callback():
+    from tools.esp32_emulator import Esp32Emulator
+
+    emu = Esp32Emulator(safety_timeout=False)
+    port = emu.start()
+    mgr = SerialManager()
+    entered, release = threading.Event(), threading.Event()
+
+    def on_reconnected(downtime_s):
+        entered.set()
+        release.wait(5.0)   # např. handshake, který se nedočká odpovědi
+
+    mgr.set_reconnect_policy(ReconnectPolicy(initial_delay_s=0.1))
+    mgr.set_reconnect_callbacks(lambda: None, on_reconnected)
+    try:
+        mgr.open(port, reset=False)
+        drop_link(mgr)
+        assert entered.wait(5.0)
+        t0 = time.monotonic()
+        mgr.close()
+        assert time.monotonic() - t0 < 2.0
+        assert mgr._ser is None
+    finally:
+        release.set()
+        mgr.close()
+        emu.stop()
+
+
+def test_close_during_backoff_does_not_reopen_port():
+    from tools.esp32_emulator import Esp32Emulator
+
+    emu = Esp32Emulator(safety_timeout=False)
+    port = emu.start()
+    mgr = SerialManager()
+    mgr.set_reconnect_policy(ReconnectPolicy(initial_delay_s=0.3))
+    try:
+        mgr.open(port, reset=False)
+        drop_link(mgr)
+        assert wait_until(lambda: mgr._ser is None)
+        mgr.close()
+        time.sleep(0.5)
+        assert mgr._ser is None
+        assert mgr.reconnect_stats()["attempts"] == 0
+    finally:
+        mgr.close()
+        emu.stop()
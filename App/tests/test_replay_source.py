@@ -0,0 +1,51 @@
+import time
+
+from core.capture import CaptureWriter
+from core.replay_source import ReplaySerialSource
+
+HELLO = '{"type":"hello","fw":"test"}'
+
+
+def make_capture(path: str):
+    cap = CaptureWriter(path)
+    cap.write_rx([HELLO], t_mono=0.0)
+    for i in range(3):
+        cap.write_rx([f'{{"type":"data","t_ms":{i * 100},"T_TMP":20.0}}'], t_mono=1.0 + i * 0.1)
+    cap.close()
+
+
+def wait_for(cond, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_preamble_waits_for_callback(tmp_path):
+    path = str(tmp_path / "run.cap")
+    make_capture(path)
+    src = ReplaySerialSource(path, speed=0)
+    src.open()
+    time.sleep(0.1)   # bez callbacku se nic neztratí, ani když chvíli trvá ho nastavit
+    received = []
+    src.set_line_callback(received.append)
+    assert wait_for(lambda: received == [HELLO])
+    src.set_line_callback(received.append)   # podruhé se už nepošle
+    src.write_line("INFO")
+    assert wait_for(lambda: received == [HELLO, HELLO])
+    src.close()
+
+
+def test_preamble_is_sent_on_start_to_listeners(tmp_path):
+    path = str(tmp_path / "run.cap")
+    make_capture(path)
+    src = ReplaySerialSource(path, speed=0)
+    seen = []
+    src.add_line_listener(lambda lines, t: seen.extend(lines))
+    src.open()
+    src.write_line("START")
+    assert wait_for(lambda: len(seen) == 5)
+    assert seen[:2] == [HELLO, '{"type":"ack","cmd":"start"}']
+    src.close()
@@ -0,0 +1,212 @@
+import os
+import shutil
+import time
+
+import numpy as np
+
+from core.run_recorder import END_TAIL, RunReader, RunRecorder, prune_runs
+
+
+def write_rows(rec: RunRecorder, start: int, n: int):
+    for i in range(start, start + n):
+        rec.append(i * 0.5, {"T_TMP": 20.0 + i, "T_DS0": 21.0 + i})
+
+
+def test_closed_file_opens_from_index(tmp_path):
+    path = str(tmp_path / "run.tlrun")
+    rec = RunRecorder(path, {"measurement": "test"}, flush_interval_s=60.0)
+    for start in (0, 100, 200):
+        write_rows(rec, start, 100 if start < 200 else 50)
+        rec.flush()
+    rec.close()
+
+    with RunReader(path) as reader:
+        assert reader.complete and reader.indexed
+        assert len(reader) == 250 and reader.n_chunks == 3
+        assert reader.meta["measurement"] == "test"
+        assert reader.channel_info("T_TMP")["name"]
+        t_s, cols = reader.slice(10.0, 20.0, ["T_TMP"])
+        assert t_s[0] == 10.0 and t_s[-1] == 20.0
+        assert cols["T_TMP"][0] == 40.0
+
+
+def test_corrupt_index_falls_back_to_scan(tmp_path):
+    path = str(tmp_path / "run.tlrun")
+    rec = RunRecorder(path, flush_samples=100)
+    write_rows(rec, 0, 250)
+    rec.close()
+    with open(path, "r+b") as f:
+        f.seek(-END_TAIL.size - 4, os.SEEK_END)
+        f.write(b"\xff\xff\xff\xff")
+
+    with RunReader(path) as reader:
+        assert not reader.indexed
+        assert len(reader) == 250
+
+
+def test_crash_keeps_flushed_chunks_and_recorder_continues(tmp_path):
+    path = str(tmp_path / "run.tlrun")
+    crashed = str(tmp_path / "crashed.tlrun")
+    rec = RunRecorder(path, flush_interval_s=60.0)
+    write_rows(rec, 0, 100)
+    rec.flush()
+    write_rows(rec, 100, 50)
+    rec.flush()
+    # Stav souboru v okamžiku pádu: poslední chunk zapsaný jen napůl, bez indexu
+    shutil.copy(path, crashed)
+    rec.close()
+    size = os.path.getsize(crashed)
+    with open(crashed, "r+b") as f:
+        f.truncate(size - 100)
+
+    with RunReader(crashed) as reader:
+        assert not reader.complete
+        assert len(reader) == 100
+        assert reader.truncated_bytes > 0
+
+    rec = RunRecorder(crashed)
+    assert rec.recovered_bytes > 0
+    assert len(rec) == 100
+    write_rows(rec, 100, 20)
+    rec.close()
+    with RunReader(crashed) as reader:
+        assert reader.complete and len(reader) == 120
+        t_s, _ = reader.slice()
+        assert np.array_equal(t_s, np.arange(120) * 0.5)
+
+
+def test_low_rate_flush_merges_rows(tmp_path):
+    path = str(tmp_path / "run.tlrun")
+    rec = RunRecorder(path, flush_interval_s=0.02, min_chunk_rows=10, max_flush_delay_s=0.3)
+    write_rows(rec, 0, 3)
+    time.sleep(0.1)
+    assert rec.snapshot()._chunks == []   # tři vzorky ještě nestojí za vlastní chunk
+    time.sleep(0.4)
+    assert len(rec.snapshot()._chunks) == 1   # po max_flush_delay_s se zapíšou i tak
+    write_rows(rec, 3, 12)
+    time.sleep(0.1)
+    assert len(rec.snapshot()._chunks) == 2
+    rec.close()
+
+
+def test_gap_meta_survives_crash_and_close(tmp_path):
+    path = str(tmp_path / "run.tlrun")
+    rec = RunRecorder(path, flush_interval_s=60.0)
+    write_rows(rec, 0, 10)
+    rec.set_meta("gaps", [[4.5, 9.0]])
+    rec.flush()
+    with RunReader(path) as reader:   # bez indexu (měření ještě běží)
+        assert reader.meta["gaps"] == [[4.5, 9.0]]
+    rec.close()
+    with RunReader(path) as reader:
+        assert reader.indexed and reader.meta["gaps"] == [[4.5, 9.0]]
+
+
+def test_prune_keeps_newest_runs(tmp_path):
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"{i}.tlrun"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+        paths.append(str(path))
+    (tmp_path / "notes.txt").write_text("nemazat")
+
+    removed = prune_runs(str(tmp_path), keep=3, exclude=[paths[0]])
+    assert sorted(removed) == paths[1:2]
+    removed = prune_runs(str(tmp_path), keep=10, max_bytes=250)
+    assert sorted(removed) == [paths[0], paths[2]]
+    assert sorted(os.listdir(tmp_path)) == ["3.tlrun", "4.tlrun", "notes.txt"]
+
+
+def test_snapshot_indexing_across_chunks_and_memory(tmp_path):
+    path = str(tmp_path / "run.tlrun")
+    rec = RunRecorder(path, flush_interval_s=60.0)
+    for start, n in ((0, 7), (7, 1), (8, 30)):
+        write_rows(rec, start, n)
+        rec.flush()
+    write_rows(rec, 38, 5)   # zůstane v paměti
+    snap = rec.snapshot()
+
+    rows = list(snap)
+    assert len(snap) == len(rows) == 43
+    for i in (0, 6, 7, 8, 37, 38, 42, -1, -43):
+        assert snap[i] == rows[i]
+    mapping = snap._mm
+    assert mapping is not None
+    snap[20]
+    assert snap._mm is mapping   # soubor se neotevírá znovu pro každý index
+    rec.close()
+
+
+class _FlakyFile:
+    """Soubor, jehož zápisy po fail_writes() selžou (jako plný disk), dokud se neopraví."""
+
+    def __init__(self, f):
+        self._f = f
+        self.failing = False
+
+    def write(self, data):
+        if self.failing:
+            self._f.write(data[:len(data) // 2])   # useknutý zápis
+            raise OSError(28, "No space left on device")
+        return self._f.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+def test_write_error_is_retried_and_reported(tmp_path):
+    path = str(tmp_path / "run.tlrun")
+    rec = RunRecorder(path, flush_interval_s=0.02, min_chunk_rows=1)
+    rec.RETRY_MIN_S = 0.05
+    errors = []
+    rec.on_error = errors.append
+    flaky = rec._f = _FlakyFile(rec._f)
+
+    write_rows(rec, 0, 10)
+    rec.flush()
+    flaky.failing = True
+    write_rows(rec, 10, 10)
+    time.sleep(0.2)
+    write_rows(rec, 20, 10)
+    time.sleep(0.2)
+    assert rec.error and len(errors) == 1   # jedna zpráva za sérii chyb
+    assert len(rec) == 30
+
+    flaky.failing = False
+    deadline = time.monotonic() + 5.0
+    while (rec.error or len(rec.snapshot()._chunks) < 2) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert rec.error is None
+    assert not rec._unwritten and not len(rec._pending)
+    rec.close()
+
+    with RunReader(path) as reader:
+        assert reader.complete and len(reader) == 30
+        t_s, _ = reader.slice()
+        assert np.array_equal(t_s, np.arange(30) * 0.5)
+
+
+def test_concurrent_close_writes_index_once(tmp_path):
+    import threading
+
+    path = str(tmp_path / "run.tlrun")
+    rec = RunRecorder(path, flush_interval_s=60.0)
+    write_rows(rec, 0, 100)
+    calls = []
+    write_index = rec._write_index
+
+    def counted():
+        calls.append(1)
+        time.sleep(0.05)
+        write_index()
+
+    rec._write_index = counted
+    threads = [threading.Thread(target=rec.close) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [1]
+    with RunReader(path) as reader:
+        assert reader.indexed and len(reader) == 100
@@ -0,0 +1,346 @@
+"""
+App/tools/esp32_emulator.py
+Emulátor ESP32 stanice na pseudo-terminálu (jen POSIX).
+
+Mluví stejným protokolem jako firmware (SerialProtocol + CommandDispatcher):
+  - po startu posílá {"type":"hello",...} (opakuje, dokud nepřijde první příkaz)
+  - START / STOP / PING / INFO / SET RATE / SET PWM / SET FILTER / SET FORMAT
+  - odpovědi ack / error, data jako JSON řádky nebo binární rámce
+Teploty počítá jednoduchý tepelný model řízený příkazy SET PWM.
+
+Spuštění ze složky App (vypíše cestu k portu pro SerialManager.open):
+    python -m tools.esp32_emulator --dallas 4 --max-rate 1000
+"""
+import argparse
+import math
+import os
+import pty
+import random
+import select
+import threading
+import time
+import tty
+from typing import List, Optional
+
+from core.binary_protocol import encode_frame
+
+
+class ThermalPlant:
+    """
+    Komora s topením a chlazením (model 1. řádu) a senzory se zpožděním.
+    dT/dt = (heat_gain * heat% - cool_gain * cool% - (T - ambient)) / tau
+    """
+
+    def __init__(self, n_dallas: int, ambient: float = 22.0, tau_s: float = 300.0,
+                 heat_gain: float = 0.25, cool_gain: float = 0.12, noise: float = 0.01):
+        self.ambient = ambient
+        self.tau_s = tau_s
+        self.heat_gain = heat_gain
+        self.cool_gain = cool_gain
+        self.noise = noise
+        self.heat_pct = 0.0
+        self.cool_pct = 0.0
+        self.t_air = ambient
+        # Časové konstanty senzorů: TMP117, BME280, NTC/rezistor a Dallasy (pomalejší pouzdro)
+        self._sensor_tau = {"T_TMP": 8.0, "T_BME": 15.0, "R": 20.0, "NTC": 12.0}
+        for i in range(n_dallas):
+            self._sensor_tau[f"T_DS{i}"] = 25.0 + 5.0 * i
+        self._sensor_t = {k: ambient for k in self._sensor_tau}
+
+    def set_pwm(self, channel: int, value: float):
+        value = max(0.0, min(100.0, value))
+        if channel == 0:
+            self.heat_pct = value
+        elif channel == 1:
+            self.cool_pct = value
+
+    def stop_all(self):
+        self.heat_pct = self.cool_pct = 0.0
+
+    def step(self, dt: float):
+        drive = self.heat_gain * self.heat_pct - self.cool_gain * self.cool_pct
+        self.t_air += dt * (drive - (self.t_air - self.ambient)) / self.tau_s
+        for key, tau in self._sensor_tau.items():
+            alpha = min(1.0, dt / tau)
+            self._sensor_t[key] += alpha * (self.t_air - self._sensor_t[key])
+
+    def read(self, key: str) -> float:
+        return self._sensor_t[key] + random.gauss(0.0, self.noise)
+
+    def ntc_mv(self) -> float:
+        """Napětí na NTC 10k (B=3950) v děliči s 10k z 3,3 V."""
+        t_k = self.read("NTC") + 273.15
+        r_ntc = 10000.0 * math.exp(3950.0 * (1.0 / t_k - 1.0 / 298.15))
+        return 3300.0 * r_ntc / (r_ntc + 10000.0)
+
+    def resistor_mv(self) -> float:
+        """Napětí na Pt1000-like rezistoru (alfa 0,00385) v děliči s 1k z 3,3 V."""
+        r = 1000.0 * (1.0 + 0.00385 * self.read("R"))
+        return 3300.0 * r / (r + 1000.0)
+
+
+class Esp32Emulator:
+    HELLO_INTERVAL_S = 1.0
+    SAFETY_TIMEOUT_S = 3.0   # stejně jako CommandDispatcher::SAFETY_TIMEOUT_MS
+
+    def __init__(self, n_dallas: int = 2, bme: bool = True, tmp: bool = True, adc: bool = True,
+                 max_rate_hz: float = 1000.0, plant: Optional[ThermalPlant] = None,
+                 safety_timeout: bool = True):
+        self.n_dallas = n_dallas
+        self.bme = bme
+        self.tmp = tmp
+        self.adc = adc
+        self.max_rate_hz = max_rate_hz
+        self.plant = plant or ThermalPlant(n_dallas)
+        self.safety_timeout = safety_timeout
+
+        self.rate_hz = 2.0
+        self.running = False
+        self.binary = False
+        self.adc_filter = False
+
+        self.samples_sent = 0
+        self.bytes_dropped = 0
+
+        self._master: Optional[int] = None
+        self._slave: Optional[int] = None
+        self._port: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._boot = time.monotonic()
+        self._rx = b""
+        self._got_command = False
+        self._last_command = 0.0
+
+    @property
+    def port(self) -> Optional[str]:
+        """Cesta k pseudo-terminálu, kterou lze předat SerialManager.open()."""
+        return self._port
+
+    def start(self) -> str:
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self._port = os.ttyname(self._slave)
+        self._boot = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="esp32-emulator", daemon=True)
+        self._thread.start()
+        return self._port
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master = self._slave = None
+
+    def reboot(self):
+        """Simuluje reset desky: zastaví měření, vynuluje t_ms a znovu pošle hello."""
+        self.running = False
+        self.binary = False
+        self.rate_hz = 2.0
+        self.plant.stop_all()
+        self._boot = time.monotonic()
+        self._got_command = False
+        self._send_hello()
+
+    # --- Smyčka ---
+
+    def _millis(self) -> int:
+        return int((time.monotonic() - self._boot) * 1000.0) & 0xFFFFFFFF
+
+    def _run(self):
+        self._send_hello()
+        next_hello = time.monotonic() + self.HELLO_INTERVAL_S
+        next_sample = time.monotonic()
+        last_step = time.monotonic()
+
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if self.running:
+                timeout = max(0.0, next_sample - now)
+            else:
+                timeout = 0.05
+            readable, _, _ = select.select([self._master], [], [], timeout)
+            if readable:
+                self._read_commands()
+
+            now = time.monotonic()
+            self.plant.step(now - last_step)
+            last_step = now
+
+            if not self._got_command and now >= next_hello:
+                self._send_hello()
+                next_hello = now + self.HELLO_INTERVAL_S
+
+            if self.running and self.safety_timeout and now - self._last_command > self.SAFETY_TIMEOUT_S:
+                self.running = False
+                self.plant.stop_all()
+
+            if self.running:
+                period = 1.0 / self.rate_hz
+                if next_sample < now - 1.0:
+                    next_sample = now  # po dlouhé pauze nedoháníme celou frontu
+                out = []
+                while next_sample <= now:
+                    out.append(self._sample())
+                    next_sample += period
+                if out:
+                    self._write(b"".join(out))
+            else:
+                next_sample = now
+
+    def _read_commands(self):
+        try:
+            data = os.read(self._master, 4096)
+        except (BlockingIOError, OSError):
+            return
+        self._rx += data
+        while b"\n" in self._rx:
+            line, self._rx = self._rx.split(b"\n", 1)
+            text = line.decode(errors="ignore").strip()
+            if text:
+                self._handle_command(text)
+
+    def _handle_command(self, line: str):
+        """Obdoba SerialProtocol::processLine + CommandDispatcher::apply."""
+        self._got_command = True
+        self._last_command = time.monotonic()
+        up = line.upper()
+        parts = up.split()
+
+        if up == "START":
+            self.running = True
+            self._send_ack("start")
+        elif up == "STOP":
+            self.running = False
+            self.plant.stop_all()
+            self._send_ack("stop")
+        elif up == "PING":
+            pass
+        elif up == "INFO":
+            self._send_hello(info=True)
+        elif up.startswith("SET RATE") and len(parts) >= 3:
+            try:
+                rate = float(parts[2])
+            except ValueError:
+                return
+            if 0.0 < rate <= self.max_rate_hz:
+                self.rate_hz = rate
+                self._send_line(f'{{"type":"ack","cmd":"set_rate","rate_hz":{rate:.4f}}}')
+            else:
+                self._send_error("invalid_rate", "set_rate")
+        elif up.startswith("SET PWM") and len(parts) >= 4:
+            try:
+                self.plant.set_pwm(int(parts[2]), float(parts[3]))
+            except ValueError:
+                return
+            self._send_ack("set_pwm")
+        elif up.startswith("SET FILTER") and len(parts) >= 3:
+            self.adc_filter = parts[2] == "1"
+            self._send_ack("set_filter")
+        elif up.startswith("SET FORMAT") and len(parts) >= 3 and parts[2] in ("BIN", "JSON"):
+            self.binary = parts[2] == "BIN"
+            self._send_ack("set_format")
+
+    # --- Výstup ---
+
+    def _channels(self) -> List[Optional[float]]:
+        p = self.plant
+        t_tmp = p.read("T_TMP") if self.tmp else None
+        t_bme = p.read("T_BME") if self.bme else None
+        if self.adc:
+            v_r, v_ntc = p.resistor_mv(), p.ntc_mv()
+            # Interní ADC ESP32 je zašuměnější a hrubší
+            v_esp_r = round(v_r + random.gauss(0.0, 8.0))
+            v_esp_ntc = round(v_ntc + random.gauss(0.0, 8.0))
+        else:
+            v_r = v_ntc = v_esp_r = v_esp_ntc = 0.0
+        dallas = [round(p.read(f"T_DS{i}") * 16) / 16 for i in range(self.n_dallas)]  # 12bit = 1/16 °C
+        return [t_tmp, t_bme, v_r, v_ntc, v_esp_r, v_esp_ntc] + dallas
+
+    def _sample(self) -> bytes:
+        self.samples_sent += 1
+        t_ms = self._millis()
+        values = self._channels()
+        if self.binary:
+            return encode_frame(t_ms, values)
+
+        def num(v, digits):
+            return "null" if v is None else f"{v:.{digits}f}"
+
+        t_tmp, t_bme, v1, v2, v3, v4 = values[:6]
+        parts = [f'{{"type":"data","t_ms":{t_ms}',
+                 f'"T_TMP":{num(t_tmp, 4)}', f'"T_BME":{num(t_bme, 4)}',
+                 f'"V_ADS_R":{v1:.2f}', f'"V_ADS_NTC":{v2:.2f}',
+                 f'"V_ESP_R":{v3:.2f}', f'"V_ESP_NTC":{v4:.2f}']
+        parts += [f'"T_DS{i}":{num(t, 4)}' for i, t in enumerate(values[6:])]
+        return (",".join(parts) + "}\r\n").encode()
+
+    def _send_hello(self, info: bool = False):
+        b = "true" if self.bme else "false"
+        a = "true" if self.adc else "false"
+        t = "true" if self.tmp else "false"
+        line = f'{{"type":"hello","device":"temp-lab-v2","bme":{b},"dallas":{self.n_dallas},"adc":{a},"tmp":{t}'
+        if info:
+            # Odpověď na INFO nese i aktuální stav (SerialProtocol::sendInfo)
+            running = "true" if self.running else "false"
+            line += f',"running":{running},"rate_hz":{self.rate_hz:.4f},"uptime_ms":{self._millis()}'
+        self._send_line(line + "}")
+
+    def _send_ack(self, cmd: str):
+        self._send_line(f'{{"type":"ack","cmd":"{cmd}"}}')
+
+    def _send_error(self, msg: str, cmd: Optional[str] = None):
+        extra = f',"cmd":"{cmd}"' if cmd else ""
+        self._send_line(f'{{"type":"error","msg":"{msg}"{extra}}}')
+
+    def _send_line(self, line: str):
+        self._write((line + "\r\n").encode())
+
+    def _write(self, data: bytes):
+        """Neblokující zápis. Když port nikdo nečte a buffer je plný, data zahodíme (jako UART)."""
+        view = memoryview(data)
+        while view:
+            try:
+                n = os.write(self._master, view)
+            except (BlockingIOError, OSError):
+                self.bytes_dropped += len(view)
+                return
+            view = view[n:]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Emulátor ESP32 Temp-Lab na pseudo-terminálu")
+    ap.add_argument("--dallas", type=int, default=2, help="počet DS18B20")
+    ap.add_argument("--max-rate", type=float, default=1000.0, help="nejvyšší povolená SET RATE [Hz]")
+    ap.add_argument("--no-bme", action="store_true")
+    ap.add_argument("--no-tmp", action="store_true")
+    ap.add_argument("--no-adc", action="store_true")
+    ap.add_argument("--no-safety-timeout", action="store_true", help="nevypínat měření bez PING")
+    args = ap.parse_args()
+
+    emu = Esp32Emulator(n_dallas=args.dallas, bme=not args.no_bme, tmp=not args.no_tmp,
+                        adc=not args.no_adc, max_rate_hz=args.max_rate,
+                        safety_timeout=not args.no_safety_timeout)
+    port = emu.start()
+    print(f"Emulátor ESP32 běží na {port} (Ctrl+C ukončí)")
+    try:
+        while True:
+            time.sleep(5.0)
+            print(f"  vzorků: {emu.samples_sent}, rate: {emu.rate_hz} Hz, T: {emu.plant.t_air:.2f} °C, "
+                  f"topení: {emu.plant.heat_pct:.0f} %, chlazení: {emu.plant.cool_pct:.0f} %")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emu.stop()
+
+
+if __name__ == "__main__":
+    main()
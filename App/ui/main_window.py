@@ -1,29 +1,43 @@
 import os
+import threading
+import time
 
 from typing import Optional, Set
 from PySide6.QtCore import Slot, QTimer, Signal
 from PySide6.QtWidgets import (
-    QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QMessageBox, QFileDialog
+    QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QMessageBox, QFileDialog, QProgressDialog
 )
 
-from core.serial_manager import SerialManager
-from core.parser import parse_json_message
+from core.serial_manager import SerialManager, ReconnectPolicy
+from core.parser import parse_json_message, parse_hello_inventory
 from core.measurement_manager import MeasurementManager 
+from core.csv_export import ExportCancelled
+from core.data_export import available_formats
+from core.inventory_cache import InventoryCache
 from ui.styles import STYLESHEET
 
 from ui.panels.sidebar import Sidebar
 from ui.panels.cards import ValueCardsPanel
 from ui.realtime_plot import RealtimePlotWidget
+from ui.render_scheduler import RenderScheduler
 from ui.dialogs.sensor_config import SensorConfigDialog
 from measurements.part_one import PartOneMeasurement
 from measurements.part_two import PartTwoMeasurement
 from measurements.part_three import PartThreeMeasurement 
 
 class MainWindow(QMainWindow):
+    HANDSHAKE_TIMEOUT_MS = 3000   # čekání na hello po resetu desky
+    ATTACH_TIMEOUT_MS = 500       # čekání na odpověď na INFO (bez resetu)
+    RENDER_FPS = 25               # graf, karty a progress se překreslují nejvýš takto často
+
     handshake_received_signal = Signal()
     connection_lost_signal = Signal()
+    reconnecting_signal = Signal()
+    reconnected_signal = Signal(float, object)   # výpadek [s], hello po obnově (nebo None)
+    export_progress_signal = Signal(int)   # promile
+    export_finished_signal = Signal(str)   # "ok" / "cancelled" / "error"
 
-    def __init__(self):
+    def __init__(self, serial_mgr=None):
         super().__init__()
         self.setWindowTitle("Temp-Lab Dashboard")
         self.resize(1200, 750)
@@ -33,26 +47,56 @@ class MainWindow(QMainWindow):
         self._pending_pwm_channel = 0
         self._pending_pwm_value = 0
 
-        self.serial_mgr = SerialManager()
+        # Místo SerialManageru lze předat jiný zdroj se stejným rozhraním (např. ReplaySerialSource)
+        self.serial_mgr = serial_mgr or SerialManager()
         self.serial_mgr.set_connection_lost_callback(self.connection_lost_signal.emit)
         self.connection_lost_signal.connect(self._on_unexpected_disconnect)
+        # Při výpadku USB se port zkusí znovu otevřít, měření pokračuje
+        self.serial_mgr.set_reconnect_policy(ReconnectPolicy())
+        self.serial_mgr.set_reconnect_callbacks(self._on_serial_reconnecting, self._on_serial_reconnected)
+        self.reconnecting_signal.connect(self._on_reconnecting)
+        self.reconnected_signal.connect(self._on_reconnected)
+        self.export_progress_signal.connect(self._on_export_progress)
+        self.export_finished_signal.connect(self._on_export_finished)
+        # Export běží v pracovním vlákně, GUI mezitím dál kreslí
+        self._export_thread: Optional[threading.Thread] = None
+        self._export_cancel = threading.Event()
+        self._export_dialog: Optional[QProgressDialog] = None
         self.meas_mgr = MeasurementManager(self.serial_mgr)
         self.allowed_sensors: Set[str] = set()
         
         self.detected_sensors: list[str] = []
 
         self.meas_mgr.data_received.connect(self._on_measurement_data)
+        self.meas_mgr.batch_received.connect(self._on_measurement_batch)
         self.meas_mgr.progress_updated.connect(self._on_measurement_progress)
         self.meas_mgr.finished.connect(self._on_measurement_finished)
         self.meas_mgr.error_occurred.connect(lambda msg: QMessageBox.warning(self, "Chyba", msg))
 
         self.handshake_received_signal.connect(self._on_handshake_ok)
 
+        # Připojení: inventář z minula, fáze a jejich doby
+        self.inventory_cache = InventoryCache()
+        self._connect_port = ""
+        self._connect_attach = False
+        self._connect_t0 = 0.0
+        self._handshake_t0 = 0.0
+        self._hello_time = 0.0
+        self._last_hello: Optional[dict] = None
+        self.connect_timings: dict = {}
+
         self.handshake_timer = QTimer()
         self.handshake_timer.setSingleShot(True)
         self.handshake_timer.timeout.connect(self._on_handshake_timeout)
 
         self._init_ui()
+
+        # Vzorky jdou do bufferů hned, překreslení na tik časovače (sloučí víc vzorků do snímku)
+        self._progress_value = 0
+        self.render_scheduler = RenderScheduler(self.RENDER_FPS, self)
+        self.render_scheduler.add_target("plot", self.plot_widget.refresh)
+        self.render_scheduler.add_target("cards", self.cards_panel.flush)
+        self.render_scheduler.add_target("progress", self._render_progress)
         
         available_types = self.meas_mgr.get_available_types()
         if available_types:
@@ -66,7 +110,7 @@ class MainWindow(QMainWindow):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(0)
 
-        self.sidebar = Sidebar(self.meas_mgr.get_available_types())
+        self.sidebar = Sidebar(self.meas_mgr.get_available_types(), port_provider=self.serial_mgr.list_ports)
         self.sidebar.connect_requested.connect(self._handle_connect_request)
         self.sidebar.disconnect_requested.connect(self._handle_disconnect_request)
         self.sidebar.start_measurement_clicked.connect(self._start_measurement)
@@ -75,6 +119,7 @@ class MainWindow(QMainWindow):
         self.sidebar.measurement_type_changed.connect(self._on_measurement_type_changed)
         self.sidebar.pwm_changed.connect(self._on_pwm_changed)
         self.sidebar.export_clicked.connect(self._on_export_clicked)
+        self.sidebar.scrolling_toggled.connect(self._on_scrolling_toggled)
 
         right_layout = QVBoxLayout()
         right_layout.setContentsMargins(0, 0, 0, 0)
@@ -89,6 +134,14 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.sidebar)
         layout.addLayout(right_layout)
 
+    def closeEvent(self, event):
+        self.sidebar.port_watcher.stop()
+        if self._export_thread is not None:
+            self._export_cancel.set()
+            self._export_thread.join(timeout=5.0)
+        self.meas_mgr.close_recorder()
+        super().closeEvent(event)
+
     @Slot(str)
     def _on_measurement_type_changed(self, type_name: str):
         # Vyčistit graf při změně typu
@@ -123,6 +176,7 @@ class MainWindow(QMainWindow):
         self.cards_panel.clear()
         self.plot_widget.clear()
         self.sidebar.progress.setValue(0)
+        self._progress_value = 0
         
         # --- ZÍSKÁNÍ STAVU FILTRU PŘÍMO Z GUI ---
         # (Zabrání problémům se synchronizací)
@@ -144,12 +198,24 @@ class MainWindow(QMainWindow):
             target = self.sidebar.sb_target.value()
             kwargs = {"target_temp": target}
 
+        self.meas_mgr.record_runs = self.sidebar.is_record_checked()
+
         # Předáme parametry manageru -> ten je předá konstruktoru měření
         self.meas_mgr.start_measurement(type_name, **kwargs)
         
         duration = self.meas_mgr.get_duration()
         self.plot_widget.set_time_window(60.0 if duration > 300 else duration)
 
+    @Slot(bool)
+    def _on_scrolling_toggled(self, enabled: bool):
+        self.plot_widget.set_scrolling(enabled)
+        if not enabled:
+            # posuvný graf starší body nedrží, celý průběh se na pozadí načte z recorderu
+            snapshot = self.meas_mgr.snapshot()
+            if snapshot is not None:
+                self.plot_widget.load_history(snapshot)
+        self.render_scheduler.discard("plot")
+
     @Slot()
     def _stop_measurement(self):
         self.meas_mgr.stop_measurement()
@@ -184,11 +250,18 @@ class MainWindow(QMainWindow):
 
     @Slot()
     def _on_export_clicked(self):
+        if self._export_thread is not None and self._export_thread.is_alive():
+            return
+
         default_dir = self._get_best_export_path()
 
-        filename, _ = QFileDialog.getSaveFileName(self, "Uložit CSV", default_dir, "CSV (*.csv)")
+        # filtr dialogu -> přípona, která se doplní, když ji uživatel nenapíše
+        filters = {f"{label} ({mask})": mask.split()[0][1:] for label, mask in available_formats()}
+        filename, selected = QFileDialog.getSaveFileName(self, "Uložit data", default_dir, ";;".join(filters))
         if not filename:
             return
+        if not os.path.splitext(filename)[1]:
+            filename += filters.get(selected, ".csv")
 
         sensors_to_export = self.allowed_sensors
         
@@ -197,8 +270,48 @@ class MainWindow(QMainWindow):
         if not sensors_to_export and current_type != PartOneMeasurement.DISPLAY_NAME:
             sensors_to_export = {s for s in self.detected_sensors if not s.startswith("V_")}
 
-        if self.meas_mgr.export_data(filename, sensors_to_export):
+        self._export_cancel.clear()
+        self._export_dialog = QProgressDialog("Export dat...", "Zrušit", 0, 1000, self)
+        self._export_dialog.setWindowTitle("Export")
+        self._export_dialog.setMinimumDuration(300)
+        self._export_dialog.canceled.connect(self._export_cancel.set)
+        self._export_dialog.setValue(0)
+
+        self._export_thread = threading.Thread(
+            target=self._export_worker, args=(filename, sensors_to_export), daemon=True
+        )
+        self._export_thread.start()
+
+    def _export_worker(self, filename: str, sensors: Optional[Set[str]]):
+        """Pracovní vlákno exportu; s GUI komunikuje jen přes signály."""
+        try:
+            ok = self.meas_mgr.export_data(
+                filename, sensors,
+                progress=lambda f: self.export_progress_signal.emit(int(f * 1000)),
+                cancel=self._export_cancel,
+            )
+            result = "ok" if ok else "error"
+        except ExportCancelled:
+            result = "cancelled"
+        self.export_finished_signal.emit(result)
+
+    @Slot(int)
+    def _on_export_progress(self, permille: int):
+        if self._export_dialog is not None and not self._export_cancel.is_set():
+            self._export_dialog.setValue(min(permille, 999))
+
+    @Slot(str)
+    def _on_export_finished(self, result: str):
+        if self._export_dialog is not None:
+            self._export_dialog.canceled.disconnect(self._export_cancel.set)
+            self._export_dialog.close()
+            self._export_dialog = None
+        self._export_thread = None
+
+        if result == "ok":
             QMessageBox.information(self, "OK", "Data exportována.")
+        elif result == "cancelled":
+            self.sidebar.lbl_status.setText("Export zrušen.")
         else:
             QMessageBox.warning(self, "Chyba", "Nelze exportovat data (žádná data k dispozici?).")
 
@@ -236,9 +349,10 @@ class MainWindow(QMainWindow):
         else:
             filtered = values
             
-        # 4. Aktualizace KARET (Zobrazíme vše)
+        # 4. Aktualizace KARET (Zobrazíme vše) - překreslí RenderScheduler
         if filtered:
-            self.cards_panel.update_values(filtered)
+            self.cards_panel.queue_values(filtered)
+            self.render_scheduler.mark_dirty("cards")
             
         # 5. Aktualizace GRAFU (Odstraníme PWM)
         plot_values = filtered.copy()
@@ -248,62 +362,113 @@ class MainWindow(QMainWindow):
             for k in keys_to_remove:
                 del plot_values[k]
 
-        self.plot_widget.add_point(t_s, plot_values)
+        self.plot_widget.append_point(t_s, plot_values)
+        self.render_scheduler.mark_dirty("plot")
+
+    @Slot(list)
+    def _on_measurement_batch(self, samples: list):
+        for t_s, values in samples:
+            self._on_measurement_data(t_s, values)
 
     @Slot(float)
     def _on_measurement_progress(self, fraction: float):
-        val = max(0, min(100, int(fraction * 100)))
-        self.sidebar.progress.setValue(val)
+        self._progress_value = max(0, min(100, int(fraction * 100)))
+        self.render_scheduler.mark_dirty("progress")
+
+    def _render_progress(self):
+        if self.sidebar.progress.value() != self._progress_value:
+            self.sidebar.progress.setValue(self._progress_value)
 
     @Slot()
     def _on_measurement_finished(self):
+        self.render_scheduler.flush()   # poslední vzorky ještě před hláškou
         self.sidebar.set_measurement_running(False)
         QMessageBox.information(self, "Hotovo", "Měření dokončeno.")
     
     @Slot(str)
     def _handle_connect_request(self, port: str):
+        self._connect_port = port
+        self._connect_t0 = time.perf_counter()
+        self.connect_timings = {}
+        self._connect(attach=self.sidebar.is_attach_mode())
+
+    def _connect(self, attach: bool):
+        """
+        attach=True: port se otevře bez resetu a inventář se zjistí příkazem INFO.
+        Pokud je inventář portu v cache, UI je použitelné hned a INFO ho jen ověří.
+        attach=False: reset desky a čekání na hello po startu (původní způsob).
+        """
+        port = self._connect_port
+        self._connect_attach = attach
         try:
-            self.serial_mgr.open(port)
-            self.serial_mgr.set_line_callback(self._wait_for_handshake)
-            self.sidebar.set_waiting_state()
-            self.handshake_timer.start(3000)
+            self.serial_mgr.open(port, reset=not attach)
         except Exception as e:
             QMessageBox.critical(self, "Chyba", f"Port nelze otevřít:\n{e}")
             self.sidebar.set_connected_state(False)
+            return
+
+        self.connect_timings.update(self.serial_mgr.last_open_timings)
+        self.serial_mgr.set_line_callback(self._wait_for_handshake)
+        self._handshake_t0 = time.perf_counter()
+
+        if not attach:
+            self.sidebar.set_waiting_state()
+            self.handshake_timer.start(self.HANDSHAKE_TIMEOUT_MS)
+            return
+
+        cached = self.inventory_cache.get(port)
+        if cached:
+            self.detected_sensors = parse_hello_inventory(cached)
+            self.connect_timings["usable_s"] = time.perf_counter() - self._connect_t0
+            self.sidebar.set_connected_state(True)
+            self.sidebar.lbl_status.setText("Připojeno (inventář z minula)")
+        else:
+            self.sidebar.set_waiting_state()
+        self.serial_mgr.write_line("INFO")
+        self.handshake_timer.start(self.ATTACH_TIMEOUT_MS)
 
     def _wait_for_handshake(self, line: str):
         msg = parse_json_message(line)
         if msg and msg.get("type") == "hello":
-            self.detected_sensors = []
-            
-            if str(msg.get("tmp")).lower() == "true":
-                self.detected_sensors.append("T_TMP")
-
-            if str(msg.get("bme")).lower() == "true":
-                self.detected_sensors.append("T_BME")
-            
-                
-            if str(msg.get("adc")).lower() == "true":
-                # Názvy klíčů musí odpovídat tomu, co posílá ESP v sendData
-                self.detected_sensors.extend(["V_ADS_R", "V_ADS_NTC", "V_ESP_R", "V_ESP_NTC"])
-                
-            try:
-                dallas_count = int(msg.get("dallas", 0))
-                for i in range(dallas_count):
-                    self.detected_sensors.append(f"T_DS{i}")
-            except: pass
-            
+            self._hello_time = time.perf_counter()
+            self._last_hello = msg
+            self.detected_sensors = parse_hello_inventory(msg)
             print(f"Detekováno: {self.detected_sensors}")
             self.handshake_received_signal.emit()
 
     @Slot()
     def _on_handshake_ok(self):
-        self.handshake_timer.stop()
+        already_connected = self.sidebar.is_connected()
+        if self.handshake_timer.isActive():
+            self.handshake_timer.stop()
+            self.connect_timings["handshake_s"] = self._hello_time - self._handshake_t0
+            self.connect_timings.setdefault("usable_s", self._hello_time - self._connect_t0)
+            self.connect_timings["total_s"] = self._hello_time - self._connect_t0
+            print("Připojení: " + ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in self.connect_timings.items()))
+        if self._last_hello:
+            self.inventory_cache.put(self._connect_port, self._last_hello)
+
+        if already_connected:
+            # Inventář z cache (nebo hello po restartu desky) jen aktualizujeme
+            if not self.meas_mgr.is_running():
+                self.sidebar.lbl_status.setText("Připraveno")
+            return
+
         self.sidebar.set_connected_state(True)
-        QMessageBox.information(self, "Připojeno", "Spojení navázáno.")
+        if self._connect_attach:
+            usable_ms = self.connect_timings.get("usable_s", 0.0) * 1000
+            self.sidebar.lbl_status.setText(f"Připojeno bez resetu ({usable_ms:.0f} ms)")
+        else:
+            QMessageBox.information(self, "Připojeno", "Spojení navázáno.")
 
     @Slot()
     def _on_handshake_timeout(self):
+        if self._connect_attach:
+            # Deska neodpověděla na INFO (starší firmware, bootloader...) -> klasicky s resetem
+            print("INFO bez odpovědi, připojuji s resetem desky")
+            self.sidebar.set_connected_state(False)
+            self._connect(attach=False)
+            return
         self.serial_mgr.close()
         self.sidebar.set_connected_state(False)
         QMessageBox.warning(self, "Timeout", "ESP32 neodpovědělo.")
@@ -351,7 +516,7 @@ class MainWindow(QMainWindow):
     def _on_unexpected_disconnect(self):
         """Zavolá se, když SerialManager detekuje pád spojení (vytržení kabelu)."""
         # Pokud už jsme odpojení, nic neděláme (prevence zdvojených hlášek)
-        if not self.sidebar._is_connected: 
+        if not self.sidebar.is_connected(): 
             return
 
         # Využijeme existující logiku pro odpojení (zastaví měření, vyčistí UI)
@@ -360,6 +525,37 @@ class MainWindow(QMainWindow):
         # Informujeme uživatele
         QMessageBox.critical(self, "Chyba spojení", "Zařízení bylo neočekávaně odpojeno!")
 
+    def _on_serial_reconnecting(self):
+        """Vlákno obnovy: spojení spadlo, začíná obnova."""
+        self.meas_mgr.prepare_resume()
+        self.reconnecting_signal.emit()
+
+    def _on_serial_reconnected(self, downtime_s: float):
+        """Vlákno obnovy: port je znovu otevřen -> handshake a navázání měření."""
+        hello = self.meas_mgr.resume_after_reconnect(downtime_s)
+        self.reconnected_signal.emit(downtime_s, hello)
+
+    @Slot()
+    def _on_reconnecting(self):
+        self.sidebar.lbl_status.setText("Spojení ztraceno, obnovuji...")
+        self.sidebar.lbl_status.setStyleSheet("color: #d29922; font-size: 11px;")
+
+    @Slot(float, object)
+    def _on_reconnected(self, downtime_s: float, hello: Optional[dict]):
+        if hello:
+            self.detected_sensors = parse_hello_inventory(hello)
+        stats = self.serial_mgr.reconnect_stats()
+        running = self.meas_mgr.is_running()
+        self.sidebar.set_measurement_running(running)
+        # Text i barvu nastavíme celé znovu (ne přilepením k textu "obnovuji...")
+        state = "Měření probíhá" if running else "Připraveno"
+        self.sidebar.lbl_status.setText(
+            f"{state} (obnoveno {stats['reconnects']}x, výpadky {stats['downtime_s']:.1f} s)"
+        )
+        self.sidebar.lbl_status.setStyleSheet(
+            "color: #2ea043; font-size: 11px;" if running else "color: #808080; font-size: 11px;"
+        )
+
     @Slot(float)
     def _on_target_temp_changed(self, val):
         # OPRAVA: Zjistíme typ měření ze Sidebaru, ne z manageru (tam to neexistuje)
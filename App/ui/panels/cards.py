@@ -11,6 +11,8 @@ class ValueCardsPanel(QWidget):
         # Zvětšíme výšku celého panelu, aby se tam pohodlně vešly vyšší karty
         self.setFixedHeight(140) 
         self._labels = {} 
+        self._texts = {}   # naposledy zobrazený text, setText jen při změně
+        self._pending = {}   # hodnoty čekající na flush() (RenderScheduler)
         self._init_ui()
 
     def _init_ui(self):
@@ -35,6 +37,15 @@ class ValueCardsPanel(QWidget):
         scroll.setWidget(self.container)
         main_layout.addWidget(scroll)
 
+    def queue_values(self, values: dict):
+        """Zapamatuje si nejnovější hodnoty; karty se přepíšou až ve flush()."""
+        self._pending.update(values)
+
+    def flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, {}
+            self.update_values(pending)
+
     def update_values(self, values: dict):
         sorted_keys = sorted(values.keys(), key=get_sensor_sort_key)
         
@@ -44,8 +55,11 @@ class ValueCardsPanel(QWidget):
             text_val = f"{val:.2f} {unit}"
             
             if key in self._labels:
-                self._labels[key].setText(text_val)
+                if self._texts.get(key) != text_val:
+                    self._labels[key].setText(text_val)
+                    self._texts[key] = text_val
             else:
+                self._texts[key] = text_val
                 self._create_card(key, text_val)
 
     def clear(self):
@@ -55,6 +69,8 @@ class ValueCardsPanel(QWidget):
                 item.widget().deleteLater()
         self._labels.clear()
         self._labels = {} # Důležité: vyčistit i slovník labelů!
+        self._texts = {}
+        self._pending = {}
 
     def _create_card(self, key: str, initial_text: str):
         pretty_name = get_sensor_name(key)
@@ -1,13 +1,14 @@
-from typing import List
+from typing import Callable, List, Optional
 from PySide6.QtWidgets import (
     QFrame, QVBoxLayout, QLabel, QComboBox, QPushButton, 
     QProgressBar, QWidget, QSlider, QRadioButton, QButtonGroup, QHBoxLayout,
     QCheckBox, QDoubleSpinBox
 )
-from PySide6.QtCore import Signal, Qt, QTimer
+from PySide6.QtCore import Signal, Qt
 from matplotlib import container
 
 from core.serial_manager import SerialManager
+from core.port_watcher import PortWatcher
 
 class Sidebar(QFrame):
     # Signály
@@ -21,9 +22,15 @@ class Sidebar(QFrame):
     export_clicked = Signal()
     filter_toggled = Signal(bool)
     target_temp_changed = Signal(float)
+    scrolling_toggled = Signal(bool)
 
-    def __init__(self, measurement_types: List[str], parent=None):
+    def __init__(self, measurement_types: List[str], parent=None,
+                 port_provider: Optional[Callable[[], List[str]]] = None):
         super().__init__(parent)
+        # Zdroj seznamu portů (výchozí: skutečné COM porty, při replay soubor záznamu)
+        self._port_provider = port_provider or SerialManager.list_ports
+        # Výčet portů běží ve vlákně PortWatcheru, sem chodí jen přidané/odebrané porty
+        self.port_watcher = PortWatcher(self._port_provider, parent=self)
         self.setObjectName("Sidebar")
         self.setFixedWidth(280) 
         
@@ -40,9 +47,9 @@ class Sidebar(QFrame):
         
         self._init_ui(measurement_types)
 
-        self.port_scan_timer = QTimer(self)
-        self.port_scan_timer.timeout.connect(self.update_ports)
-        self.port_scan_timer.start(1000)
+        self.port_watcher.ports_added.connect(self._on_ports_added)
+        self.port_watcher.ports_removed.connect(self._on_ports_removed)
+        self.port_watcher.start()
 
     def _init_ui(self, measurement_types: List[str]):
         layout = QVBoxLayout(self)
@@ -89,7 +96,6 @@ class Sidebar(QFrame):
         # --- PŘIPOJENÍ ---
         self._add_section_label(layout, "PŘIPOJENÍ")
         self.combo_ports = QComboBox()
-        self.combo_ports.addItems(SerialManager.list_ports())
         self.combo_ports.setStyleSheet(COMBO_BOX_STYLE)
         layout.addWidget(self.combo_ports)
 
@@ -98,6 +104,13 @@ class Sidebar(QFrame):
         self.btn_connect.setCursor(Qt.PointingHandCursor)
         self.btn_connect.clicked.connect(self._on_connect_click)
         layout.addWidget(self.btn_connect)
+
+        # Připojení k běžící desce bez restartu (INFO místo čekání na hello).
+        # Výchozí je reset: deska pak začíná ve známém stavu (PWM vypnuté, JSON).
+        self.cb_attach = QCheckBox("Rychlé připojení (bez resetu)")
+        self.cb_attach.setChecked(False)
+        self.cb_attach.setStyleSheet("QCheckBox { color: #e0e0e0; margin-left: 2px; }")
+        layout.addWidget(self.cb_attach)
         
         layout.addSpacing(10)
 
@@ -144,6 +157,20 @@ class Sidebar(QFrame):
         self.filter_cb.hide() 
         layout.addWidget(self.filter_cb)
 
+        # Posuvné okno grafu pro dlouhá měření; lze přepnout i za běhu
+        self.cb_scrolling = QCheckBox("Posuvné okno grafu")
+        self.cb_scrolling.setToolTip("Graf ukazuje jen posledních několik sekund; celý průběh zůstává v záznamu měření.")
+        self.cb_scrolling.setStyleSheet("QCheckBox { color: #e0e0e0; margin-left: 2px; }")
+        self.cb_scrolling.toggled.connect(self.scrolling_toggled.emit)
+        layout.addWidget(self.cb_scrolling)
+
+        # Průběžný zápis do run souboru (přežije pád aplikace, paměť neroste s délkou měření)
+        self.cb_record = QCheckBox("Ukládat průběh na disk")
+        self.cb_record.setChecked(True)
+        self.cb_record.setToolTip("Run soubor v ~/.temp-lab/runs; ponechá se jen několik posledních záznamů.")
+        self.cb_record.setStyleSheet("QCheckBox { color: #e0e0e0; margin-left: 2px; }")
+        layout.addWidget(self.cb_record)
+
         # --- START / STOP / EXPORT ---
         self.btn_start = QPushButton("START")
         self.btn_start.setObjectName("BtnStart")
@@ -347,34 +374,27 @@ class Sidebar(QFrame):
         """)
         layout.addWidget(lbl)
 
-    def update_ports(self):
-        """Aktualizuje seznam COM portů, pokud došlo ke změně."""
-        
-        # Pokud jsme již připojeni, seznam neaktualizujeme (je disabled)
-        if self._is_connected:
-            return
-
-        new_ports = SerialManager.list_ports()
-        
-        # Získáme seznam portů, které jsou aktuálně v ComboBoxu
-        current_items = [self.combo_ports.itemText(i) for i in range(self.combo_ports.count())]
-        
-        # Porovnáme seznamy - aktualizujeme jen při reálné změně hardwaru
-        if new_ports != current_items:
-            current_selection = self.combo_ports.currentText()
-            
-            # Zablokujeme signály, aby se nespouštěly eventy během překreslování
-            self.combo_ports.blockSignals(True)
-            self.combo_ports.clear()
-            self.combo_ports.addItems(new_ports)
-            
-            # Pokusíme se obnovit původní výběr
-            if current_selection in new_ports:
-                self.combo_ports.setCurrentText(current_selection)
-            elif new_ports:
-                self.combo_ports.setCurrentIndex(0)
-            
-            self.combo_ports.blockSignals(False)
+    def _on_ports_added(self, ports: List[str]):
+        """Přidá nově připojené porty (volá PortWatcher, jen při změně)."""
+        # Zablokujeme signály, aby se nespouštěly eventy během úprav
+        self.combo_ports.blockSignals(True)
+        was_empty = self.combo_ports.count() == 0
+        self.combo_ports.addItems(ports)
+        if was_empty:
+            self.combo_ports.setCurrentIndex(0)
+        self.combo_ports.blockSignals(False)
+
+    def _on_ports_removed(self, ports: List[str]):
+        """Odebere odpojené porty. Vybraný port při připojení necháme (seznam je zamčený)."""
+        current_selection = self.combo_ports.currentText()
+        self.combo_ports.blockSignals(True)
+        for port in ports:
+            if self._is_connected and port == current_selection:
+                continue
+            idx = self.combo_ports.findText(port)
+            if idx >= 0:
+                self.combo_ports.removeItem(idx)
+        self.combo_ports.blockSignals(False)
 
     def set_connected_state(self, connected: bool):
         # --- ZMĚNA: Ukládáme si stav připojení ---
@@ -384,6 +404,7 @@ class Sidebar(QFrame):
             self.btn_connect.setText("ODPOJIT")
             self.btn_connect.setStyleSheet("background-color: #da3633; color: white;")
             self.combo_ports.setEnabled(False)
+            self.cb_attach.setEnabled(False)
             try: self.btn_connect.clicked.disconnect()
             except: pass
             self.btn_connect.clicked.connect(self._on_disconnect_click)
@@ -395,6 +416,12 @@ class Sidebar(QFrame):
             self.btn_connect.setText("Připojit k ESP")
             self.btn_connect.setStyleSheet("background-color: #007acc; color: white;")
             self.combo_ports.setEnabled(True)
+            self.cb_attach.setEnabled(True)
+            # Port odpojený během spojení jsme v seznamu nechali -> teď ho dorovnáme
+            stale = [self.combo_ports.itemText(i) for i in range(self.combo_ports.count())
+                     if self.combo_ports.itemText(i) not in self.port_watcher.ports]
+            if stale:
+                self._on_ports_removed(stale)
             
             self.btn_start.setEnabled(False) # Zakázat START
             self.btn_stop.setEnabled(False)
@@ -414,6 +441,7 @@ class Sidebar(QFrame):
         self.combo_type.setEnabled(not running)
         self.btn_sensors.setEnabled(not running)
         self.filter_cb.setEnabled(not running)
+        self.cb_record.setEnabled(not running)
         self.btn_export.setEnabled(not running)
         if self.sb_target: self.sb_target.setEnabled(not running)
         if self.sl_target: self.sl_target.setEnabled(not running)
@@ -444,6 +472,7 @@ class Sidebar(QFrame):
         self.btn_connect.setText("Čekám...")
         self.btn_connect.setEnabled(False)
         self.combo_ports.setEnabled(False)
+        self.cb_attach.setEnabled(False)
 
     def _on_connect_click(self):
         port = self.combo_ports.currentText()
@@ -459,6 +488,18 @@ class Sidebar(QFrame):
     def _on_stop_click(self):
         self.stop_measurement_clicked.emit()
 
+    def is_connected(self) -> bool:
+        """True = handshake s ESP proběhl a panel je v připojeném stavu."""
+        return self._is_connected
+
+    def is_attach_mode(self) -> bool:
+        """True = připojit se bez resetu desky."""
+        return self.cb_attach.isChecked()
+
+    def is_record_checked(self) -> bool:
+        """True = měření se průběžně zapisuje do run souboru."""
+        return self.cb_record.isChecked()
+
     def is_filter_checked(self) -> bool:
         """Vrátí True, pokud je checkbox filtru zaškrtnutý."""
         if hasattr(self, 'filter_cb') and self.filter_cb:
@@ -1,13 +1,38 @@
-from typing import Dict, List
+import threading
+from typing import Dict, List, Set, Tuple, Union
 from PySide6.QtWidgets import QWidget, QVBoxLayout
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal, Slot
+import numpy as np
 import pyqtgraph as pg
 
 # Čistý import z centrálního souboru
 from core.sensors import get_sensor_name, get_sensor_sort_key
+from core.extrema import RunningExtrema, SlidingExtrema, combine
+from core.curve_buffer import CurveBuffer
+from core.ring_buffer import RING_CAPACITY, RingCurveBuffer
+from core.lod import MinMaxPyramid, minmax_envelope
+
+
+def is_voltage_key(key: str) -> bool:
+    """Kanál patří na pravou osu napětí."""
+    return key.startswith("V_") or key.startswith("ADC") or key.startswith("ESP")
+
 
 class RealtimePlotWidget(QWidget):
-    def __init__(self, time_window_s: float = 60.0, parent=None):
+    """
+    Graf měření ve dvou režimech:
+      - natahovací (výchozí): osa X roste od nuly, křivky drží všechny body
+        a kreslí se přes MinMaxPyramid,
+      - posuvný (scrolling=True): jen posledních time_window_s sekund z kruhových
+        bufferů pevné velikosti (ring_capacity bodů na křivku), paměť i cena
+        překreslení jsou stálé i při nepřetržitém měření. Starší data drží
+        recorder, graf je z něj umí znovu načíst (load_history).
+    """
+
+    _history_ready = Signal(int, object)   # (číslo načítání, hotová historie z vlákna)
+
+    def __init__(self, time_window_s: float = 60.0, parent=None, scrolling: bool = False,
+                 ring_capacity: int = RING_CAPACITY):
         super().__init__(parent)
 
         pg.setConfigOption('foreground', 'w') 
@@ -15,11 +40,34 @@ class RealtimePlotWidget(QWidget):
         pg.setConfigOptions(antialias=True)
 
         self._time_window = time_window_s
+        self._scrolling = scrolling
+        self._ring_capacity = ring_capacity
         
-        # Slovníky pro data a křivky
+        # Slovníky pro data a křivky; data jsou v polích NumPy, setData dostává pohledy
         self._curves: Dict[str, pg.PlotDataItem] = {}
-        self._data_x: Dict[str, List[float]] = {}
-        self._data_y: Dict[str, List[float]] = {}
+        self._buffers: Dict[str, Union[CurveBuffer, RingCurveBuffer]] = {}
+        # Úrovně detailu: kreslí se jen ~2 body na pixel šířky (obálka min/max)
+        self._lod: Dict[str, MinMaxPyramid] = {}
+        self._px_width = 0
+        # Křivky a položky legendy odebrané při clear(), příště se použijí znovu,
+        # pokud se nezměnil styl: klíč -> (styl, křivka, vzorek v legendě)
+        self._pool: Dict[str, Tuple[tuple, pg.PlotDataItem, pg.ItemSample]] = {}
+        self._curve_style: Dict[str, tuple] = {}
+        self._legend_samples: Dict[str, pg.ItemSample] = {}
+        # Průběžné min/max každé křivky pro auto-scale (bez procházení historie),
+        # v posuvném režimu jen za okno
+        self._extrema: Dict[str, Union[RunningExtrema, SlidingExtrema]] = {}
+        self._temp_keys: List[str] = []
+        self._volt_keys: List[str] = []
+        # Křivky s novými body od posledního refresh() a naposledy nastavené rozsahy os
+        self._dirty: Set[str] = set()
+        self._max_time = 0.0
+        self._ranges: tuple = ()
+        # Konec dat načtených z recorderu; starší vzorky ještě čekající ve frontě se přeskočí
+        self._history_end = float("-inf")
+        # Číslo posledního load_history(); clear() a přepnutí režimu ho zneplatní
+        self._history_token = 0
+        self._history_ready.connect(self._apply_history)
 
         layout = QVBoxLayout(self)
         layout.setContentsMargins(10, 10, 20, 10) 
@@ -52,6 +100,7 @@ class RealtimePlotWidget(QWidget):
         self._plot_item.getAxis('right').setLabel("Napětí [mV]", **voltage_axis_style)
         
         self._plot_item.vb.sigResized.connect(self._update_views)
+        self._plot_item.vb.sigResized.connect(self._on_view_resized)
         
         self._plot_item.showAxis('right', False)
         self._dual_axis_enabled = False
@@ -76,35 +125,168 @@ class RealtimePlotWidget(QWidget):
         self._view_voltage.setGeometry(self._plot_item.vb.sceneBoundingRect())
         self._view_voltage.linkedViewChanged(self._plot_item.vb, self._view_voltage.XAxis)
 
+    def _on_view_resized(self):
+        # Jiná šířka grafu = jiný počet bodů na pixel, křivky se přepočítají
+        width = int(self._plot_item.vb.width())
+        if width != self._px_width:
+            self._px_width = width
+            if self._curves:
+                self._dirty.update(self._curves)
+                self.refresh()
+
+    def _max_points(self) -> int:
+        return 2 * max(self._px_width, 200)
+
+    def _new_buffer(self) -> Union[CurveBuffer, RingCurveBuffer]:
+        return RingCurveBuffer(self._ring_capacity) if self._scrolling else CurveBuffer()
+
+    def _new_extrema(self) -> Union[RunningExtrema, SlidingExtrema]:
+        return SlidingExtrema(self._time_window) if self._scrolling else RunningExtrema()
+
+    def is_scrolling(self) -> bool:
+        return self._scrolling
+
+    def set_scrolling(self, enabled: bool):
+        """
+        Přepne režim. Body, které graf právě má, se převedou (do kruhového bufferu
+        jen konec za okno); historii z recorderu pak doplní load_history().
+        """
+        if enabled == self._scrolling:
+            return
+        self._scrolling = enabled
+        self._history_token += 1   # rozpracované načítání historie už neplatí
+        x0 = self._max_time - self._time_window
+        for key, old in list(self._buffers.items()):
+            xs, ys = old.x, old.y
+            if enabled:
+                i0 = int(np.searchsorted(xs, x0, "left"))
+                xs, ys = xs[i0:], ys[i0:]
+            buf = self._buffers[key] = self._new_buffer()
+            buf.extend(xs, ys)
+        if enabled:
+            self._lod.clear()
+        else:
+            self._lod = {key: MinMaxPyramid(buf) for key, buf in self._buffers.items()}
+        self._reset_extrema(list(self._curves))
+        self._dirty.update(self._curves)
+        self._ranges = ()
+        self.refresh()
+
+    def _reset_extrema(self, keys: List[str]):
+        for key in keys:
+            buf = self._buffers[key]
+            extrema = self._extrema[key] = self._new_extrema()
+            if len(buf):
+                extrema.extend(buf.x, buf.y)
+
+    def load_history(self, snapshot):
+        """
+        Znovu naplní křivky daty z recorderu (MeasurementManager.snapshot()), např.
+        po přepnutí z posuvného režimu, kdy graf starší body nemá. Týká se jen kanálů,
+        které graf už kreslí a snímek je obsahuje; ostatní křivky zůstanou, jak jsou.
+
+        Čtení snímku a stavba bufferů, LOD a extrémů běží ve vlákně na pozadí;
+        graf mezitím kreslí dál z dosavadních bufferů a hotová historie je
+        nahradí až v _apply_history (v GUI vlákně).
+        """
+        keys = [k for k in snapshot.channels if k in self._curves]
+        if not keys:
+            return
+        self._history_token += 1
+        threading.Thread(target=self._build_history, args=(self._history_token, snapshot, keys),
+                         name="plot-history", daemon=True).start()
+
+    def _build_history(self, token: int, snapshot, keys: List[str]):
+        """Vlákno na pozadí: pracuje jen se snímkem a vlastními buffery, ne se stavem widgetu."""
+        buffers = {key: CurveBuffer() for key in keys}
+        end = float("-inf")
+        for t_s, cols in snapshot.iter_chunks():
+            if not len(t_s):
+                continue
+            for key in keys:
+                ys = cols.get(key)
+                if ys is None:
+                    continue
+                present = ~np.isnan(ys)
+                if present.all():
+                    buffers[key].extend(t_s, ys)
+                elif present.any():
+                    buffers[key].extend(t_s[present], ys[present])
+            end = max(end, float(t_s[-1]))
+
+        history = {}
+        for key, buf in buffers.items():
+            lod = MinMaxPyramid(buf)
+            lod.update()
+            extrema = RunningExtrema()
+            if len(buf):
+                extrema.extend(buf.x, buf.y)
+            history[key] = (buf, lod, extrema)
+        try:
+            self._history_ready.emit(token, (history, end))
+        except RuntimeError:
+            pass   # okno se mezitím zavřelo
+
+    @Slot(int, object)
+    def _apply_history(self, token: int, result):
+        if token != self._history_token or self._scrolling:
+            return   # mezitím clear(), nové načítání nebo přepnutí do posuvného režimu
+        history, end = result
+        for key, (buf, lod, extrema) in history.items():
+            old = self._buffers.get(key)
+            if old is None or key not in self._curves:
+                continue
+            # Body, které přišly během načítání a ve snímku nejsou, navážou za historii
+            i0 = int(np.searchsorted(old.x, end, "right"))
+            if i0 < len(old):
+                xs, ys = old.x[i0:], old.y[i0:]
+                buf.extend(xs, ys)
+                extrema.extend(xs, ys)
+            self._buffers[key] = buf
+            self._lod[key] = lod
+            self._extrema[key] = extrema
+            self._dirty.add(key)
+        self._history_end = max(self._history_end, end)
+        self._max_time = max(self._max_time, end)
+        self._ranges = ()
+        self.refresh()
+
     def clear(self):
-        """Kompletní vyčištění grafu."""
-        self._plot_item.clear() 
-        self._view_voltage.clear()
+        """Kompletní vyčištění grafu. Křivky a legenda se neruší, jen odeberou k dalšímu použití."""
+        for key, curve in self._curves.items():
+            style = self._curve_style.pop(key)
+            curve.setData([], [])
+            self._legend.removeItem(curve)
+            if style[-1]:   # pravá osa
+                self._view_voltage.removeItem(curve)
+            else:
+                self._plot_item.removeItem(curve)
+            self._pool[key] = (style, curve, self._legend_samples.pop(key))
         self._curves.clear()
-        self._data_x.clear()
-        self._data_y.clear()
-
-        # --- FIX LEGENDY ---
-        # PyQtGraph PlotItem si drží referenci na legendu v .legend
-        # Pokud ji odstraníme ze scény, musíme ji nastavit na None,
-        # jinak addLegend() vrátí tu starou (již odstraněnou ze scény) a neviditelnou.
-        if self._plot_item.legend:
-            try:
-                if self._plot_item.legend.scene():
-                    self._plot_item.legend.scene().removeItem(self._plot_item.legend)
-            except Exception:
-                pass
-            self._plot_item.legend = None  # <--- KLÍČOVÝ ŘÁDEK PRO OPRAVU
-            
-        self._legend = self._plot_item.addLegend(offset=(10, 10))
-        self._legend.setBrush(pg.mkBrush(0, 0, 0, 150))
-        self._legend.setLabelTextColor("#FFFFFF")
+        for buf in self._buffers.values():
+            buf.clear()
+        for lod in self._lod.values():
+            lod.clear()
+        self._extrema.clear()
+        self._temp_keys.clear()
+        self._volt_keys.clear()
+        self._dirty.clear()
+        self._max_time = 0.0
+        self._ranges = ()
+        self._history_end = float("-inf")
+        self._history_token += 1
 
         self._plot_widget.setXRange(0, self._time_window, padding=0.02)
 
     def add_point(self, t_s: float, values: Dict[str, float]):
-        current_max_time = t_s
+        """Přidá bod a hned překreslí."""
+        self.append_point(t_s, values)
+        self.refresh()
 
+    def append_point(self, t_s: float, values: Dict[str, float]):
+        """Zapíše bod do bufferů křivek; graf se překreslí až v refresh() (RenderScheduler)."""
+        if t_s <= self._history_end:
+            return   # už je v datech z load_history()
         sorted_keys = sorted(values.keys(), key=get_sensor_sort_key)
 
         for sensor_key in sorted_keys:
@@ -113,47 +295,116 @@ class RealtimePlotWidget(QWidget):
             if sensor_key not in self._curves:
                 self._create_curve(sensor_key)
 
-            self._data_x[sensor_key].append(t_s)
-            self._data_y[sensor_key].append(val)
-            current_max_time = max(current_max_time, t_s)
+            self._buffers[sensor_key].append(t_s, val)
+            self._extrema[sensor_key].push(t_s, val)
+            self._dirty.add(sensor_key)
 
-        for sensor_key, curve in self._curves.items():
-            xs = self._data_x[sensor_key]
-            ys = self._data_y[sensor_key]
-            if not xs: continue
-            
-            # Bez scrollingu - data se jen přidávají a graf se natahuje
-            curve.setData(xs, ys)
+        self._max_time = max(self._max_time, t_s)
 
-        # Osa X - roztahování
+    def refresh(self):
+        """
+        Překreslí jen křivky s novými body od minula. Vejdou-li se body viditelného
+        rozsahu do ~2 bodů na pixel, dostane setData pohledy do bufferů bez kopie,
+        jinak obálku min/max z MinMaxPyramid; cena nezávisí na délce měření.
+        Obálka se kreslí bez antialiasingu: má body po pixelech a vyhlazování
+        husté cik-cak čáry je v QPainteru řádově dražší než všechno ostatní.
+        """
+        if self._scrolling:
+            self._refresh_window()
+            return
+        # Bez scrollingu - data se jen přidávají a graf se natahuje
+        x_max = max(self._time_window, self._max_time)
+        max_points = self._max_points()
+        for sensor_key in self._dirty:
+            lod = self._lod[sensor_key]
+            lod.update()
+            xs, ys = lod.render(0.0, x_max, max_points)
+            decimated = len(xs) < len(self._buffers[sensor_key])
+            self._curves[sensor_key].setData(xs, ys, antialias=not decimated)
+        self._dirty.clear()
+        self._update_ranges(self._max_time)
+
+    def _refresh_window(self):
+        """Posuvný režim: jen body okna z kruhového bufferu, cena omezená jeho kapacitou."""
+        x0 = self._max_time - self._time_window
+        max_points = self._max_points()
+        for sensor_key in self._dirty:
+            buf = self._buffers[sensor_key]
+            x = buf.x
+            i0 = max(0, int(np.searchsorted(x, x0, "left")) - 1)
+            xs, ys = minmax_envelope(x[i0:], buf.y[i0:], max_points, buf.total - len(x) + i0)
+            decimated = len(xs) < len(x) - i0
+            if not decimated:
+                # pohledy do kruhového bufferu by další zápisy přepsaly ještě před překreslením
+                xs, ys = xs.copy(), ys.copy()
+            self._curves[sensor_key].setData(xs, ys, antialias=not decimated)
+        self._dirty.clear()
+        # body, které z okna vypadly, se nesmí podílet na rozsahu osy Y ani u křivek bez nových dat
+        for extrema in self._extrema.values():
+            extrema.expire(self._max_time)
+        self._update_ranges(self._max_time)
+
+    def _update_ranges(self, current_max_time: float):
+        # Osa X - roztahování, v posuvném režimu jen okno končící posledním bodem
         view_max = max(self._time_window, current_max_time)
-        self._plot_widget.setXRange(0, view_max, padding=0.02)
+        view_min = max(0.0, current_max_time - self._time_window) if self._scrolling else 0.0
 
-        # Auto-scale pro Y osy
-        temp_vals = []
-        volt_vals = []
-        for key, ys in self._data_y.items():
-            if not ys: continue
-            
-            is_voltage = key.startswith("V_") or key.startswith("ADC") or key.startswith("ESP")
-            if is_voltage:
-                volt_vals.extend(ys)
-            else:
-                temp_vals.extend(ys)
+        # Auto-scale pro Y osy z průběžných extrémů křivek: O(počet křivek), ne O(počet bodů)
+        temp_range = combine(self._extrema[k].range() for k in self._temp_keys)
+        volt_range = combine(self._extrema[k].range() for k in self._volt_keys)
+        if not self._dual_axis_enabled:
+            volt_range = None
+
+        # Beze změny rozsahů se osy nepřenastavují
+        ranges = (view_min, view_max, temp_range, volt_range)
+        if ranges == self._ranges:
+            return
+        self._ranges = ranges
+
+        self._plot_widget.setXRange(view_min, view_max, padding=0.02)
 
-        if temp_vals:
-            mi, ma = min(temp_vals), max(temp_vals)
+        if temp_range:
+            mi, ma = temp_range
             diff = ma - mi if ma != mi else 1.0
             self._plot_item.setYRange(mi - diff*0.1, ma + diff*0.1, padding=0.02)
         
-        if self._dual_axis_enabled and volt_vals:
-            mi, ma = min(volt_vals), max(volt_vals)
+        if volt_range:
+            mi, ma = volt_range
             diff = ma - mi if ma != mi else 1.0
             self._view_voltage.setYRange(mi - diff*0.1, ma + diff*0.1, padding=0.02)
 
+    def add_points(self, t_s: np.ndarray, columns: Dict[str, np.ndarray]):
+        """
+        Přidá blok bodů najednou (např. historie z recorded_data): sloupce se
+        zkopírují do bufferů a každá křivka se překreslí jen jednou. NaN = bod chybí.
+        """
+        if not len(t_s):
+            return
+        self._extend_points(t_s, columns)
+        self.refresh()
+
+    def _extend_points(self, t_s: np.ndarray, columns: Dict[str, np.ndarray]):
+        for sensor_key in sorted(columns, key=get_sensor_sort_key):
+            ys = np.asarray(columns[sensor_key], dtype=np.float64)
+            present = ~np.isnan(ys)
+            if not present.any():
+                continue
+            if sensor_key not in self._curves:
+                self._create_curve(sensor_key)
+            xs = t_s if present.all() else t_s[present]
+            ys = ys if present.all() else ys[present]
+            self._buffers[sensor_key].extend(xs, ys)
+            self._extrema[sensor_key].extend(xs, ys)
+            self._dirty.add(sensor_key)
+        self._max_time = max(self._max_time, float(t_s[-1]))
+
     def set_time_window(self, seconds: float):
         if seconds <= 0: return
         self._time_window = seconds
+        if self._scrolling:
+            # klouzavé extrémy mají délku okna v sobě
+            self._reset_extrema(list(self._curves))
+            self._dirty.update(self._curves)
 
     def _create_curve(self, key: str):
         pretty_name = get_sensor_name(key)
@@ -168,12 +419,14 @@ class RealtimePlotWidget(QWidget):
         else:
             color = self._assign_color(len(self._curves))
         
-        self._data_x[key] = []
-        self._data_y[key] = []
+        if key not in self._buffers:
+            self._buffers[key] = self._new_buffer()
+            if not self._scrolling:
+                self._lod[key] = MinMaxPyramid(self._buffers[key])
+        self._extrema[key] = self._new_extrema()
+        (self._volt_keys if is_voltage_key(key) else self._temp_keys).append(key)
 
-        use_right_axis = self._dual_axis_enabled and (
-            key.startswith("V_") or key.startswith("ADC") or key.startswith("ESP")
-        )
+        use_right_axis = self._dual_axis_enabled and is_voltage_key(key)
         
         # --- STYL ---
         if is_reference:
@@ -193,20 +446,27 @@ class RealtimePlotWidget(QWidget):
             if self._dual_axis_enabled and not use_right_axis:
                 style = Qt.DashLine
 
-        pen = pg.mkPen(color=color, width=width, style=style)
-
-        if use_right_axis:
+        # Křivka z minula se stejným stylem se použije znovu i s položkou legendy
+        curve_style = (color.name(), style, width, sym_size, use_right_axis)
+        pooled = self._pool.pop(key, None)
+        if pooled is not None and pooled[0] == curve_style:
+            _, curve, sample = pooled
+        else:
+            pen = pg.mkPen(color=color, width=width, style=style)
             curve = pg.PlotDataItem(
-                name=pretty_name, pen=pen, symbol=symbol, symbolSize=sym_size, symbolBrush=color, antialias=True
+                pen=pen, symbol=symbol, symbolSize=sym_size, symbolBrush=color, antialias=True
             )
+            sample = self._legend.sampleType(curve)
+
+        if use_right_axis:
             self._view_voltage.addItem(curve)
-            if self._legend: self._legend.addItem(curve, pretty_name)
         else:
-            curve = self._plot_widget.plot(
-                name=pretty_name, pen=pen, symbol=symbol, symbolSize=sym_size, symbolBrush=color, antialias=True
-            )
-        
+            self._plot_item.addItem(curve)
+        self._legend.addItem(sample, pretty_name)
+
         self._curves[key] = curve
+        self._curve_style[key] = curve_style
+        self._legend_samples[key] = sample
 
     def _assign_color(self, index: int):
         colors = [
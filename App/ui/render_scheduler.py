@@ -0,0 +1,88 @@
+"""
+App/ui/render_scheduler.py
+Překreslování GUI pevnou frekvencí nezávisle na rychlosti vzorků.
+
+Vzorky se do bufferů (graf, karty, progress) zapisují hned, ale widget se
+překreslí až na tik QTimeru, a to jen když se od minulého snímku něco změnilo
+(mark_dirty). Víc vzorků mezi dvěma tiky se tak sloučí do jednoho překreslení.
+Bez změn se časovač zastaví a znovu se rozběhne při dalším mark_dirty.
+"""
+import time
+from typing import Callable, Dict
+
+from PySide6.QtCore import QObject, QTimer
+
+DEFAULT_FPS = 25.0
+
+
+class _Target:
+    __slots__ = ("render", "pending", "frames", "merged", "render_s")
+
+    def __init__(self, render: Callable[[], None]):
+        self.render = render
+        self.pending = 0       # počet změn od posledního snímku
+        self.frames = 0        # skutečná překreslení
+        self.merged = 0        # změny sloučené do cizího snímku (bez vlastního překreslení)
+        self.render_s = 0.0    # celkový čas překreslování
+
+
+class RenderScheduler(QObject):
+    def __init__(self, fps: float = DEFAULT_FPS, parent=None):
+        super().__init__(parent)
+        self._targets: Dict[str, _Target] = {}
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._on_tick)
+        self._idle_ticks = 0
+        self.set_fps(fps)
+
+    def set_fps(self, fps: float):
+        self.fps = max(1.0, fps)
+        self._timer.setInterval(int(round(1000.0 / self.fps)))
+
+    def add_target(self, name: str, render: Callable[[], None]):
+        """render() překreslí widget z jeho bufferů."""
+        self._targets[name] = _Target(render)
+
+    def mark_dirty(self, name: str):
+        """Buffer cíle se změnil; překreslí se na nejbližším tiku."""
+        self._targets[name].pending += 1
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """Překreslí hned vše, co čeká (např. na konci měření)."""
+        for target in self._targets.values():
+            if target.pending:
+                self._render(target)
+
+    def discard(self, name: str):
+        """Zahodí čekající změnu cíle (widget byl mezitím vyčištěn)."""
+        self._targets[name].pending = 0
+
+    def stats(self) -> dict:
+        """Počty snímků a sloučených změn pro každý cíl a počet tiků bez změny."""
+        targets = {}
+        for name, t in self._targets.items():
+            targets[name] = {
+                "frames": t.frames,
+                "merged": t.merged,
+                "avg_render_ms": t.render_s / t.frames * 1e3 if t.frames else 0.0,
+            }
+        return {"fps": self.fps, "idle_ticks": self._idle_ticks, "targets": targets}
+
+    def _on_tick(self):
+        dirty = [t for t in self._targets.values() if t.pending]
+        if not dirty:
+            self._idle_ticks += 1
+            self._timer.stop()
+            return
+        for target in dirty:
+            self._render(target)
+
+    def _render(self, target: _Target):
+        target.merged += target.pending - 1
+        target.pending = 0
+        t0 = time.perf_counter()
+        target.render()
+        target.render_s += time.perf_counter() - t0
+        target.frames += 1
@@ -29,6 +29,7 @@ void SerialProtocol::processLine(const String& line, Command& cmd) {
     if (up == "START") { cmd.type = CommandType::Start; return; }
     if (up == "STOP")  { cmd.type = CommandType::Stop; return; }
     if (up == "PING")  { cmd.type = CommandType::Ping; return; } // <-- NOVÉ
+    if (up == "INFO")  { cmd.type = CommandType::Info; return; }
     
     if (up.startsWith("SET PWM")) {
         int idx = up.indexOf("SET PWM");
@@ -53,6 +54,17 @@ void SerialProtocol::processLine(const String& line, Command& cmd) {
         return;
     }
 
+    if (up.startsWith("SET FORMAT")) {
+        // "SET FORMAT BIN" nebo "SET FORMAT JSON"
+        String rest = up.substring(10);
+        rest.trim();
+        if (rest == "BIN" || rest == "JSON") {
+            cmd.type = CommandType::SetFormat;
+            cmd.value = (rest == "BIN") ? 1 : 0;
+        }
+        return;
+    }
+
     if (up.startsWith("SET RATE")) {
         int idx = up.indexOf("SET RATE");
         if (idx >= 0) {
@@ -73,15 +85,32 @@ void SerialProtocol::processLine(const String& line, Command& cmd) {
 // JEN PRO KOMPLETNOST DOPLNÍM TYTO METODY, ABY SOUBOR BYL VALIDNÍ
 void SerialProtocol::begin(unsigned long baud) { Serial.begin(baud); while (!Serial && millis() < 2000); }
 void SerialProtocol::sendHello(bool bme_ok, uint8_t dallas_count, bool adc_ok, bool tmp_ok) {
+    _helloBme = bme_ok; _helloDallas = dallas_count; _helloAdc = adc_ok; _helloTmp = tmp_ok;
+    printHelloFields();
+    Serial.println("}");
+}
+void SerialProtocol::sendInfo(bool running, float rateHz) {
+    printHelloFields();
+    Serial.print(",\"running\":"); Serial.print(running?"true":"false");
+    Serial.print(",\"rate_hz\":"); Serial.print(rateHz, 4);
+    Serial.print(",\"uptime_ms\":"); Serial.print(millis());
+    Serial.println("}");
+}
+void SerialProtocol::printHelloFields() {
     Serial.print("{\"type\":\"hello\",\"device\":\"temp-lab-v2\",\"bme\":");
-    Serial.print(bme_ok?"true":"false"); Serial.print(",\"dallas\":"); Serial.print(dallas_count);
-    Serial.print(",\"adc\":"); Serial.print(adc_ok?"true":"false"); Serial.print(",\"tmp\":"); 
-    Serial.print(tmp_ok?"true":"false"); Serial.println("}");
+    Serial.print(_helloBme?"true":"false"); Serial.print(",\"dallas\":"); Serial.print(_helloDallas);
+    Serial.print(",\"adc\":"); Serial.print(_helloAdc?"true":"false"); Serial.print(",\"tmp\":"); 
+    Serial.print(_helloTmp?"true":"false");
 }
 void SerialProtocol::sendAckSetRate(float rateHz) { Serial.print("{\"type\":\"ack\",\"cmd\":\"set_rate\",\"rate_hz\":"); Serial.print(rateHz, 4); Serial.println("}"); }
 void SerialProtocol::sendAck(const char* cmd) { Serial.print("{\"type\":\"ack\",\"cmd\":\""); Serial.print(cmd); Serial.println("\"}"); }
-void SerialProtocol::sendError(const char* msg) { Serial.print("{\"type\":\"error\",\"msg\":\""); Serial.print(msg); Serial.println("\"}"); }
+void SerialProtocol::sendError(const char* msg, const char* cmd) {
+    Serial.print("{\"type\":\"error\",\"msg\":\""); Serial.print(msg); Serial.print("\"");
+    if (cmd) { Serial.print(",\"cmd\":\""); Serial.print(cmd); Serial.print("\""); }
+    Serial.println("}");
+}
 void SerialProtocol::sendData(uint32_t t_ms, float t_tmp, float t_bme, DallasBus& dallas, float v1, float v2, float v3, float v4) {
+    if (_binary) { sendDataBinary(t_ms, t_tmp, t_bme, dallas, v1, v2, v3, v4); return; }
     Serial.print("{\"type\":\"data\",\"t_ms\":"); Serial.print(t_ms);
     Serial.print(",\"T_TMP\":"); if(isnan(t_tmp)) Serial.print("null"); else Serial.print(t_tmp, 4);
     Serial.print(",\"T_BME\":"); if(isnan(t_bme)) Serial.print("null"); else Serial.print(t_bme, 4);
@@ -90,4 +119,30 @@ void SerialProtocol::sendData(uint32_t t_ms, float t_tmp, float t_bme, DallasBus
     uint8_t c = dallas.getSensorCount();
     for(uint8_t i=0; i<c; ++i) { Serial.print(",\"T_DS"); Serial.print(i); Serial.print("\":"); float t=dallas.getTemperatureC(i); if(isnan(t)) Serial.print("null"); else Serial.print(t,4); }
     Serial.println("}");
-}
\ No newline at end of file
+}
+
+void SerialProtocol::sendDataBinary(uint32_t t_ms, float t_tmp, float t_bme, DallasBus& dallas, float v1, float v2, float v3, float v4) {
+    uint8_t buf[3 + 4 + 4 * BIN_MAX_CHANNELS + 1];
+    size_t n = 0;
+    buf[n++] = BIN_SYNC0;
+    buf[n++] = BIN_SYNC1;
+    n++; // LEN doplníme na konci
+
+    // ESP32 je little-endian -> hodnoty kopírujeme přímo
+    memcpy(buf + n, &t_ms, 4); n += 4;
+    const float fixed[6] = { t_tmp, t_bme, v1, v2, v3, v4 };
+    memcpy(buf + n, fixed, sizeof(fixed)); n += sizeof(fixed);
+
+    uint8_t c = dallas.getSensorCount();
+    for (uint8_t i = 0; i < c && i < BIN_MAX_CHANNELS - 6; ++i) {
+        float t = dallas.getTemperatureC(i);
+        memcpy(buf + n, &t, 4); n += 4;
+    }
+
+    buf[2] = (uint8_t)(n - 3);
+    uint8_t chk = 0;
+    for (size_t i = 2; i < n; ++i) chk ^= buf[i];
+    buf[n++] = chk;
+
+    Serial.write(buf, n);
+}
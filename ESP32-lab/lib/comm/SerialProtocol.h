@@ -3,12 +3,12 @@
 #include "../sensors/DallasSensor.h"
 
 enum class CommandType {
-    None, Start, Stop, SetRate, SetPwm, Ping, SetFilter // <-- PŘIDÁNO SetFilter
+    None, Start, Stop, SetRate, SetPwm, Ping, SetFilter, SetFormat, Info
 };
 
 struct Command {
     CommandType type = CommandType::None;
-    int value = 0;         // <-- PŘIDÁNO: Obecná hodnota (např. pro Filter 0/1)
+    int value = 0;         // <-- PŘIDÁNO: Obecná hodnota (např. pro Filter 0/1, Format 1 = BIN)
     float rateHz = 0.0f;
     int pwmChannel = 0;    
     float pwmValue = 0.0f; 
@@ -18,14 +18,36 @@ class SerialProtocol {
 public:
     void begin(unsigned long baud);
     void sendHello(bool bme_ok, uint8_t dallas_count, bool adc_ok, bool tmp_ok);
+    // Odpověď na INFO: stejná zpráva hello jako po startu (z uložených hodnot)
+    // doplněná o aktuální stav, aby se PC mohlo připojit bez resetu desky
+    void sendInfo(bool running, float rateHz);
     bool readCommand(Command& cmd);
     void sendAck(const char* cmd);
     void sendAckSetRate(float rateHz);
-    void sendError(const char* msg);
+    // cmd = jméno příkazu jako v ack (např. "set_rate"), aby PC chybu přiřadilo správnému příkazu
+    void sendError(const char* msg, const char* cmd = nullptr);
     void sendData(uint32_t t_ms, float t_tmp, float t_bme, DallasBus& dallas, float v1, float v2, float v3, float v4);
 
+    // Binární rámec dat (SET FORMAT BIN):
+    //   0xA5 0x5A | LEN | t_ms (uint32 LE) | N x float32 LE | CHK
+    //   LEN = 4 + 4*N, CHK = XOR bajtů LEN a payloadu.
+    //   Pořadí kanálů: T_TMP, T_BME, V_ADS_R, V_ADS_NTC, V_ESP_R, V_ESP_NTC, T_DS0..
+    //   Chybějící hodnota = NaN. Odpovědi (ack/error/hello) zůstávají JSON.
+    void setBinaryFormat(bool enabled) { _binary = enabled; }
+    bool isBinaryFormat() const { return _binary; }
+
 private:
     String _buffer;
     static const size_t MAX_BUFFER = 256;
+    static const uint8_t BIN_SYNC0 = 0xA5;
+    static const uint8_t BIN_SYNC1 = 0x5A;
+    static const uint8_t BIN_MAX_CHANNELS = 32;
+    bool _binary = false;
+    bool _helloBme = false;
+    uint8_t _helloDallas = 0;
+    bool _helloAdc = false;
+    bool _helloTmp = false;
+    void printHelloFields();
     void processLine(const String& line, Command& cmd);
+    void sendDataBinary(uint32_t t_ms, float t_tmp, float t_bme, DallasBus& dallas, float v1, float v2, float v3, float v4);
 };
\ No newline at end of file
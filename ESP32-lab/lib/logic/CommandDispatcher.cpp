@@ -22,16 +22,27 @@ void CommandDispatcher::apply(const Command& cmd) {
             _proto.sendAck("set_filter");
             break;
         
+        case CommandType::SetFormat:
+            // cmd.value: 1 = binární rámce, 0 = JSON řádky (výchozí)
+            _proto.setBinaryFormat(cmd.value == 1);
+            _proto.sendAck("set_format");
+            break;
+
         case CommandType::Ping:
             // Jen resetuje časovač (už se stalo výše), neposíláme ACK
             break;
 
+        case CommandType::Info:
+            // Inventář senzorů a stav bez restartu desky (attach z PC)
+            _proto.sendInfo(_isRunning, _rateHz);
+            break;
+
         case CommandType::SetRate:
             if (cmd.rateHz > 0.0f && cmd.rateHz <= 10.0f) {
                 _rateHz = cmd.rateHz;
                 _proto.sendAckSetRate(_rateHz);
             } else {
-                _proto.sendError("invalid_rate");
+                _proto.sendError("invalid_rate", "set_rate");
             }
             break;
 